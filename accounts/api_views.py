@@ -2,7 +2,7 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
+from prudence.authentication import RefreshToken, full_user
 from .serializers import UserSerializer, RegisterSerializer, LoginSerializer
 
 
@@ -25,7 +25,7 @@ def register_view(request):
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login_view(request):
-    serializer = LoginSerializer(data=request.data)
+    serializer = LoginSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
         user = serializer.validated_data['user']
         refresh = RefreshToken.for_user(user)
@@ -39,7 +39,7 @@ def login_view(request):
 
 @api_view(['GET'])
 def current_user_view(request):
-    serializer = UserSerializer(request.user)
+    serializer = UserSerializer(full_user(request.user))
     return Response(serializer.data)
 
 
@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+UserModel = get_user_model()
+
+
+class UsernameOrEmailBackend(ModelBackend):
+    """
+    Authenticate by username, or by email ignoring case, with one indexed
+    query and one password hash.
+
+    A username match wins over another user's email. Unknown users still
+    pay for one hash so response times do not reveal which accounts exist.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        candidates = list(
+            UserModel._default_manager
+            .alias(email_lower=Lower('email'))
+            .filter(Q(username=username) | Q(email_lower=username.lower()) & ~Q(email=''))[:2]
+        )
+        user = next((candidate for candidate in candidates if candidate.username == username),
+                    candidates[0] if candidates else None)
+        if user is None:
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
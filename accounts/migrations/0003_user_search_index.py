@@ -0,0 +1,64 @@
+from django.db import migrations
+
+# Written out rather than taken from prudence.search, so this migration keeps
+# doing what it did when it was written (see prudence 0014_search_indexes)
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE accounts_customuser_fts USING fts5(username, first_name, last_name, email, "
+    "content='accounts_customuser', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS accounts_customuser_fts_ai AFTER INSERT ON accounts_customuser BEGIN "
+    "INSERT INTO accounts_customuser_fts(rowid, username, first_name, last_name, email) "
+    "VALUES (new.id, new.username, new.first_name, new.last_name, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS accounts_customuser_fts_ad AFTER DELETE ON accounts_customuser BEGIN "
+    "INSERT INTO accounts_customuser_fts(accounts_customuser_fts, rowid, username, first_name, last_name, email) "
+    "VALUES ('delete', old.id, old.username, old.first_name, old.last_name, old.email); END",
+    "CREATE TRIGGER IF NOT EXISTS accounts_customuser_fts_au "
+    "AFTER UPDATE OF username, first_name, last_name, email ON accounts_customuser BEGIN "
+    "INSERT INTO accounts_customuser_fts(accounts_customuser_fts, rowid, username, first_name, last_name, email) "
+    "VALUES ('delete', old.id, old.username, old.first_name, old.last_name, old.email); "
+    "INSERT INTO accounts_customuser_fts(rowid, username, first_name, last_name, email) "
+    "VALUES (new.id, new.username, new.first_name, new.last_name, new.email); END",
+    "INSERT INTO accounts_customuser_fts(accounts_customuser_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS accounts_customuser_fts_ai",
+    "DROP TRIGGER IF EXISTS accounts_customuser_fts_ad",
+    "DROP TRIGGER IF EXISTS accounts_customuser_fts_au",
+    "DROP TABLE IF EXISTS accounts_customuser_fts",
+]
+
+
+def postgres_index():
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+    return GinIndex(SearchVector('username', 'first_name', 'last_name', 'email', config='english'),
+                    name='accounts_customuser_search_idx')
+
+
+def install_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_INSTALL:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        schema_editor.add_index(apps.get_model('accounts', 'CustomUser'), postgres_index())
+
+
+def uninstall_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_UNINSTALL:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        schema_editor.remove_index(apps.get_model('accounts', 'CustomUser'), postgres_index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_customuser_role'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
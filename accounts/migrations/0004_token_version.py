@@ -0,0 +1,45 @@
+# Generated by Django 4.2.16 on 2026-10-17 17:30
+
+from django.db import migrations, models
+
+# Adding token_version copies accounts_customuser into a new table on
+# SQLite, which drops the triggers 0003 put on it. Recreate them and reindex
+# the rows. Every later migration that rebuilds accounts_customuser on
+# SQLite must do the same.
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS accounts_customuser_fts_ai AFTER INSERT ON accounts_customuser BEGIN "
+    "INSERT INTO accounts_customuser_fts(rowid, username, first_name, last_name, email) "
+    "VALUES (new.id, new.username, new.first_name, new.last_name, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS accounts_customuser_fts_ad AFTER DELETE ON accounts_customuser BEGIN "
+    "INSERT INTO accounts_customuser_fts(accounts_customuser_fts, rowid, username, first_name, last_name, email) "
+    "VALUES ('delete', old.id, old.username, old.first_name, old.last_name, old.email); END",
+    "CREATE TRIGGER IF NOT EXISTS accounts_customuser_fts_au "
+    "AFTER UPDATE OF username, first_name, last_name, email ON accounts_customuser BEGIN "
+    "INSERT INTO accounts_customuser_fts(accounts_customuser_fts, rowid, username, first_name, last_name, email) "
+    "VALUES ('delete', old.id, old.username, old.first_name, old.last_name, old.email); "
+    "INSERT INTO accounts_customuser_fts(rowid, username, first_name, last_name, email) "
+    "VALUES (new.id, new.username, new.first_name, new.last_name, new.email); END",
+    "INSERT INTO accounts_customuser_fts(accounts_customuser_fts) VALUES ('rebuild')",
+]
+
+
+def restore_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_TRIGGERS:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(restore_triggers, migrations.RunPython.noop),
+    ]
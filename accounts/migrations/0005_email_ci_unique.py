@@ -0,0 +1,33 @@
+# Generated by Django 4.2.16 on 2026-10-17 17:33
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+import django.db.models.functions.text
+
+
+def check_duplicate_emails(apps, schema_editor):
+    # The constraint would fail on them; say which addresses to fix first
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    duplicates = list(
+        CustomUser.objects.exclude(email='')
+        .values(email_lower=Lower('email')).annotate(users=Count('pk')).filter(users__gt=1)
+        .values_list('email_lower', flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(f"Emails shared by several users (ignoring case): {', '.join(duplicates)}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_token_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), condition=models.Q(('email', ''), _negated=True), name='user_email_ci_unique'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.16 on 2026-10-17 18:24
+
+import accounts.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_email_ci_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenClaimsUser',
+            fields=[
+            ],
+            options={
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('accounts.customuser',),
+            managers=[
+                ('objects', accounts.models.CustomUserManager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='customuser',
+            managers=[
+                ('objects', accounts.models.CustomUserManager()),
+            ],
+        ),
+    ]
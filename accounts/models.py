@@ -1,5 +1,39 @@
-from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.dispatch import Signal
+
+# Sent with the ids of users whose token version was bumped by a queryset
+tokens_revoked = Signal()
+
+# Fields signed into issued tokens; changing one revokes them
+REVOKING_FIELDS = ('username', 'role', 'is_active', 'is_staff', 'is_superuser')
+
+
+class CustomUserQuerySet(models.QuerySet):
+    def revoke_tokens(self):
+        """Bump the token version of every user in the queryset, revoking their tokens"""
+        return self.update(token_version=F('token_version') + 1)
+
+    def update(self, **kwargs):
+        """
+        ``QuerySet.update()``, which skips ``save()`` and its signals, also
+        revokes the users' tokens when it changes a field they carry.
+        """
+        if 'token_version' not in kwargs and not set(kwargs) & set(REVOKING_FIELDS):
+            return super().update(**kwargs)
+        kwargs.setdefault('token_version', F('token_version') + 1)
+        with transaction.atomic(using=self.db):
+            user_ids = list(self.select_for_update().values_list('pk', flat=True))
+            updated = super().update(**kwargs)
+        tokens_revoked.send(sender=self.model, user_ids=user_ids)
+        return updated
+
+
+class CustomUserManager(UserManager.from_queryset(CustomUserQuerySet)):
+    pass
+
 
 class CustomUser(AbstractUser):
     L1 = 'L1'
@@ -11,3 +45,64 @@ class CustomUser(AbstractUser):
         (L3, 'L3'),
     ]
     role = models.CharField(max_length=2, choices=ROLE_CHOICES, default=L1)
+    # Bumped whenever a claim carried in issued tokens changes, which
+    # revokes those tokens (see prudence.authentication)
+    token_version = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CustomUserManager()
+
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # Emails log in like usernames, so one may belong to one user only
+            models.UniqueConstraint(Lower('email'), condition=~models.Q(email=''), name='user_email_ci_unique'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The claims as loaded, which tell a save whether it changes any
+        instance._loaded_claims = {field: getattr(instance, field) for field in REVOKING_FIELDS if field in field_names}
+        return instance
+
+    def changed_claims(self):
+        """The REVOKING_FIELDS set on this copy since it was loaded or saved, as far as it knows"""
+        loaded = getattr(self, '_loaded_claims', {})
+        deferred = self.get_deferred_fields()
+        return {
+            field for field in REVOKING_FIELDS
+            if field not in deferred and (field not in loaded or loaded[field] != getattr(self, field))}
+
+    def save(self, *args, **kwargs):
+        # token_version only changes through F() updates, and claims are only
+        # written when this copy changed them, so saving a copy loaded before
+        # a revocation cannot roll either back
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            unchanged = set(REVOKING_FIELDS) - self.changed_claims()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'token_version'
+                and field.name not in unchanged and field.attname not in deferred]
+        super().save(*args, **kwargs)
+        saved = kwargs.get('update_fields')
+        self._loaded_claims = {
+            **getattr(self, '_loaded_claims', {}),
+            **{field: getattr(self, field) for field in REVOKING_FIELDS if saved is None or field in saved}}
+
+
+class TokenClaimsUser(CustomUser):
+    """
+    A user built from a token's signed claims by
+    ``StatelessJWTAuthentication``. Only the claimed fields are set, so it
+    refuses to be saved or deleted; load the row to change the user.
+    """
+    from_token_claims = True
+
+    class Meta:
+        proxy = True
+
+    def save(self, *args, **kwargs):
+        raise TypeError('Users built from token claims have no full database row to save')
+
+    def delete(self, *args, **kwargs):
+        raise TypeError('Users built from token claims cannot be deleted')
@@ -1,9 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from django.db import IntegrityError, transaction
+from prudence.timing import TimedRepresentationMixin
 from .models import CustomUser
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = CustomUser
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'role', 'is_active', 'date_joined')
@@ -11,6 +13,8 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class RegisterSerializer(serializers.ModelSerializer):
+    EMAIL_TAKEN = 'A user with this email already exists'
+
     password1 = serializers.CharField(write_only=True)
     password2 = serializers.CharField(write_only=True)
 
@@ -18,6 +22,11 @@ class RegisterSerializer(serializers.ModelSerializer):
         model = CustomUser
         fields = ('username', 'email', 'first_name', 'last_name', 'role', 'password1', 'password2')
 
+    def validate_email(self, value):
+        if value and CustomUser.objects.filter(email__iexact=value).exists():
+            raise serializers.ValidationError(self.EMAIL_TAKEN)
+        return value
+
     def validate(self, data):
         if data['password1'] != data['password2']:
             raise serializers.ValidationError("Passwords don't match")
@@ -26,10 +35,19 @@ class RegisterSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         password = validated_data.pop('password1')
         validated_data.pop('password2')
-        user = CustomUser.objects.create_user(
-            password=password,
-            **validated_data
-        )
+        try:
+            # A savepoint, so the request's transaction survives the error
+            with transaction.atomic():
+                user = CustomUser.objects.create_user(
+                    password=password,
+                    **validated_data
+                )
+        except IntegrityError:
+            # Registered by a concurrent request since validate_email() and
+            # the username check ran; the constraints have the last word
+            if CustomUser.objects.filter(username=validated_data['username']).exists():
+                raise serializers.ValidationError({'username': ['A user with that username already exists.']})
+            raise serializers.ValidationError({'email': [self.EMAIL_TAKEN]})
         return user
 
 
@@ -42,17 +60,7 @@ class LoginSerializer(serializers.Serializer):
         password = data.get('password')
 
         if username and password:
-            # Try authenticating with username first
-            user = authenticate(username=username, password=password)
-            
-            # If username authentication fails, try email authentication
-            if not user:
-                try:
-                    user_obj = CustomUser.objects.get(email=username)
-                    user = authenticate(username=user_obj.username, password=password)
-                except CustomUser.DoesNotExist:
-                    pass
-            
+            user = authenticate(self.context.get('request'), username=username, password=password)
             if not user:
                 raise serializers.ValidationError('Invalid username/email or password')
             if not user.is_active:
@@ -2,10 +2,12 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 
+from prudence import async_views
 from accounts.api_views import register_view, login_view, current_user_view, logout_view
 from prudence.api_views import (
     RiskViewSet, ControlViewSet, RiskAssessmentViewSet, 
-    RiskTypeViewSet, ActionViewSet, UserViewSet, dashboard_stats
+    RiskTypeViewSet, ActionViewSet, UserViewSet, ImportJobViewSet,
+    dashboard_stats, cache_stats_view, compression_stats_view
 )
 
 # Create router for viewsets
@@ -16,6 +18,7 @@ router.register(r'risk-assessments', RiskAssessmentViewSet, basename='risk-asses
 router.register(r'risk-types', RiskTypeViewSet, basename='risk-type')
 router.register(r'actions', ActionViewSet, basename='action')
 router.register(r'users', UserViewSet, basename='user')
+router.register(r'imports', ImportJobViewSet, basename='import')
 
 urlpatterns = [
     # Authentication endpoints
@@ -27,6 +30,13 @@ urlpatterns = [
     
     # Dashboard endpoint
     path('dashboard/stats/', dashboard_stats, name='dashboard-stats'),
+    path('cache/stats/', cache_stats_view, name='cache-stats'),
+    path('compression/stats/', compression_stats_view, name='compression-stats'),
+
+    # Async reads, best served under an ASGI server
+    path('async/dashboard/stats/', async_views.dashboard_stats, name='async-dashboard-stats'),
+    path('async/risks/matrix/', async_views.risk_matrix, name='async-risk-matrix'),
+    path('async/workspace/', async_views.workspace, name='async-workspace'),
     
     # Include router URLs
     path('', include(router.urls)),
@@ -0,0 +1,152 @@
+"""
+Fixtures for the API benchmark suite.
+
+A synthetic register is generated once per session with
+``generate_register``; each benchmark records the number of queries of a
+cold call and the latency of ``--benchmark-rounds`` further calls. Pass
+``--benchmark-json=PATH`` to write the results to a file that can be
+diffed between releases.
+"""
+import io
+import json
+import platform
+import threading
+import time
+from datetime import datetime, timezone
+from unittest import mock
+
+import django
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.utils import CursorWrapper
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from prudence.perf import summarize
+
+
+class QueryCounter:
+    """
+    Counts the queries of every connection, in every thread. Async views
+    run theirs on worker-thread connections, which ``CaptureQueriesContext``
+    on the test's connection does not see.
+    """
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        execute = CursorWrapper._execute_with_wrappers
+
+        def counted(cursor, sql, *args, **kwargs):
+            # Not the SQLITE_PRAGMAS a new connection runs: the test's own
+            # connection is long-lived, so sync budgets never include them
+            if not sql.startswith('PRAGMA'):
+                with self.lock:
+                    self.count += 1
+            return execute(cursor, sql, *args, **kwargs)
+
+        self.patch = mock.patch.object(CursorWrapper, '_execute_with_wrappers', counted)
+        self.patch.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.patch.stop()
+
+    def __len__(self):
+        return self.count
+
+
+class BenchmarkRecorder:
+    def __init__(self, rounds):
+        self.rounds = rounds
+        self.results = {}
+
+    def measure(self, name, call):
+        """
+        Call once under query capture, then ``rounds`` more times against the
+        clock. Returns the first response and its query count.
+        """
+        with QueryCounter() as queries:
+            response = call()
+        query_count = len(queries)
+        samples = []
+        for _ in range(self.rounds):
+            started = time.perf_counter()
+            call()
+            samples.append(time.perf_counter() - started)
+        self.results[name] = {'queries': query_count, **summarize(samples)}
+        return response, query_count
+
+    def write(self, path, **meta):
+        report = {
+            'meta': {
+                'created': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'rounds': self.rounds,
+                **meta,
+            },
+            'results': self.results,
+        }
+        with open(path, 'w') as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+            handle.write('\n')
+
+
+@pytest.fixture(scope='session')
+def benchmark(request):
+    recorder = BenchmarkRecorder(request.config.getoption('--benchmark-rounds'))
+    yield recorder
+    path = request.config.getoption('--benchmark-json')
+    if path:
+        recorder.write(path, risks=request.config.getoption('--benchmark-risks'))
+
+
+@pytest.fixture(scope='session')
+def register(request, django_db_setup, django_db_blocker):
+    """The generated register, shared by every benchmark in the session"""
+    from accounts.models import CustomUser
+    from prudence.models import Control, Risk, RiskAssessment
+
+    with django_db_blocker.unblock():
+        call_command('generate_register', risks=request.config.getoption('--benchmark-risks'),
+                     prefix='bench', stdout=io.StringIO())
+        user = CustomUser.objects.filter(username__startswith='bench', role='L2').first()
+        admin = CustomUser.objects.create_user(
+            username='bench-admin', password='password', role='L1', is_staff=True)
+        return {
+            'user': user,
+            'admin': admin,
+            'risk': Risk.objects.filter(risk_owner=user).first() or Risk.objects.first(),
+            'control': Control.objects.first(),
+            'assessment': RiskAssessment.objects.filter(assessor=user).first() or RiskAssessment.objects.first(),
+        }
+
+
+def jwt_client(user):
+    """An API client authenticating the way the frontend does, with a bearer token"""
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    return client
+
+
+@pytest.fixture
+def client(register):
+    return jwt_client(register['user'])
+
+
+@pytest.fixture
+def admin_client(register):
+    return jwt_client(register['admin'])
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Start every benchmark cold so query counts do not depend on test order
+    from prudence.revocation import revocations
+    cache.clear()
+    revocations.reset()
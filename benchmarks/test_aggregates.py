@@ -0,0 +1,87 @@
+"""
+The risk matrix counts from one GROUP BY against counting risk by risk, and
+the cell drill-down under the same filters.
+"""
+from collections import Counter
+
+import pytest
+
+from prudence.aggregates import IMPACT_LEVELS, PROBABILITY_LEVELS, risk_matrix_counts
+from prudence.models import Risk
+
+pytestmark = pytest.mark.django_db
+
+
+def naive_counts(risks):
+    """The matrix counted one risk at a time"""
+    cells = {'inherent': Counter(), 'residual': Counter()}
+    off_grid = Counter()
+    unassessed = 0
+    for risk in risks:
+        for axis in cells:
+            cell = (getattr(risk, f'{axis}_probability'), getattr(risk, f'{axis}_impact'))
+            if cell[0] in PROBABILITY_LEVELS and cell[1] in IMPACT_LEVELS:
+                cells[axis][cell] += 1
+            elif axis == 'residual' and None in cell:
+                unassessed += 1
+            else:
+                off_grid[axis] += 1
+    return cells, off_grid, unassessed
+
+
+@pytest.fixture
+def off_grid_risks(register):
+    # Scores the model's choices would reject, written past validation
+    for axis in ('inherent', 'residual'):
+        risk = Risk.objects.create(description=f'Off the {axis} grid', inherent_probability=1, inherent_impact=1,
+                                   residual_probability=1, residual_impact=1)
+        Risk.objects.filter(pk=risk.pk).update(**{f'{axis}_probability': 7})
+    Risk.objects.create(description='Not assessed', inherent_probability=2, inherent_impact=3)
+
+
+def test_counts_match_per_risk_count(off_grid_risks):
+    risks = Risk.objects.all()
+    counts = risk_matrix_counts(risks)
+    cells, off_grid, unassessed = naive_counts(risks)
+
+    assert counts['total'] == risks.count()
+    for axis in ('inherent', 'residual'):
+        assert {(cell['x'], cell['y']): cell['count'] for cell in counts[axis] if cell['count']} == cells[axis]
+        assert counts['off_grid'][axis] == off_grid[axis] >= 1
+    assert counts['unassessed'] == unassessed >= 1
+
+    # Every risk is accounted for once on each axis
+    inherent = sum(cell['count'] for cell in counts['inherent'])
+    residual = sum(cell['count'] for cell in counts['residual'])
+    assert inherent + counts['off_grid']['inherent'] == counts['total']
+    assert residual + counts['off_grid']['residual'] + counts['unassessed'] == counts['total']
+
+
+def test_filtered_counts(off_grid_risks):
+    risks = Risk.objects.filter(risk_level__in=['high', 'critical'])
+    counts = risk_matrix_counts(risks)
+    assert counts['total'] == risks.count()
+    assert naive_counts(risks)[0]['residual'] == {
+        (cell['x'], cell['y']): cell['count'] for cell in counts['residual'] if cell['count']}
+
+
+def test_cell_drill_down_applies_the_list_filters(client, register):
+    owner = Risk.objects.filter(risk_level='high', risk_owner__isnull=False).values_list('risk_owner', flat=True)[0]
+    filters = f'owner={owner}&risk_level=high,critical'
+    counts = client.get(f'/api/risks/matrix/?mode=counts&{filters}').json()
+    cell = max(counts['residual'], key=lambda cell: cell['count'])
+    assert cell['count'] > 0
+    response = client.get(f"/api/risks/matrix/cell/?axis=residual&probability={cell['x']}&impact={cell['y']}"
+                          f"&page_size=1&{filters}")
+    assert response.status_code == 200
+    assert response.json()['count'] == cell['count']
+
+
+@pytest.mark.parametrize('path', [
+    '/api/risks/', '/api/risks/matrix/?mode=counts', '/api/risks/export/', '/api/async/risks/matrix/',
+    '/api/async/workspace/',
+])
+def test_malformed_id_filter_is_rejected(client, path):
+    response = client.get(f"{path}{'&' if '?' in path else '?'}owner=abc")
+    assert response.status_code == 400
+    assert response.json() == {'owner': ['Expected an integer id.']}
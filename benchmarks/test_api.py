@@ -0,0 +1,350 @@
+"""
+Query-count budgets and latency for every endpoint in ``api_urls.py``.
+
+A budget is the number of queries of one cold call against the generated
+register (authentication included), on every connection: the async views'
+worker-thread queries count too. Raising one should be a deliberate change
+in the same commit as the code that needs it. Each call's response is also
+checked against the database, so a budget cannot be met by returning less.
+"""
+import json
+from itertools import count
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from prudence.models import Action, Control, ImportJob, Risk, RiskAssessment, RiskType
+from prudence.revocation import revocations
+from prudence.search import risk_search
+
+pytestmark = pytest.mark.django_db
+
+
+def body(response):
+    return response.consumed if response.streaming else response.content
+
+
+def data(response):
+    return json.loads(body(response))
+
+
+def is_user(response, register):
+    assert data(response)['id'] == register['user'].pk
+
+
+def is_dashboard(response, register):
+    user = register['user']
+    stats = data(response)
+    assert stats['total_risks'] == Risk.objects.count()
+    assert stats['my_risks'] == Risk.objects.filter(Q(risk_owner=user) | Q(assessor=user)).count()
+    assert stats['my_controls'] == Control.objects.filter(owner=user).count()
+
+
+def is_page_of(queryset):
+    def check(response, register):
+        page = data(response)
+        assert page['count'] == queryset.count() and len(page['results']) == min(page['count'], 20)
+    return check
+
+
+def is_risk_page(response, register):
+    is_page_of(Risk.objects.all())(response, register)
+
+
+def is_expanded(response, register):
+    risk = data(response)['results'][0]
+    assert 'username' in risk['owner'] and 'name' in risk['risk_type']
+    assert all('effectiveness' in control for control in risk['controls'])
+
+
+def is_cursor_page(response, register):
+    page = data(response)
+    assert 'count' not in page and page['next'] and len(page['results']) == 20
+
+
+def is_search_page(response, register):
+    page = data(response)
+    assert page['count'] == risk_search.filter(Risk.objects.all(), 'data').count() > 0
+
+
+def is_detail(key):
+    def check(response, register):
+        assert data(response)['id'] == register[key].pk
+    return check
+
+
+def is_assigned_to_user(response, register):
+    user = register['user'].pk
+    items = data(response)
+    assert items and all(user in (item['owner'], item.get('assessor')) for item in items)
+
+
+def is_matrix(response, register):
+    matrix = data(response)
+    assert len(matrix['inherent']) == len(matrix['residual']) == Risk.objects.count()
+
+
+def is_matrix_counts(response, register):
+    counts = data(response)
+    assert counts['total'] == Risk.objects.count()
+    assert sum(cell['count'] for cell in counts['inherent']) + counts['off_grid']['inherent'] == counts['total']
+
+
+def is_image(content_type, signature):
+    def check(response, register):
+        assert response['Content-Type'] == content_type and body(response).startswith(signature)
+    return check
+
+
+def is_cell(response, register):
+    page = data(response)
+    assert page['count'] == Risk.objects.filter(inherent_probability=3, inherent_impact=3).count()
+    assert all((risk['inherent_probability'], risk['inherent_impact']) == (3, 3) for risk in page['results'])
+
+
+def is_export(response, register):
+    rows = [json.loads(line) for line in body(response).decode().splitlines()]
+    assert len(rows) == Risk.objects.count()
+
+
+def is_assigned_page(response, register):
+    # L2 users only see the assessments assigned to them
+    page = data(response)
+    assigned = RiskAssessment.objects.filter(assessor=register['user'])
+    assert page.get('count', assigned.count()) == assigned.count()
+    assert page['results'] and all(item['assessor'] == register['user'].pk for item in page['results'])
+
+
+def is_pending_reviews(response, register):
+    results = data(response)['results']
+    assert results and all(
+        (item['assessor'], item['assessment_status']) == (register['user'].pk, 'P') for item in results)
+
+
+def is_user_search(response, register):
+    page = data(response)
+    assert page['count'] == get_user_model().objects.filter(username__startswith='bench').count()
+
+
+def is_workspace(response, register):
+    workspace = data(response)
+    user = register['user'].pk
+    assert workspace['risks'] and all(user in (risk['owner'], risk['assessor']) for risk in workspace['risks'])
+    assert all(item['assessor'] == user and item['assessment_status'] == 'P' for item in workspace['assessments'])
+
+
+def read(name, path, budget, check, marks=()):
+    return pytest.param(name, path, budget, check, id=name, marks=marks)
+
+
+# name, path (formatted with the register's ids), query budget, content check
+READS = [
+    read('auth-user', '/api/auth/user/', 1, is_user),
+    read('dashboard-stats', '/api/dashboard/stats/', 2, is_dashboard),
+    read('risk-list', '/api/risks/', 6, is_risk_page),
+    # The ETag also summarizes the expanded users, controls and risk types
+    read('risk-list-expanded', '/api/risks/?expand=owner,assessor,controls,risk_type', 8, is_expanded),
+    read('risk-list-cursor', '/api/risks/?pagination=cursor', 5, is_cursor_page),
+    read('risk-list-search', '/api/risks/?search=data', 6, is_search_page),
+    read('risk-detail', '/api/risks/{risk}/', 5, is_detail('risk')),
+    read('risk-my-risks', '/api/risks/my_risks/', 5, is_assigned_to_user),
+    read('risk-matrix', '/api/risks/matrix/', 5, is_matrix),
+    read('risk-matrix-counts', '/api/risks/matrix/?mode=counts', 4, is_matrix_counts),
+    read('risk-matrix-heatmap', '/api/risks/matrix/heatmap/', 2, is_image('image/svg+xml', b'<svg')),
+    read('risk-matrix-heatmap-residual', '/api/risks/matrix/heatmap/?axis=residual', 2,
+         is_image('image/svg+xml', b'<svg')),
+    read('risk-matrix-cell', '/api/risks/matrix/cell/?axis=inherent&probability=3&impact=3', 6, is_cell),
+    read('risk-export', '/api/risks/export/?export_format=ndjson', 2, is_export),
+    read('control-list', '/api/controls/', 4, is_page_of(Control.objects.all())),
+    read('control-detail', '/api/controls/{control}/', 3, is_detail('control')),
+    read('control-my-controls', '/api/controls/my_controls/', 3, is_assigned_to_user),
+    read('assessment-list', '/api/risk-assessments/', 4, is_assigned_page),
+    read('assessment-list-cursor', '/api/risk-assessments/?pagination=cursor', 3, is_assigned_page),
+    read('assessment-detail', '/api/risk-assessments/{assessment}/', 3, is_detail('assessment')),
+    read('assessment-pending', '/api/risk-assessments/pending/', 3, is_pending_reviews),
+    read('risk-type-list', '/api/risk-types/', 3, is_page_of(RiskType.objects.all())),
+    read('action-list', '/api/actions/', 3, is_page_of(Action.objects.all())),
+    read('user-list', '/api/users/', 3, is_page_of(get_user_model().objects.all())),
+    read('user-list-search', '/api/users/?search=bench', 3, is_user_search),
+    read('import-list', '/api/imports/', 3, is_page_of(ImportJob.objects.all())),
+    # Including the queries async views run on worker-thread connections
+    read('async-dashboard-stats', '/api/async/dashboard/stats/', 4, is_dashboard),
+    read('async-risk-matrix', '/api/async/risks/matrix/', 3, is_matrix_counts),
+    read('async-workspace', '/api/async/workspace/', 5, is_workspace),
+]
+
+
+def format_path(path, register):
+    return path.format(**{name: getattr(obj, 'pk', None) for name, obj in register.items()})
+
+
+def consume(response):
+    # Streaming responses do their work while being iterated
+    if response.streaming:
+        response.consumed = b''.join(response.streaming_content)
+    return response
+
+
+@pytest.mark.parametrize('name,path,budget,check', READS)
+def test_read(benchmark, client, register, name, path, budget, check):
+    path = format_path(path, register)
+    response, queries = benchmark.measure(name, lambda: consume(client.get(path)))
+    assert response.status_code == 200
+    assert queries <= budget, f'{name} ran {queries} queries (budget {budget})'
+    check(response, register)
+
+
+def test_cache_stats(benchmark, admin_client):
+    response, queries = benchmark.measure('cache-stats', lambda: admin_client.get('/api/cache/stats/'))
+    assert response.status_code == 200
+    assert queries <= 1
+    assert set(response.data['users']) == {'hits', 'misses', 'hit_ratio', 'timeout'}
+
+
+@pytest.mark.parametrize('shared_cache', [False, True])
+def test_reference_data_timeout(settings, admin_client, shared_cache):
+    # A per-process cache only sees its own worker's invalidations
+    settings.SHARED_CACHE = shared_cache
+    expected = settings.REFERENCE_DATA_CACHE_TIMEOUT if shared_cache else settings.LOCAL_CACHE_TIMEOUT
+    stats = admin_client.get('/api/cache/stats/').data
+    assert [stats[name]['timeout'] for name in ('risk_types', 'actions', 'users')] == [expected] * 3
+
+
+def test_compression_stats(benchmark, admin_client):
+    response, queries = benchmark.measure(
+        'compression-stats', lambda: admin_client.get('/api/compression/stats/'))
+    assert response.status_code == 200
+    assert queries <= 1
+    assert isinstance(response.data, dict)
+
+
+def test_login(benchmark, register):
+    client = APIClient()
+    payload = {'username': register['user'].username, 'password': 'password'}
+    response, queries = benchmark.measure(
+        'auth-login', lambda: client.post('/api/auth/login/', payload, format='json'))
+    assert response.status_code == 200
+    assert queries <= 3
+    assert response.data['user']['id'] == register['user'].pk
+    assert RefreshToken(response.data['refresh'])['user_id'] == register['user'].pk
+
+
+def test_register(benchmark):
+    client = APIClient()
+    serial = count()
+
+    def register_user():
+        n = next(serial)
+        return client.post('/api/auth/register/', {
+            'username': f'new{n}', 'email': f'new{n}@example.com',
+            'password1': 'a-Long-passw0rd', 'password2': 'a-Long-passw0rd',
+            'first_name': 'New', 'last_name': 'User',
+        }, format='json')
+
+    response, queries = benchmark.measure('auth-register', register_user)
+    assert response.status_code == 201, response.data
+    # The username and email checks, the insert in its savepoint, and
+    # recording the refresh token
+    assert queries <= 6
+    user = get_user_model().objects.get(username='new0')
+    assert response.data['user']['id'] == user.pk and user.check_password('a-Long-passw0rd')
+
+
+def refresh_tokens(benchmark, user):
+    """A fresh refresh token for each call ``benchmark.measure()`` makes: each works once"""
+    return iter([str(RefreshToken.for_user(user)) for _ in range(benchmark.rounds + 1)])
+
+
+def test_refresh(benchmark, register):
+    client = APIClient()
+    tokens = refresh_tokens(benchmark, register['user'])
+    revocations.sync()
+    response, queries = benchmark.measure(
+        'auth-refresh', lambda: client.post('/api/auth/refresh/', {'refresh': next(tokens)}, format='json'))
+    assert response.status_code == 200
+    # Blacklisting the rotated token; the in-memory blacklist needs no sync
+    # for this process's own revocation
+    assert queries <= 2
+    assert AccessToken(response.data['access'])['user_id'] == register['user'].pk
+    assert RefreshToken(response.data['refresh'])['user_id'] == register['user'].pk
+
+
+def test_rotated_refresh_cannot_be_replayed(register):
+    client = APIClient()
+    refresh = str(RefreshToken.for_user(register['user']))
+    rotated = client.post('/api/auth/refresh/', {'refresh': refresh}, format='json')
+    assert rotated.status_code == 200
+    replayed = client.post('/api/auth/refresh/', {'refresh': refresh}, format='json')
+    assert replayed.status_code == 401
+    assert replayed.data['code'] == 'token_not_valid'
+    # The new one works, once
+    assert client.post('/api/auth/refresh/', {'refresh': rotated.data['refresh']}, format='json').status_code == 200
+
+
+def test_logout(benchmark, client, register):
+    tokens = refresh_tokens(benchmark, register['user'])
+    sent = []
+
+    def logout():
+        sent.append(next(tokens))
+        return client.post('/api/auth/logout/', {'refresh': sent[-1]}, format='json')
+
+    response, queries = benchmark.measure('auth-logout', logout)
+    assert response.status_code == 200
+    # Authentication, loading the blacklist, and blacklisting the token
+    assert queries <= 8
+    jtis = [RefreshToken(token, verify=False)['jti'] for token in sent]
+    assert BlacklistedToken.objects.filter(token__jti__in=jtis).count() == len(sent)
+
+
+def test_risk_create(benchmark, client, register):
+    payload = {
+        'description': 'Benchmark risk', 'inherent_probability': 3, 'inherent_impact': 4,
+        'residual_probability': 2, 'residual_impact': 2, 'owner_id': register['user'].pk,
+    }
+    response, queries = benchmark.measure(
+        'risk-create', lambda: client.post('/api/risks/', payload, format='json'))
+    assert response.status_code == 201, response.data
+    assert queries <= 3
+    risk = Risk.objects.get(pk=response.data['id'])
+    assert (risk.description, risk.inherent_risk_rating, risk.residual_risk_rating) == ('Benchmark risk', 12, 4)
+
+
+def test_risk_bulk_create(benchmark, client, register):
+    payload = [
+        {'description': f'Bulk risk {n}', 'inherent_probability': 2, 'inherent_impact': 2,
+         'owner_id': register['user'].pk}
+        for n in range(100)
+    ]
+    response, queries = benchmark.measure(
+        'risk-bulk-create', lambda: client.post('/api/risks/bulk/', payload, format='json'))
+    assert response.status_code == 201, response.data
+    assert queries <= 8
+    assert [item['description'] for item in response.data] == [item['description'] for item in payload]
+    assert Risk.objects.filter(pk__in=[item['id'] for item in response.data]).count() == 100
+
+
+def test_assessment_update(benchmark, client, register):
+    path = f"/api/risk-assessments/{register['assessment'].pk}/"
+    response, queries = benchmark.measure(
+        'assessment-update', lambda: client.patch(path, {'assessment_status': 'A'}, format='json'))
+    assert response.status_code == 200, response.data
+    assert queries <= 5
+    assert RiskAssessment.objects.get(pk=register['assessment'].pk).assessment_status == 'A'
+
+
+def test_pending_reviews_walk_oldest_first(client, register):
+    user = register['user']
+    expected = list(RiskAssessment.objects.filter(assessor=user, assessment_status='P')
+                    .order_by('created_at', 'id').values_list('pk', flat=True))
+    seen, path = [], '/api/risk-assessments/pending/?page_size=5'
+    while path:
+        response = client.get(path)
+        assert response.status_code == 200
+        seen += [item['id'] for item in response.data['results']]
+        path = response.data['next']
+    assert seen == expected
@@ -0,0 +1,47 @@
+"""
+The async dashboard, matrix and workspace views against their sync
+counterparts: the same payloads, and the latency of each path in-process.
+Compare them under load with ``manage.py loadtest`` against uvicorn and a
+WSGI server (see the README).
+"""
+import json
+
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('name,sync_path,async_path', [
+    ('dashboard-stats', '/api/dashboard/stats/', '/api/async/dashboard/stats/'),
+    ('risk-matrix-counts', '/api/risks/matrix/?mode=counts', '/api/async/risks/matrix/'),
+    ('risk-matrix-counts-high', '/api/risks/matrix/?mode=counts&risk_level=high',
+     '/api/async/risks/matrix/?risk_level=high'),
+])
+def test_same_payload(benchmark, client, name, sync_path, async_path):
+    sync_response, _ = benchmark.measure(f'{name}-sync', lambda: client.get(sync_path))
+    async_response, _ = benchmark.measure(f'{name}-async', lambda: client.get(async_path))
+    assert async_response.status_code == 200
+    assert json.loads(async_response.content) == json.loads(sync_response.content)
+
+
+def test_workspace_matches_my_items(client, register):
+    workspace = json.loads(client.get('/api/async/workspace/?expand=owner').content)
+    risks = json.loads(client.get('/api/risks/my_risks/?expand=owner').content)
+    controls = json.loads(client.get('/api/controls/my_controls/?expand=owner').content)
+    assert workspace['risks'] == risks
+    assert workspace['controls'] == controls
+    assert all(item['assessment_status'] == 'P' for item in workspace['assessments'])
+
+
+def test_conditional_get(client):
+    response = client.get('/api/async/risks/matrix/')
+    response = client.get('/api/async/risks/matrix/', HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == 304
+
+
+def test_requires_authentication():
+    from rest_framework.test import APIClient
+    assert APIClient().get('/api/async/workspace/').status_code == 401
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+    assert client.get('/api/async/dashboard/stats/').status_code == 401
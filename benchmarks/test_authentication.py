@@ -0,0 +1,266 @@
+"""
+Stateless JWT authentication against the stock class: no user query once
+the token version is cached, and revocation when a claimed field changes,
+whether by save() or QuerySet.update(); the claims user is read-only.
+Logins by username or email: one query and one password hash each.
+Blacklisted refresh tokens are rejected from memory, and expired tokens pruned.
+"""
+import io
+from datetime import timedelta
+
+from unittest import mock
+
+import pytest
+from django.contrib.auth import base_user
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Max
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from accounts.models import CustomUser
+from accounts.serializers import RegisterSerializer
+from prudence.authentication import JWTAuthentication, RefreshToken, StatelessJWTAuthentication, full_user
+from prudence.revocation import SYNC_LOOKBACK, revocation_cache, revocations
+
+pytestmark = pytest.mark.django_db
+
+
+def bearer(user):
+    token = RefreshToken.for_user(user).access_token
+    return Request(APIRequestFactory().get('/api/', HTTP_AUTHORIZATION=f'Bearer {token}'))
+
+
+def test_claims_user_needs_no_query(benchmark, register):
+    user = register['user']
+    request = bearer(user)
+    stateless = StatelessJWTAuthentication()
+
+    _, queries = benchmark.measure('auth-jwt', lambda: JWTAuthentication().authenticate(request))
+    assert queries == 1
+    (claimed, _), queries = benchmark.measure('auth-stateless', lambda: stateless.authenticate(request))
+    # Only the first call reads the token version
+    assert queries <= 1
+    with CaptureQueriesContext(connection) as captured:
+        stateless.authenticate(request)
+    assert len(captured) == 0
+
+    assert (claimed.pk, claimed.role, claimed.is_staff) == (user.pk, user.role, user.is_staff)
+    assert full_user(claimed).email == user.email
+
+
+@pytest.mark.parametrize('change', [{'role': 'L3'}, {'is_active': False}])
+def test_claim_change_revokes_tokens(register, change):
+    # A copy: the register's user is shared by the whole session
+    user = CustomUser.objects.get(pk=register['user'].pk)
+    request = bearer(user)
+    StatelessJWTAuthentication().authenticate(request)
+
+    for field, value in change.items():
+        setattr(user, field, value)
+    user.save()
+    with pytest.raises(AuthenticationFailed):
+        StatelessJWTAuthentication().authenticate(request)
+    # A token issued after the change carries the new version
+    if user.is_active:
+        claimed, _ = StatelessJWTAuthentication().authenticate(bearer(user))
+        assert claimed.role == 'L3'
+
+
+def test_last_login_keeps_tokens(register):
+    user = CustomUser.objects.get(pk=register['user'].pk)
+    request = bearer(user)
+    user.save(update_fields=['last_login'])
+    assert StatelessJWTAuthentication().authenticate(request)[0].pk == user.pk
+
+
+
+def test_queryset_update_revokes_tokens(register):
+    user = CustomUser.objects.get(pk=register['user'].pk)
+    request = bearer(user)
+    StatelessJWTAuthentication().authenticate(request)
+
+    CustomUser.objects.filter(pk=user.pk).update(role='L3')
+    with pytest.raises(AuthenticationFailed, match='revoked'):
+        StatelessJWTAuthentication().authenticate(request)
+    # Other fields leave the version alone
+    user.refresh_from_db()
+    request = bearer(user)
+    CustomUser.objects.filter(pk=user.pk).update(first_name='Renamed')
+    assert StatelessJWTAuthentication().authenticate(request)[0].role == 'L3'
+
+
+def test_published_version_is_the_stored_one(register):
+    user = CustomUser.objects.get(pk=register['user'].pk)
+    stale = CustomUser.objects.get(pk=user.pk)
+    versions = CustomUser.objects.values_list('token_version', flat=True)
+    # Another process revokes first
+    CustomUser.objects.filter(pk=user.pk).revoke_tokens()
+    # Saving a copy loaded before then does not roll the version back
+    stale.first_name = 'Stale'
+    stale.save()
+    assert versions.get(pk=user.pk) == stale.token_version + 1
+
+    user.role = 'L3'
+    user.save()
+    assert user.token_version == versions.get(pk=user.pk) == stale.token_version + 2
+    claimed, _ = StatelessJWTAuthentication().authenticate(bearer(user))
+    assert claimed.token_version == user.token_version
+
+
+def test_save_only_writes_changed_claims(register):
+    user = CustomUser.objects.get(pk=register['user'].pk)
+    stale = CustomUser.objects.get(pk=user.pk)
+    CustomUser.objects.filter(pk=user.pk).update(role='L3')
+
+    # No claim changed: one UPDATE, which leaves the other process's role
+    stale.first_name = 'Stale'
+    with CaptureQueriesContext(connection) as captured:
+        stale.save()
+    assert len(captured) == 1
+    assert CustomUser.objects.values_list('role', 'first_name').get(pk=user.pk) == ('L3', 'Stale')
+
+    # A changed claim is compared with the row and revokes
+    version = CustomUser.objects.values_list('token_version', flat=True).get(pk=user.pk)
+    stale.is_staff = not stale.is_staff
+    stale.save()
+    assert stale.token_version == version + 1
+    assert stale.changed_claims() == set()
+
+
+def test_claims_user_is_read_only(register):
+    claimed, _ = StatelessJWTAuthentication().authenticate(bearer(register['user']))
+    assert claimed.from_token_claims and claimed.email == ''
+    with pytest.raises(TypeError):
+        claimed.save()
+    with pytest.raises(TypeError):
+        claimed.delete()
+    assert CustomUser.objects.get(pk=claimed.pk).email == register['user'].email
+
+
+@pytest.mark.parametrize('name,field,password,status', [
+    ('auth-login-username', 'username', 'password', 200),
+    ('auth-login-email', 'email', 'password', 200),
+    ('auth-login-email-failed', 'email', 'wrong', 400),
+    ('auth-login-unknown', None, 'password', 400),
+])
+def test_login_hashes_once(benchmark, register, name, field, password, status):
+    user = register['user']
+    identifier = {'username': user.username, 'email': user.email.upper(), None: 'nobody'}[field]
+    payload = {'username': identifier, 'password': password}
+    client = APIClient()
+
+    with mock.patch.object(base_user, 'check_password', wraps=base_user.check_password) as check, \
+            mock.patch.object(base_user, 'make_password', wraps=base_user.make_password) as make:
+        response, queries = benchmark.measure(name, lambda: client.post('/api/auth/login/', payload, format='json'))
+        assert response.status_code == status
+        assert (check.call_count + make.call_count) == benchmark.rounds + 1
+    # The user lookup, and recording the issued refresh token
+    assert queries <= (2 if status == 200 else 1)
+
+
+def test_register_rejects_taken_email(register):
+    response = APIClient().post('/api/auth/register/', {
+        'username': 'someone-new', 'email': register['user'].email.upper(),
+        'password1': 'a-Long-passw0rd', 'password2': 'a-Long-passw0rd',
+    }, format='json')
+    assert response.status_code == 400
+    assert 'email' in response.data
+
+
+
+def test_register_race_for_email(register):
+    payload = {
+        'username': 'someone-new', 'email': 'Taken@example.com',
+        'password1': 'a-Long-passw0rd', 'password2': 'a-Long-passw0rd',
+    }
+    CustomUser.objects.create_user(username='first', email='taken@example.com')
+    # As if another request registered the email after the pre-check passed
+    with mock.patch.object(RegisterSerializer, 'validate_email', side_effect=lambda value: value):
+        response = APIClient().post('/api/auth/register/', payload, format='json')
+    assert response.status_code == 400
+    assert list(response.data) == ['email']
+    assert not CustomUser.objects.filter(username='someone-new').exists()
+
+def test_blacklisted_refresh_rejected_from_memory(benchmark, register):
+    refresh = str(RefreshToken.for_user(register['user']))
+    RefreshToken(refresh).blacklist()
+    # Picks up the cache version the blacklisting bumped
+    with pytest.raises(TokenError):
+        RefreshToken(refresh)
+
+    with CaptureQueriesContext(connection) as captured:
+        with pytest.raises(TokenError):
+            RefreshToken(refresh)
+    assert len(captured) == 0
+
+    valid = str(RefreshToken.for_user(register['user']))
+    benchmark.measure('refresh-token-check', lambda: RefreshToken(valid))
+
+
+def test_revocation_by_another_worker(register):
+    revocations.sync()
+    token = RefreshToken.for_user(register['user'])
+    # As another process would: a blacklist row and a bumped cache version
+    BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=token['jti']))
+    revocation_cache.invalidate()
+    with pytest.raises(TokenError):
+        RefreshToken(str(token))
+
+
+
+def test_own_revocation_does_not_hide_another_workers(register):
+    revocations.sync()
+    theirs, ours = RefreshToken.for_user(register['user']), RefreshToken.for_user(register['user'])
+    BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=theirs['jti']))
+    revocation_cache.invalidate()
+    ours.blacklist()
+    with pytest.raises(TokenError):
+        RefreshToken(str(theirs))
+    # Alone, this process's own revocation needs no sync
+    mine = RefreshToken.for_user(register['user'])
+    RefreshToken(str(mine))
+    mine.blacklist()
+    with CaptureQueriesContext(connection) as captured, pytest.raises(TokenError):
+        RefreshToken(str(mine))
+    assert len(captured) == 0
+
+def test_prune_tokens(register):
+    user = register['user']
+    now = aware_utcnow()
+    for n in range(5):
+        expired = OutstandingToken.objects.create(
+            user=user, jti=f'expired-{n}', token='', expires_at=now - timedelta(days=1))
+        BlacklistedToken.objects.create(token=expired)
+    live = str(RefreshToken.for_user(user))
+
+    call_command('prune_tokens', batch_size=2, stdout=io.StringIO())
+    assert not OutstandingToken.objects.filter(jti__startswith='expired-').exists()
+    assert not BlacklistedToken.objects.filter(token__jti__startswith='expired-').exists()
+    RefreshToken(live)
+
+
+def test_late_commit_below_lookback_is_reloaded(settings, register):
+    revocations.sync()
+    token = RefreshToken.for_user(register['user'])
+    outstanding = OutstandingToken.objects.get(jti=token['jti'])
+    filler = [OutstandingToken.objects.create(user=register['user'], jti=f'filler-{n}', token='',
+                                              expires_at=outstanding.expires_at)
+              for n in range(SYNC_LOOKBACK + 1)]
+    # Committed after a row more than SYNC_LOOKBACK ids above it was loaded
+    late_id = BlacklistedToken.objects.aggregate(last_id=Max('pk'))['last_id'] or 0
+    BlacklistedToken.objects.bulk_create(
+        [BlacklistedToken(pk=late_id + 2 + n, token=filler_token) for n, filler_token in enumerate(filler)])
+    revocation_cache.invalidate()
+    revocations.sync_if_stale()
+    BlacklistedToken.objects.create(pk=late_id + 1, token=outstanding)
+    revocation_cache.invalidate()
+
+    RefreshToken(str(token))
+    settings.TOKEN_REVOCATION_RELOAD_INTERVAL = 0
+    with pytest.raises(TokenError):
+        RefreshToken(str(token))
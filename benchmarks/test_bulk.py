@@ -0,0 +1,87 @@
+"""
+Bulk writes: errors reported per item, and nothing written unless every
+item is.
+"""
+from unittest import mock
+
+import pytest
+from django.db import IntegrityError
+
+from prudence.models import Control, Risk
+
+pytestmark = pytest.mark.django_db
+
+
+def risk_payload(register, n, **extra):
+    return {'description': f'Bulk {n}', 'inherent_probability': 2, 'inherent_impact': 3,
+            'owner_id': register['user'].pk, **extra}
+
+
+def test_create_errors_align_with_items(client, register):
+    before = Risk.objects.count()
+    payload = [
+        risk_payload(register, 0),
+        risk_payload(register, 1, inherent_probability=9),
+        risk_payload(register, 2),
+        risk_payload(register, 3, owner_id=10 ** 9, control_ids=[10 ** 9]),
+    ]
+    response = client.post('/api/risks/bulk/', payload, format='json')
+    assert response.status_code == 400
+    errors = response.data
+    assert len(errors) == 4
+    assert errors[0] == {} and errors[2] == {}
+    assert set(errors[1]) == {'inherent_probability'}
+    assert set(errors[3]) == {'owner_id', 'control_ids'}
+    assert Risk.objects.count() == before
+
+
+def test_update_rejects_duplicate_ids(client, register):
+    risk = register['risk']
+    payload = [{'id': risk.pk, 'description': 'First'}, {'id': risk.pk, 'description': 'Second'}]
+    response = client.patch('/api/risks/bulk/', payload, format='json')
+    assert response.status_code == 400
+    assert response.data[0] == {}
+    assert 'id' in response.data[1]
+    assert Risk.objects.get(pk=risk.pk).description == risk.description
+
+
+def test_update_reports_unknown_ids(client):
+    control = Control.objects.first()
+    response = client.patch('/api/controls/bulk/', [{'id': control.pk}, {'id': 10 ** 9}, {}], format='json')
+    assert response.status_code == 400
+    assert response.data[0] == {}
+    assert 'id' in response.data[1] and 'id' in response.data[2]
+
+
+def test_invalid_item_blocks_the_whole_update(client):
+    controls = list(Control.objects.order_by('id')[:3])
+    payload = [{'id': control.pk, 'name': 'Renamed'} for control in controls]
+    payload[2]['effectiveness'] = 0.3
+    response = client.patch('/api/controls/bulk/', payload, format='json')
+    assert response.status_code == 400
+    assert list(Control.objects.filter(pk__in=[c.pk for c in controls]).values_list('name', flat=True)) == [
+        control.name for control in controls]
+
+
+def test_failed_write_rolls_back(client, register):
+    before = Risk.objects.count()
+    control = Control.objects.first()
+    payload = [risk_payload(register, n, control_ids=[control.pk]) for n in range(3)]
+    # The risks are inserted, then linking their controls fails
+    with mock.patch.object(Risk.controls.through.objects, 'bulk_create', side_effect=IntegrityError):
+        with pytest.raises(IntegrityError):
+            client.post('/api/risks/bulk/', payload, format='json')
+    assert Risk.objects.count() == before
+
+
+def test_update_and_delete(client, register):
+    created = client.post('/api/risks/bulk/', [risk_payload(register, n) for n in range(3)], format='json').data
+    ids = [item['id'] for item in created]
+    response = client.patch('/api/risks/bulk/', [
+        {'id': pk, 'residual_probability': 4, 'residual_impact': 5} for pk in ids], format='json')
+    assert response.status_code == 200
+    assert {item['risk_level'] for item in response.data} == {'critical'}
+
+    response = client.delete('/api/risks/bulk/', {'ids': ids}, format='json')
+    assert response.data == {'deleted': 3}
+    assert not Risk.objects.filter(pk__in=ids).exists()
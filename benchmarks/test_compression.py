@@ -0,0 +1,137 @@
+"""
+Compressed sizes and the cost of compressing the largest API payloads, and
+compression staying out of the way of conditional GETs and streaming. Only
+API responses without secrets are compressed, and the middleware stack
+has no sync-only middleware to run in a thread under ASGI.
+"""
+import gzip
+import inspect
+import json
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.handlers.asgi import ASGIHandler
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from prudence import compression
+from prudence.compression import CompressionMiddleware, brotli, negotiate
+
+pytestmark = pytest.mark.django_db
+
+ENCODINGS = ['gzip', 'br'] if brotli is not None else ['gzip']
+
+
+def decompress(response):
+    body = b''.join(response.streaming_content) if response.streaming else response.content
+    encoding = response.get('Content-Encoding')
+    if encoding == 'br':
+        return brotli.decompress(body)
+    if encoding == 'gzip':
+        return gzip.decompress(body)
+    return body
+
+
+@pytest.mark.parametrize('name,path', [
+    ('risk-list', '/api/risks/?expand=owner,assessor,controls,risk_type'),
+    ('risk-matrix', '/api/risks/matrix/'),
+])
+@pytest.mark.parametrize('encoding', ENCODINGS)
+def test_compressed_payload(benchmark, client, name, path, encoding):
+    plain = client.get(path)
+    response, _ = benchmark.measure(
+        f'{name}-{encoding}', lambda: client.get(path, HTTP_ACCEPT_ENCODING=encoding))
+    assert response['Content-Encoding'] == encoding
+    assert 'Accept-Encoding' in response['Vary']
+    assert int(response['Content-Length']) < len(plain.content) / 3
+    assert json.loads(decompress(response)) == json.loads(plain.content)
+
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get('/api/dashboard/stats/', HTTP_ACCEPT_ENCODING='gzip')
+    assert not response.has_header('Content-Encoding')
+
+
+def test_conditional_get_matches_compressed_etag(client):
+    path = '/api/risks/'
+    response = client.get(path, HTTP_ACCEPT_ENCODING='gzip')
+    assert response['ETag'].startswith('W/')
+    response = client.get(path, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == 304
+    assert not response.has_header('Content-Encoding')
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+def test_streaming_export_is_compressed(client, encoding):
+    path = '/api/risks/export/?export_format=ndjson'
+    plain = b''.join(client.get(path).streaming_content)
+    response = client.get(path, HTTP_ACCEPT_ENCODING=encoding)
+    assert response.streaming
+    assert response['Content-Encoding'] == encoding
+    assert decompress(response) == plain
+
+
+@pytest.mark.parametrize('header,expected', [
+    ('gzip, deflate, br', 'br'),
+    ('gzip;q=1.0, br;q=0.5', 'gzip'),
+    ('br;q=0, gzip', 'gzip'),
+    ('identity', None),
+    ('*', 'br'),
+    ('', None),
+])
+def test_negotiate(header, expected):
+    assert negotiate(header, ('br', 'gzip')) == expected
+
+
+def big_json(request):
+    return HttpResponse(json.dumps(['x' * 100] * 100), content_type='application/json')
+
+
+@pytest.mark.parametrize('path,compressed', [
+    ('/api/risks/', True),
+    ('/api/auth/login/', False),
+    ('/risks/', False),
+])
+def test_only_api_responses_without_secrets(path, compressed):
+    request = RequestFactory().get(path, HTTP_ACCEPT_ENCODING='gzip')
+    response = CompressionMiddleware(big_json)(request)
+    assert response.has_header('Content-Encoding') is compressed
+
+
+def test_browsable_api_is_not_compressed(client):
+    response = client.get('/api/risks/', HTTP_ACCEPT='text/html', HTTP_ACCEPT_ENCODING='gzip')
+    assert response['Content-Type'].startswith('text/html')
+    assert not response.has_header('Content-Encoding')
+
+
+def test_async_middleware():
+    async def view(request):
+        return big_json(request)
+
+    middleware = CompressionMiddleware(view)
+    assert middleware.async_mode
+    response = async_to_sync(middleware)(RequestFactory().get('/api/risks/', HTTP_ACCEPT_ENCODING='gzip'))
+    assert json.loads(gzip.decompress(response.content)) == json.loads(big_json(None).content)
+
+
+def test_no_middleware_runs_in_a_thread_under_asgi():
+    # A sync-only middleware anywhere would leave the top of the stack
+    # wrapped in sync_to_async
+    assert inspect.iscoroutinefunction(ASGIHandler()._middleware_chain)
+
+
+def test_counters_from_many_threads(monkeypatch):
+    monkeypatch.setattr(compression, 'counters', {})
+
+    def work():
+        for _ in range(2000):
+            compression.record('gzip', 3, 1)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert compression.compression_stats()['gzip'] == {
+        'responses': 16000, 'bytes_in': 48000, 'bytes_out': 16000, 'saved_ratio': 0.6667}
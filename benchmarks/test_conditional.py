@@ -0,0 +1,111 @@
+"""
+Conditional GETs: 304 for an unchanged result, and a fresh ETag after any
+update or delete, including of rows older than the newest and of the
+related rows rendered through ?expand=.
+"""
+import pytest
+from django.utils import timezone
+from django.utils.http import http_date
+
+from prudence.models import Control, Risk, RiskAssessment
+
+pytestmark = pytest.mark.django_db
+
+
+def get(client, path, etag=None):
+    return client.get(path, **({'HTTP_IF_NONE_MATCH': etag} if etag else {}))
+
+
+@pytest.mark.parametrize('path', [
+    '/api/risks/', '/api/risks/{risk}/', '/api/risks/my_risks/', '/api/risks/matrix/?mode=counts',
+    '/api/controls/', '/api/controls/{control}/', '/api/controls/my_controls/',
+    '/api/risk-assessments/', '/api/risk-assessments/{assessment}/', '/api/risk-assessments/pending/',
+])
+def test_not_modified(client, register, path):
+    path = path.format(**{name: getattr(obj, 'pk', None) for name, obj in register.items()})
+    response = get(client, path)
+    assert response.status_code == 200
+    assert 'Last-Modified' not in response
+    assert get(client, path, response['ETag']).status_code == 304
+
+
+def test_if_modified_since_alone_is_not_trusted(client):
+    # Without Last-Modified, a date alone never short-circuits to 304
+    response = client.get('/api/risks/', HTTP_IF_MODIFIED_SINCE=http_date(timezone.now().timestamp() + 3600))
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('model,path', [(Risk, '/api/risks/'), (Control, '/api/controls/')])
+def test_delete_of_an_older_row_changes_etag(client, model, path):
+    etag = get(client, path)['ETag']
+    oldest = model.objects.order_by('updated_at', 'id').first()
+    oldest.delete()
+    response = get(client, path, etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+@pytest.mark.parametrize('model,path', [(Risk, '/api/risks/{pk}/'), (Control, '/api/controls/{pk}/')])
+def test_update_changes_etag(client, model, path):
+    obj = model.objects.order_by('id').first()
+    path = path.format(pk=obj.pk)
+    etag = get(client, path)['ETag']
+    obj.description = 'Changed'
+    obj.save()
+    response = get(client, path, etag)
+    assert response.status_code == 200
+    assert response.data['description'] == 'Changed'
+
+
+def test_expanded_risk_change_refreshes_assessment(client, register):
+    assessment = register['assessment']
+    path = f'/api/risk-assessments/{assessment.pk}/?expand=risk'
+    etag = get(client, path)['ETag']
+    Risk.objects.filter(pk=assessment.risk_id).update(description='Reworded', updated_at=timezone.now())
+    response = get(client, path, etag)
+    assert response.status_code == 200
+    assert response.data['risk']['description'] == 'Reworded'
+
+
+def test_pending_refreshes_after_review(client, register):
+    path = '/api/risk-assessments/pending/'
+    response = get(client, path)
+    first = RiskAssessment.objects.get(pk=response.data['results'][0]['id'])
+    first.assessment_status = 'A'
+    first.save()
+    response = get(client, path, response['ETag'])
+    assert response.status_code == 200
+    assert first.pk not in [item['id'] for item in response.data['results']]
+
+
+
+def rename(user):
+    user.first_name = 'Renamed'
+    user.save()
+
+
+@pytest.mark.parametrize('path,user', [
+    ('/api/risks/{risk}/?expand=owner,risk_type', lambda risk, assessment: risk.risk_owner),
+    ('/api/risks/?expand=owner,risk_type', lambda risk, assessment: risk.risk_owner),
+    ('/api/risks/{risk}/?expand=controls.owner', lambda risk, assessment: risk.controls.first().owner),
+    ('/api/risk-assessments/{assessment}/?expand=risk.owner', lambda risk, assessment: assessment.risk.risk_owner),
+])
+def test_expanded_user_change_refreshes(client, register, path, user):
+    risk = Risk.objects.filter(risk_owner__isnull=False, controls__owner__isnull=False).order_by('-created_at').first()
+    path = path.format(risk=risk.pk, assessment=register['assessment'].pk)
+    etag = get(client, path)['ETag']
+    rename(user(risk, register['assessment']))
+    response = get(client, path, etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+def test_expanded_risk_type_change_refreshes(client):
+    risk = Risk.objects.filter(risk_type__isnull=False).order_by('id').first()
+    path = f'/api/risks/{risk.pk}/?expand=risk_type'
+    etag = get(client, path)['ETag']
+    risk.risk_type.name = 'Renamed type'
+    risk.risk_type.save()
+    response = get(client, path, etag)
+    assert response.status_code == 200
+    assert response.data['risk_type']['name'] == 'Renamed type'
@@ -0,0 +1,53 @@
+"""
+The dashboard KPIs against counting each one separately, and their ETag
+after a write and their caching, with and without a shared cache.
+"""
+import pytest
+from django.db.models import Q
+
+from prudence.models import Control, Risk, RiskAssessment
+from prudence.stats import dashboard_cache
+
+pytestmark = pytest.mark.django_db
+
+
+def expected_stats(user):
+    return {
+        'total_risks': Risk.objects.count(),
+        'high_risks': Risk.objects.filter(risk_level__in=['high', 'critical']).count(),
+        'my_risks': Risk.objects.filter(Q(risk_owner=user) | Q(assessor=user)).count(),
+        'my_controls': Control.objects.filter(owner=user).count(),
+        'pending_assessments': RiskAssessment.objects.filter(assessor=user, assessment_status='P').count(),
+    }
+
+
+@pytest.mark.parametrize('path', ['/api/dashboard/stats/', '/api/async/dashboard/stats/'])
+def test_stats_match_separate_counts(client, register, path):
+    response = client.get(path)
+    assert response.json() == expected_stats(register['user'])
+
+
+@pytest.mark.parametrize('shared_cache', [False, True])
+def test_write_changes_etag(settings, client, register, shared_cache):
+    settings.SHARED_CACHE = shared_cache
+    response = client.get('/api/dashboard/stats/')
+    etag = response['ETag']
+    assert client.get('/api/dashboard/stats/', HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    Risk.objects.create(description='New risk', inherent_probability=1, inherent_impact=1,
+                        risk_owner=register['user'])
+    response = client.get('/api/dashboard/stats/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json() == expected_stats(register['user'])
+
+
+@pytest.mark.parametrize('path', ['/api/dashboard/stats/', '/api/async/dashboard/stats/'])
+def test_cached_without_shared_cache(settings, benchmark, client, register, path):
+    settings.SHARED_CACHE = False
+    client.get(path)
+    response, queries = benchmark.measure(f'dashboard-cached-{path.strip("/").replace("/", "-")}',
+                                          lambda: client.get(path))
+    assert response.json() == expected_stats(register['user'])
+    # Only authentication: the KPIs come from the per-process cache
+    assert queries == 1
+    assert dashboard_cache.entry_timeout == settings.LOCAL_CACHE_TIMEOUT
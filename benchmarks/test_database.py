@@ -0,0 +1,20 @@
+"""
+The SQLite profile's connection setup.
+"""
+import pytest
+from django.conf import settings
+from django.db import connection
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.skipif(connection.vendor != 'sqlite', reason='SQLite profile only')
+@pytest.mark.parametrize('pragma,expected', [
+    ('busy_timeout', settings.SQLITE_PRAGMAS['busy_timeout']),
+    # PRAGMA synchronous reads back NORMAL as 1
+    ('synchronous', 1),
+])
+def test_sqlite_pragmas(pragma, expected):
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA {pragma}')
+        assert cursor.fetchone()[0] == expected
@@ -0,0 +1,97 @@
+"""
+Register exports: their content and headers, the header sent before the
+query runs, and an export that stays a stream under ASGI.
+"""
+import csv
+import io
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from prudence import export
+from prudence.models import Risk
+
+pytestmark = pytest.mark.django_db
+
+
+def body(response):
+    return b''.join(response.streaming_content).decode()
+
+
+def test_csv_content_and_headers(client):
+    response = client.get('/api/risks/export/?columns=id,description,risk_level,owner&risk_level=high')
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'text/csv; charset=utf-8'
+    assert response['Content-Disposition'] == 'attachment; filename="risks.csv"'
+
+    rows = list(csv.reader(io.StringIO(body(response))))
+    assert rows[0] == ['id', 'description', 'risk_level', 'owner']
+    expected = Risk.objects.filter(risk_level='high').order_by('-created_at', '-id')
+    assert [row[0] for row in rows[1:]] == [str(pk) for pk in expected.values_list('pk', flat=True)]
+    first = expected.select_related('risk_owner').first()
+    assert rows[1] == [str(first.pk), first.description, 'high', first.risk_owner.username if first.risk_owner else '']
+
+
+def test_ndjson_content(client):
+    response = client.get('/api/risks/export/?export_format=ndjson&columns=id,residual_risk_rating')
+    assert response['Content-Type'] == 'application/x-ndjson'
+    assert response['Content-Disposition'] == 'attachment; filename="risks.ndjson"'
+    lines = [json.loads(line) for line in body(response).splitlines()]
+    assert len(lines) == Risk.objects.count()
+    risk = Risk.objects.get(pk=lines[0]['id'])
+    assert lines[0] == {'id': risk.pk, 'residual_risk_rating': None if risk.residual_risk_rating is None
+                        else str(risk.residual_risk_rating)}
+
+
+@pytest.mark.parametrize('export_format,expected', [('csv', 'id,description\r\n'), ('ndjson', '')])
+def test_empty_export(client, export_format, expected):
+    response = client.get(f'/api/risks/export/?export_format={export_format}&columns=id,description&owner=0')
+    assert response.status_code == 200
+    assert body(response) == expected
+
+
+def test_header_before_the_query(client):
+    response = client.get('/api/risks/export/?columns=id')
+    chunks = iter(response.streaming_content)
+    with CaptureQueriesContext(connection) as captured:
+        assert next(chunks) == b'id\r\n'
+    assert len(captured) == 0
+    assert len(next(chunks).splitlines()) == min(Risk.objects.count(), export.EXPORT_CHUNK_SIZE)
+
+
+@pytest.mark.parametrize('path', [
+    '/api/risks/export/?export_format=ndjson&columns=id',
+    '/api/risks/export/?columns=id',
+])
+def test_streams_under_asgi(client, register, monkeypatch, path):
+    monkeypatch.setattr(export, 'EXPORT_CHUNK_SIZE', 100)
+    token = RefreshToken.for_user(register['user']).access_token
+
+    async def fetch():
+        response = await AsyncClient().get(path, headers={'Authorization': f'Bearer {token}'})
+        # An async body is sent chunk by chunk instead of being collected first
+        assert response.is_async
+        return [chunk async for chunk in response.streaming_content]
+
+    chunks = async_to_sync(fetch)()
+    assert len(chunks) >= Risk.objects.count() // 100
+    assert b''.join(chunks).decode() == body(client.get(path))
+
+
+def test_compressed_under_asgi(client, register):
+    import gzip
+    path = '/api/risks/export/?export_format=ndjson'
+    token = RefreshToken.for_user(register['user']).access_token
+
+    async def fetch():
+        response = await AsyncClient().get(
+            path, headers={'Authorization': f'Bearer {token}', 'Accept-Encoding': 'gzip'})
+        assert response.is_async and response['Content-Encoding'] == 'gzip'
+        return b''.join([chunk async for chunk in response.streaming_content])
+
+    assert gzip.decompress(async_to_sync(fetch)()).decode() == body(client.get(path))
@@ -0,0 +1,63 @@
+"""
+``?fields=`` and ``?expand=`` on reads, and writes that carry them.
+"""
+import pytest
+
+from prudence.models import Risk
+
+pytestmark = pytest.mark.django_db
+
+
+def test_fields_limit_list_and_detail(client, register):
+    response = client.get('/api/risks/?fields=id,description,risk_level')
+    assert response.status_code == 200
+    assert all(set(item) == {'id', 'description', 'risk_level'} for item in response.data['results'])
+
+    response = client.get(f"/api/risks/{register['risk'].pk}/?fields=id,owner")
+    assert response.data == {'id': register['risk'].pk, 'owner': register['risk'].risk_owner_id}
+
+
+def test_unknown_fields_are_ignored(client):
+    response = client.get('/api/controls/?fields=id,nonexistent')
+    assert all(set(item) == {'id'} for item in response.data['results'])
+
+
+def test_expand_nests_relations(client, register):
+    risk = register['risk']
+    response = client.get(f'/api/risks/{risk.pk}/?expand=owner,controls.owner')
+    assert response.data['owner']['id'] == risk.risk_owner_id
+    assert response.data['owner']['username'] == risk.risk_owner.username
+    controls = {control.pk: control for control in risk.controls.all()}
+    assert {control['id'] for control in response.data['controls']} == set(controls)
+    for control in response.data['controls']:
+        owner = control['owner']
+        assert owner is None or owner['id'] == controls[control['id']].owner_id
+    # Relations left out of ?expand= stay primary keys
+    assert response.data['assessor'] == risk.assessor_id
+
+
+def test_nested_fields_untouched_by_fields(client, register):
+    response = client.get(f"/api/risks/{register['risk'].pk}/?fields=id,owner&expand=owner")
+    assert set(response.data) == {'id', 'owner'}
+    assert {'id', 'username'} <= set(response.data['owner'])
+
+
+def test_fields_do_not_limit_writes(client, register):
+    payload = {
+        'description': 'Written with a sparse fieldset', 'inherent_probability': 3, 'inherent_impact': 4,
+        'owner_id': register['user'].pk,
+    }
+    response = client.post('/api/risks/?fields=id', payload, format='json')
+    assert response.status_code == 201, response.data
+    risk = Risk.objects.get(pk=response.data['id'])
+    assert (risk.description, risk.inherent_probability, risk.risk_owner_id) == (
+        'Written with a sparse fieldset', 3, register['user'].pk)
+
+    # A required field missing from the payload is still reported
+    response = client.post('/api/risks/?fields=id', {'description': 'Incomplete'}, format='json')
+    assert response.status_code == 400
+    assert 'inherent_probability' in response.data
+
+    response = client.patch(f'/api/risks/{risk.pk}/?fields=id', {'description': 'Patched'}, format='json')
+    assert response.status_code == 200
+    assert Risk.objects.get(pk=risk.pk).description == 'Patched'
@@ -0,0 +1,65 @@
+"""
+The risk heatmap images: well-formed SVG with the chart's title and axes,
+drawn once per count vector, the HTML page embedding it, and the cost of
+drawing one next to serving it from the cache.
+"""
+from unittest import mock
+from xml.etree import ElementTree
+
+import pytest
+
+from prudence import heatmap as heatmaps
+from prudence import views
+from prudence.aggregates import risk_matrix_counts
+from prudence.models import Risk
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def cells(register):
+    return risk_matrix_counts(Risk.objects.all())['inherent']
+
+
+def test_svg_shows_every_count(cells):
+    svg = ElementTree.fromstring(heatmaps.heatmap(cells, 'inherent'))
+    namespace = '{http://www.w3.org/2000/svg}'
+    assert len(svg.findall(f'{namespace}rect')) == 25
+    title, *texts = [text.text for text in svg.findall(f'{namespace}text')]
+    assert title == 'Inherent risk matrix'
+    assert sum(int(text) for text in texts[:25]) == sum(cell['count'] for cell in cells)
+    assert texts[25:] == ['1', '2', '3', '4', '5', '5', '4', '3', '2', '1', 'Probability', 'Impact']
+
+
+def test_page_embeds_the_svg(rf, cells):
+    with mock.patch.object(views, 'render', side_effect=lambda request, template, context: context) as render:
+        context = views.risk_matrix(rf.get('/risk-matrix/'))
+    assert render.call_args.args[1] == 'risk_matrix.html'
+    assert context['risk_matrix_svg'] == heatmaps.heatmap(cells, 'inherent').decode()
+
+
+def test_drawn_once_per_count_vector(cells):
+    with mock.patch.object(heatmaps, 'render_svg', wraps=heatmaps.render_svg) as render_svg:
+        first = heatmaps.heatmap(cells, 'inherent')
+        assert heatmaps.heatmap(list(reversed(cells)), 'inherent') == first
+        assert render_svg.call_count == 1
+        changed = [{**cell, 'count': cell['count'] + 1} for cell in cells]
+        heatmaps.heatmap(changed, 'inherent')
+        assert render_svg.call_count == 2
+
+
+def test_not_modified(client):
+    response = client.get('/api/risks/matrix/heatmap/')
+    assert response['Content-Type'] == 'image/svg+xml'
+    again = client.get('/api/risks/matrix/heatmap/', HTTP_IF_NONE_MATCH=response['ETag'])
+    assert again.status_code == 304
+
+
+def test_invalid_axis(client):
+    assert client.get('/api/risks/matrix/heatmap/?axis=both').status_code == 400
+
+
+def test_draw_throughput(benchmark, cells):
+    grid = heatmaps.count_grid(cells)
+    benchmark.measure('heatmap-draw-svg', lambda: heatmaps.render_svg(grid, 'inherent'))
+    benchmark.measure('heatmap-cached-svg', lambda: heatmaps.heatmap(cells, 'inherent'))
@@ -0,0 +1,208 @@
+"""
+Chunked imports: one checkpoint per chunk, row errors by spreadsheet line,
+resuming after the last committed chunk, and jobs run outside the request
+by whoever claims them first.
+"""
+import csv
+import io
+import sys
+from unittest import mock
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from prudence import imports
+from prudence.imports import Importer, claim_job, run_import
+from prudence.models import ImportJob, Risk
+
+pytestmark = pytest.mark.django_db
+
+HEADER = ['description', 'inherent_probability', 'inherent_impact', 'owner']
+
+
+@pytest.fixture(autouse=True)
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+
+
+def risk_rows(register, count, prefix='Imported'):
+    owner = register['user'].username
+    return [[f'{prefix} {n}', 'High', 3, owner] for n in range(count)]
+
+
+def csv_job(rows, user=None, **fields):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([HEADER, *rows])
+    job = ImportJob(kind='risk', created_by=user, **fields)
+    job.file.save('risks.csv', ContentFile(buffer.getvalue().encode()))
+    return job
+
+
+def run(job, chunk_size=None):
+    assert claim_job(job, ('pending', 'failed'))
+    return run_import(job, chunk_size)
+
+
+def test_chunks_checkpoint_and_report_row_errors(register):
+    rows = risk_rows(register, 7)
+    rows[1][1] = '9'
+    rows[5][3] = 'nobody'
+    job = csv_job(rows)
+
+    with mock.patch.object(Importer, 'import_chunk', autospec=True, side_effect=Importer.import_chunk) as chunk:
+        run(job, chunk_size=3)
+    assert [call.args[2] for call in chunk.call_args_list] == [2, 5, 8]
+
+    job.refresh_from_db()
+    assert (job.status, job.rows_processed, job.rows_created, job.error_count) == ('completed', 7, 5, 2)
+    # Spreadsheet lines: the header is line 1
+    assert [error['line'] for error in job.row_errors] == [3, 7]
+    assert 'inherent_probability' in job.row_errors[0]['errors']
+    assert job.row_errors[1]['errors'] == {'owner': ['No user named "nobody".']}
+
+    imported = Risk.objects.filter(description__startswith='Imported ')
+    assert imported.count() == 5
+    # Labels are mapped to values and the ratings computed
+    risk = imported.get(description='Imported 0')
+    assert (risk.inherent_probability, risk.inherent_risk_rating, risk.risk_owner_id) == (4, 12, register['user'].pk)
+
+
+def test_queries_per_chunk_not_per_row(register):
+    # Few enough rows for one INSERT under SQLite's 999 parameters
+    small, large = csv_job(risk_rows(register, 10, 'Small')), csv_job(risk_rows(register, 50, 'Large'))
+    with CaptureQueriesContext(connection) as few:
+        run(small, chunk_size=100)
+    with CaptureQueriesContext(connection) as many:
+        run(large, chunk_size=100)
+    assert len(many) == len(few)
+
+
+def test_failed_import_resumes_after_last_chunk(register):
+    job = csv_job(risk_rows(register, 8, 'Resumed'))
+    calls = []
+    import_chunk = Importer.import_chunk
+
+    def fail_second_chunk(importer, rows, first_line):
+        calls.append(first_line)
+        if len(calls) == 2:
+            raise RuntimeError('Connection lost')
+        return import_chunk(importer, rows, first_line)
+
+    with mock.patch.object(Importer, 'import_chunk', autospec=True, side_effect=fail_second_chunk):
+        run(job, chunk_size=3)
+    job.refresh_from_db()
+    assert (job.status, job.failure, job.rows_processed) == ('failed', 'Connection lost', 3)
+    assert Risk.objects.filter(description__startswith='Resumed ').count() == 3
+
+    out = io.StringIO()
+    call_command('import_register', resume=job.pk, chunk_size=3, stdout=out)
+    assert 'starting at row 3' in out.getvalue()
+    job.refresh_from_db()
+    assert (job.status, job.rows_processed, job.rows_created) == ('completed', 8, 8)
+    descriptions = Risk.objects.filter(description__startswith='Resumed ').values_list('description', flat=True)
+    assert sorted(descriptions) == sorted(f'Resumed {n}' for n in range(8))
+
+
+def test_command_will_not_run_a_claimed_job(register):
+    job = csv_job(risk_rows(register, 2, 'Claimed'), status='running')
+    with pytest.raises(CommandError, match='is running'):
+        call_command('import_register', resume=job.pk, stdout=io.StringIO())
+    # A job left running by a process that died
+    call_command('import_register', resume=job.pk, force=True, stdout=io.StringIO())
+    job.refresh_from_db()
+    assert job.status == 'completed'
+
+    with pytest.raises(CommandError, match='is completed'):
+        call_command('import_register', resume=job.pk, stdout=io.StringIO())
+
+
+def test_claim_is_won_once(register):
+    job = csv_job(risk_rows(register, 1))
+    other = ImportJob.objects.get(pk=job.pk)
+    assert claim_job(job)
+    assert not claim_job(other)
+    assert job.status == 'running'
+
+
+def test_upload_runs_after_the_response(client, register, settings, django_capture_on_commit_callbacks):
+    settings.IMPORT_WORKERS = 0
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([HEADER, *risk_rows(register, 4, 'Uploaded')])
+    upload = ContentFile(buffer.getvalue().encode(), name='risks.csv')
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        response = client.post('/api/imports/', {'kind': 'risk', 'file': upload}, format='multipart')
+    assert response.status_code == 202
+    assert (response.data['status'], response.data['rows_processed']) == ('pending', 0)
+    assert callbacks == []
+    assert not Risk.objects.filter(description__startswith='Uploaded ').exists()
+
+    out = io.StringIO()
+    call_command('import_register', pending=True, stdout=out)
+    assert f"Import job {response.data['id']} completed: 4 rows processed, 4 created" in out.getvalue()
+    job = client.get(f"/api/imports/{response.data['id']}/").data
+    assert (job['status'], job['rows_created']) == ('completed', 4)
+
+
+def test_upload_is_handed_to_an_import_thread(client, register, settings, django_capture_on_commit_callbacks):
+    settings.IMPORT_WORKERS = 1
+    upload = ContentFile(','.join(HEADER).encode(), name='risks.csv')
+    executor = mock.Mock()
+    with mock.patch.object(imports, 'import_executor', return_value=executor), \
+            django_capture_on_commit_callbacks(execute=True):
+        response = client.post('/api/imports/', {'kind': 'risk', 'file': upload}, format='multipart')
+    assert response.status_code == 202
+    executor.submit.assert_called_once_with(imports.run_in_background, response.data['id'])
+
+
+@pytest.mark.parametrize('state,status', [('completed', 409), ('running', 409), ('pending', 409), ('failed', 202)])
+def test_resume_claims_failed_jobs_only(client, register, settings, state, status):
+    settings.IMPORT_WORKERS = 0
+    job = csv_job(risk_rows(register, 1), user=register['user'], status=state)
+    response = client.post(f'/api/imports/{job.pk}/resume/')
+    assert response.status_code == status
+    job.refresh_from_db()
+    if status == 202:
+        assert response.data['status'] == job.status == 'pending'
+        # The second request finds it pending
+        assert client.post(f'/api/imports/{job.pk}/resume/').status_code == 409
+    else:
+        assert state in response.data['detail']
+        assert job.status == state
+
+
+def test_xlsx_import(register):
+    openpyxl = pytest.importorskip('openpyxl')
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(HEADER)
+    for row in risk_rows(register, 3, 'Workbook'):
+        sheet.append(row)
+    sheet.append([None, None, None, None])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    job = ImportJob(kind='risk')
+    job.file.save('risks.xlsx', ContentFile(buffer.getvalue()))
+
+    run(job, chunk_size=2)
+    assert (job.status, job.rows_processed, job.rows_created) == ('completed', 3, 3)
+
+
+def test_xlsx_without_openpyxl_fails_the_job(register):
+    job = ImportJob(kind='risk')
+    job.file.save('risks.xlsx', ContentFile(b'PK'))
+    with mock.patch.dict(sys.modules, {'openpyxl': None}):
+        run(job)
+    assert (job.status, job.failure) == ('failed', 'XLSX imports need the openpyxl package')
+
+
+def test_xlsx_upload_without_openpyxl_is_rejected(client, register):
+    upload = ContentFile(b'PK', name='risks.xlsx')
+    with mock.patch.dict(sys.modules, {'openpyxl': None}):
+        response = client.post('/api/imports/', {'kind': 'risk', 'file': upload}, format='multipart')
+    assert response.status_code == 400
+    assert response.data['file'] == ['XLSX imports need the openpyxl package']
+    assert not ImportJob.objects.exists()
@@ -0,0 +1,147 @@
+"""
+The loadtest command against a stand-in server: statuses are counted as
+errors per scenario (a failed login is expected to answer 400), requests
+share keep-alive connections, and the report is written as JSON.
+"""
+import io
+import json
+import os
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from prudence.loadtest import Scenario, default_scenarios
+
+PASSWORD = 'secret'
+USER = {'id': 1, 'username': 'alice', 'email': 'alice@example.com'}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # path -> status, for every server started by the fixture
+    statuses = {}
+
+    def do_GET(self):
+        self.answer(self.statuses.get(self.path.split('?')[0], 200), {})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if self.path == '/api/auth/login/':
+            if body['password'] != PASSWORD:
+                return self.answer(400, {'non_field_errors': ['Invalid credentials']})
+            return self.answer(200, {'token': 'token', 'user': USER})
+        self.answer(201, body)
+
+    def answer(self, status, data):
+        self.server.connections.add(self.client_address)
+        if self.path != '/api/auth/login/' and self.headers['Authorization'] != 'Bearer token':
+            status, data = 401, {}
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def password(monkeypatch):
+    monkeypatch.setenv('LOADTEST_PASSWORD', PASSWORD)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.connections = set()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+    Handler.statuses = {}
+
+
+def loadtest(server, mix, requests=60, concurrency=3, **options):
+    out = io.StringIO()
+    call_command('loadtest', url=f'http://127.0.0.1:{server.server_port}', username='alice',
+                 requests=requests, concurrency=concurrency, seed=1, mix=mix, stdout=out, **options)
+    return out.getvalue()
+
+
+def test_failed_logins_are_expected(server, tmp_path):
+    mix = 'login-failed=1,login=1,dashboard=1,risk-list=0,matrix=0,my-risks=0,control-list=0,' \
+          'assessments=0,risk-create=0'
+    output = loadtest(server, mix, json=str(tmp_path / 'report.json'))
+
+    report = json.loads((tmp_path / 'report.json').read_text())
+    assert report['requests'] == 60
+    assert report['errors'] == 0
+    assert set(report['statuses']) == {'200', '400'}
+    assert report['statuses']['400'] == report['scenarios']['login-failed']['count'] > 0
+    assert '60 requests' in output and '0 errors' in output
+    # One keep-alive connection per worker, plus the initial login
+    assert len(server.connections) == 4
+
+
+def test_unexpected_statuses_are_errors(server, tmp_path):
+    Handler.statuses = {'/api/dashboard/stats/': 500}
+    mix = 'dashboard=1,control-list=1,risk-list=0,matrix=0,my-risks=0,assessments=0,risk-create=0'
+    loadtest(server, mix, json=str(tmp_path / 'report.json'))
+
+    report = json.loads((tmp_path / 'report.json').read_text())
+    scenarios = report['scenarios']
+    assert scenarios['dashboard']['errors'] == scenarios['dashboard']['count'] == report['statuses']['500']
+    assert scenarios['control-list']['errors'] == 0
+    assert report['errors'] == scenarios['dashboard']['count']
+
+
+def test_scenario_expectations():
+    assert Scenario('any', 1, 'GET', '/').succeeded(302)
+    assert not Scenario('any', 1, 'GET', '/').succeeded(404)
+    failed_login = {scenario.name: scenario for scenario in default_scenarios('x')}['login-failed']
+    assert failed_login.succeeded(400) and not failed_login.succeeded(200)
+
+
+def test_mix_and_login_errors(server):
+    with pytest.raises(CommandError, match="Unknown scenario 'nope'"):
+        loadtest(server, 'nope=1')
+    with pytest.raises(CommandError, match='no scenario with a positive weight'):
+        loadtest(server, ','.join(f'{scenario.name}=0' for scenario in default_scenarios()))
+    with pytest.raises(CommandError, match='Login failed with HTTP 400'):
+        with mock.patch.dict(os.environ, {'LOADTEST_PASSWORD': 'wrong'}):
+            loadtest(server, None, requests=1)
+    with pytest.raises(CommandError, match='--concurrency must be at least 1'):
+        loadtest(server, None, concurrency=0)
+
+
+def test_password_is_not_an_argument(server, monkeypatch):
+    with pytest.raises(CommandError, match='unrecognized arguments: --password'):
+        call_command('loadtest', '--username', 'alice', '--password', PASSWORD)
+
+    monkeypatch.delenv('LOADTEST_PASSWORD')
+    monkeypatch.setattr('sys.stdin.isatty', lambda: True)
+    with mock.patch('getpass.getpass', return_value=PASSWORD) as prompt:
+        output = loadtest(server, 'dashboard=1', requests=3)
+    prompt.assert_called_once_with('Password for alice: ')
+    assert '3 requests' in output and '0 errors' in output
+
+    monkeypatch.setattr('sys.stdin.isatty', lambda: False)
+    with pytest.raises(CommandError, match='Set LOADTEST_PASSWORD'):
+        loadtest(server, 'dashboard=1', requests=3)
+
+
+def test_expanded_lists_send_the_frontend_expansions():
+    scenarios = {scenario.name: scenario for scenario in default_scenarios()}
+    paths = {name: scenarios[name].build(random.Random(1), USER)[1]
+             for name in ('risk-list-expanded', 'control-list-expanded', 'assessments-expanded')}
+    assert paths['risk-list-expanded'].endswith('&expand=owner,assessor,controls,risk_type')
+    assert paths['control-list-expanded'] == '/api/controls/?expand=owner'
+    assert paths['assessments-expanded'] == '/api/risk-assessments/?expand=risk,assessor'
+    assert all(scenarios[name].weight > 0 for name in paths)
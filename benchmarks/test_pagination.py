@@ -0,0 +1,73 @@
+"""
+Keyset pages: a walk sees every row once while rows are being added, and
+parameters the cursor cannot follow are rejected.
+"""
+import pytest
+
+from prudence.models import Control, Risk
+
+pytestmark = pytest.mark.django_db
+
+
+def walk(client, path, during=lambda: None):
+    """The ids on every page from ``path``, calling ``during()`` between pages"""
+    seen = []
+    while path:
+        response = client.get(path)
+        assert response.status_code == 200, response.data
+        seen += [item['id'] for item in response.data['results']]
+        path = response.data['next']
+        during()
+    return seen
+
+
+@pytest.mark.parametrize('model,path', [
+    (Risk, '/api/risks/?pagination=cursor&page_size=50'),
+    (Control, '/api/controls/?pagination=cursor&page_size=7'),
+])
+def test_walk_under_concurrent_inserts(client, register, model, path):
+    # Rows sharing a timestamp are told apart by id
+    first = model.objects.order_by('created_at', 'id').first()
+    model.objects.filter(pk__in=list(model.objects.order_by('id').values_list('pk', flat=True)[:30])).update(
+        created_at=first.created_at)
+    expected = list(model.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+    def insert():
+        # Newer than the cursor, so the walk carries on where it was
+        if model is Risk:
+            Risk.objects.create(description='Added mid-walk', inherent_probability=1, inherent_impact=1)
+        else:
+            Control.objects.create(name='Added mid-walk', description='')
+
+    seen = walk(client, path, insert)
+    assert len(seen) == len(set(seen))
+    assert seen == expected
+
+
+@pytest.mark.parametrize('path', [
+    '/api/risks/?pagination=cursor&ordering=-risk_level',
+    '/api/risks/?pagination=cursor&search=data',
+    '/api/controls/?cursor=abc&search=data',
+])
+def test_reordering_rejected_with_cursor(client, path):
+    response = client.get(path)
+    assert response.status_code == 400
+    assert set(response.data) & {'ordering', 'search'}
+
+
+def test_search_is_paged_by_number(client):
+    # What the frontend's getRisksPage() sends once a search term is set
+    response = client.get('/api/risks/?expand=owner,assessor,controls,risk_type&search=data&page_size=5')
+    assert response.status_code == 200
+    assert 'page=2' in response.data['next']
+    second = client.get(response.data['next'])
+    assert second.status_code == 200
+    first_ids = {item['id'] for item in response.data['results']}
+    assert first_ids.isdisjoint(item['id'] for item in second.data['results'])
+
+
+def test_page_numbers_keep_ordering(client):
+    response = client.get('/api/risks/?ordering=-risk_level&fields=id,residual_risk_rating')
+    assert response.status_code == 200
+    ratings = [float(item['residual_risk_rating'] or 0) for item in response.data['results']]
+    assert ratings == sorted(ratings, reverse=True)
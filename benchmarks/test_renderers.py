@@ -0,0 +1,61 @@
+"""
+The orjson-backed renderer and parser against the stock REST framework ones
+on the largest payloads the API sends: a risk list page and the matrix.
+"""
+import io
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from rest_framework import parsers, renderers
+
+from prudence.parsers import JSONParser
+from prudence.renderers import JSONRenderer, orjson
+
+pytestmark = pytest.mark.django_db
+
+
+def payload(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    return response.data
+
+
+@pytest.mark.parametrize('name,path', [
+    ('risk-list', '/api/risks/?expand=owner,assessor,controls,risk_type'),
+    ('risk-matrix', '/api/risks/matrix/'),
+])
+def test_render(benchmark, client, name, path):
+    data = payload(client, path)
+    stock, fast = renderers.JSONRenderer(), JSONRenderer()
+    assert fast.render(data) == stock.render(data)
+
+    benchmark.measure(f'render-{name}-stock', lambda: stock.render(data))
+    benchmark.measure(f'render-{name}-orjson', lambda: fast.render(data))
+
+
+def test_parse(benchmark, client):
+    body = renderers.JSONRenderer().render(payload(client, '/api/risks/matrix/'))
+    stock, fast = parsers.JSONParser(), JSONParser()
+    assert fast.parse(io.BytesIO(body)) == stock.parse(io.BytesIO(body))
+
+    benchmark.measure('parse-risk-matrix-stock', lambda: stock.parse(io.BytesIO(body)))
+    benchmark.measure('parse-risk-matrix-orjson', lambda: fast.parse(io.BytesIO(body)))
+
+
+def test_native_types_render_like_stock():
+    data = {
+        'rating': Decimal('12.50'),
+        'created_at': datetime(2024, 5, 1, 9, 30, 15, 123456, tzinfo=timezone.utc),
+        'day': datetime(2024, 5, 1).date(),
+        'labels': {1: 'Very Low'},
+        'text': 'line\u2028separator',
+    }
+    assert JSONRenderer().render(data) == renderers.JSONRenderer().render(data)
+
+
+@pytest.mark.skipif(orjson is None, reason='orjson is not installed')
+def test_indent_falls_back_to_stock():
+    data = {'a': [1, 2]}
+    assert JSONRenderer().render(data, 'application/json; indent=4') == \
+        renderers.JSONRenderer().render(data, 'application/json; indent=4')
@@ -0,0 +1,71 @@
+"""
+The compiled read path against the serializers it replaces: the same JSON
+for every field set and expansion, and its throughput next to theirs.
+"""
+import json
+
+import pytest
+from rest_framework.test import APIRequestFactory
+from rest_framework.request import Request
+
+from accounts.models import CustomUser
+from accounts.serializers import UserSerializer
+from prudence.models import Control, Risk
+from prudence.representations import compiled_reader
+from prudence.serializers import ControlSerializer, RiskSerializer
+
+pytestmark = pytest.mark.django_db
+
+
+def api_request(query=''):
+    return Request(APIRequestFactory().get(f'/api/?{query}'))
+
+
+def both(serializer_class, queryset, query=''):
+    """The serializer's and the compiled reader's representation of ``queryset``"""
+    request = api_request(query)
+    queryset = serializer_class.optimize_queryset(queryset, request) \
+        if hasattr(serializer_class, 'optimize_queryset') else queryset
+    serialized = serializer_class(queryset, many=True, context={'request': request}).data
+    reader = compiled_reader(serializer_class, request)
+    assert reader is not None
+    compiled = reader.render(reader.values(queryset))
+    return json.loads(json.dumps(serialized, default=str)), json.loads(json.dumps(compiled, default=str))
+
+
+@pytest.mark.parametrize('query', [
+    '',
+    'fields=id,description,residual_rating',
+    'expand=owner,assessor,risk_type',
+    'expand=controls',
+    'expand=controls.owner,owner&fields=id,controls,owner,inherent_rating',
+])
+def test_risks_match_serializer(register, query):
+    serialized, compiled = both(RiskSerializer, Risk.objects.order_by('-created_at', '-id')[:50], query)
+    assert compiled == serialized
+
+
+@pytest.mark.parametrize('query', ['', 'expand=owner'])
+def test_controls_match_serializer(register, query):
+    serialized, compiled = both(ControlSerializer, Control.objects.order_by('-created_at', '-id')[:50], query)
+    assert compiled == serialized
+
+
+def test_users_match_serializer(register):
+    serialized, compiled = both(UserSerializer, CustomUser.objects.order_by('pk')[:50])
+    assert compiled == serialized
+
+
+@pytest.mark.parametrize('query', ['', 'expand=owner,assessor,controls,risk_type'])
+def test_risk_list_throughput(benchmark, register, query):
+    request = api_request(query)
+    queryset = RiskSerializer.optimize_queryset(Risk.objects.order_by('-created_at', '-id'), request)[:100]
+    reader = compiled_reader(RiskSerializer, request)
+    suffix = '-expanded' if query else ''
+
+    benchmark.measure(f'risk-page-serializer{suffix}', lambda: RiskSerializer(
+        queryset.all(), many=True, context={'request': request}).data)
+    benchmark.measure(f'risk-page-compiled{suffix}', lambda: reader.render(reader.values(queryset.all())))
+    results = benchmark.results
+    if 'p50_ms' in results[f'risk-page-compiled{suffix}']:
+        assert results[f'risk-page-compiled{suffix}']['p50_ms'] < results[f'risk-page-serializer{suffix}']['p50_ms']
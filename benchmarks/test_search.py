@@ -0,0 +1,63 @@
+"""
+Full-text search: ranked matches, and an index that follows every write
+path through the triggers the migrations install.
+"""
+import pytest
+from django.db import connection
+
+from accounts.models import CustomUser
+from prudence.models import Control, Risk
+
+pytestmark = pytest.mark.django_db
+
+
+def search_ids(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    return [item['id'] for item in response.data['results']]
+
+
+@pytest.mark.skipif(connection.vendor != 'sqlite', reason='SQLite FTS5 triggers')
+@pytest.mark.parametrize('table', ['prudence_risk', 'prudence_control', 'accounts_customuser'])
+def test_triggers_survive_migrations(table):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s", [table])
+        assert {name for name, in cursor.fetchall()} == {f'{table}_fts_{suffix}' for suffix in ('ai', 'ad', 'au')}
+
+
+def test_ranked_matches(client):
+    strong = Risk.objects.create(description='Zebrafish zebrafish zebrafish outbreak', inherent_probability=1,
+                                 inherent_impact=1)
+    weak = Risk.objects.create(description='A long description of many things that mentions a zebrafish once '
+                               'among plenty of other words about suppliers and contracts',
+                               inherent_probability=1, inherent_impact=1)
+    Risk.objects.create(description='Unrelated', inherent_probability=1, inherent_impact=1)
+
+    assert search_ids(client, '/api/risks/?search=zebrafish') == [strong.pk, weak.pk]
+    # Prefix matches, with every term required
+    assert search_ids(client, '/api/risks/?search=zebra outbreak') == [strong.pk]
+
+
+def test_index_follows_updates_and_deletes(client):
+    risk = Risk.objects.create(description='Quokka habitat loss', inherent_probability=1, inherent_impact=1)
+    assert search_ids(client, '/api/risks/?search=quokka') == [risk.pk]
+
+    Risk.objects.filter(pk=risk.pk).update(description='Wombat habitat loss')
+    assert search_ids(client, '/api/risks/?search=quokka') == []
+    assert search_ids(client, '/api/risks/?search=wombat') == [risk.pk]
+
+    risk.delete()
+    assert search_ids(client, '/api/risks/?search=wombat') == []
+
+
+def test_control_and_user_indexes(client):
+    control = Control.objects.create(name='Platypus review', description='Quarterly')
+    assert search_ids(client, '/api/controls/?search=platypus') == [control.pk]
+    control.name = 'Echidna review'
+    control.save()
+    assert search_ids(client, '/api/controls/?search=echidna') == [control.pk]
+
+    user = CustomUser.objects.create_user(username='numbat', password='password', first_name='Nora')
+    assert search_ids(client, '/api/users/?search=nora') == [user.pk]
+    user.delete()
+    assert search_ids(client, '/api/users/?search=nora') == []
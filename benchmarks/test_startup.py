@@ -0,0 +1,43 @@
+"""
+The cold start budget: a fresh worker-like process must come up within
+``STARTUP_TIME_BUDGET_MS`` and ``STARTUP_RSS_BUDGET_MB`` without loading
+any of the heavy optional modules.
+"""
+import pytest
+from django.conf import settings
+
+from prudence.startup import HEAVY_MODULES, parse_importtime, profile_startup
+
+
+@pytest.fixture(scope='module')
+def profile():
+    return profile_startup()
+
+
+def test_startup_within_budget(benchmark, profile):
+    benchmark.results['startup'] = {key: profile[key] for key in ('wall_ms', 'import_ms', 'max_rss_mb')}
+    assert profile['wall_ms'] <= settings.STARTUP_TIME_BUDGET_MS, profile['wall_ms']
+    if profile['max_rss_mb'] is not None:
+        assert profile['max_rss_mb'] <= settings.STARTUP_RSS_BUDGET_MB, profile['max_rss_mb']
+
+
+def test_profiles_the_asgi_application(profile):
+    # The application deployments serve, not the WSGI one
+    modules = {item['module'] for item in profile['imports']}
+    assert 'prudence.asgi' in modules and 'prudence.wsgi' not in modules
+
+
+def test_no_heavy_modules_at_startup(profile):
+    assert profile['heavy_modules'] == [], f'Import these lazily: {profile["heavy_modules"]} ({HEAVY_MODULES})'
+
+
+def test_parse_importtime():
+    imports = parse_importtime([
+        'import time: self [us] | cumulative | imported package',
+        'import time:       120 |        120 |   prudence.cache',
+        'import time:       300 |        420 | prudence.signals',
+    ])
+    assert imports == [
+        {'module': 'prudence.cache', 'depth': 1, 'self_ms': 0.12, 'cumulative_ms': 0.12},
+        {'module': 'prudence.signals', 'depth': 0, 'self_ms': 0.3, 'cumulative_ms': 0.42},
+    ]
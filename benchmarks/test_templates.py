@@ -0,0 +1,14 @@
+"""
+The risk level labels the server-rendered pages show.
+"""
+import pytest
+from django.template import Context, Template
+
+
+@pytest.mark.parametrize('rating,label', [
+    (1, 'Low'), (9, 'Low'), (10, 'Medium'), (15, 'High'), ('20.00', 'Critical'), (25, 'Critical'),
+    (None, 'Not assessed'), ('', 'Not assessed'),
+])
+def test_risk_level_label(rating, label):
+    template = Template('{% load risk_filters %}{{ rating|get_risk_level }}')
+    assert template.render(Context({'rating': rating})) == label
@@ -0,0 +1,99 @@
+"""
+The Server-Timing header and timing log of sampled requests, under WSGI
+and ASGI: every query is counted, whichever thread runs it, and the
+middleware has an async path for ASGI.
+"""
+import json
+import re
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.db import connection
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from prudence import timing
+from prudence.models import RiskType
+from prudence.timing import TimingMiddleware
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def sampled(settings):
+    settings.PERF_SAMPLE_RATE = 1.0
+    settings.PERF_SERVER_TIMING = True
+
+
+def phases(response):
+    """``{name: (milliseconds, query count or None)}`` from the Server-Timing header"""
+    timings = {}
+    for entry in response['Server-Timing'].split(', '):
+        name, duration, *desc = entry.split(';')
+        queries = re.fullmatch(r'desc="(\d+) queries"', desc[0]) if desc else None
+        timings[name] = (float(duration.removeprefix('dur=')), int(queries[1]) if queries else None)
+    return timings
+
+
+def test_server_timing(client, sampled):
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get('/api/risks/?expand=owner')
+    assert response.status_code == 200
+    timings = phases(response)
+    assert set(timings) == {'db', 'auth', 'serialize', 'render', 'total'}
+    assert timings['db'][1] == len(captured)
+    assert timings['total'][0] >= max(timings['db'][0], timings['serialize'][0])
+
+
+def test_counts_worker_thread_queries(client, sampled):
+    response = client.get('/api/async/workspace/')
+    # Authentication, then three list queries on worker-thread connections
+    # (new SQLite connections also time their SQLITE_PRAGMAS)
+    assert phases(response)['db'][1] >= 4
+
+
+def test_async_middleware(register, sampled):
+    async def view(request):
+        # On the sync thread, as a sync view's queries are under ASGI
+        count = await sync_to_async(RiskType.objects.count)()
+        return HttpResponse(str(count))
+
+    middleware = TimingMiddleware(view)
+    assert middleware.async_mode and iscoroutinefunction(middleware)
+    response = async_to_sync(middleware)(RequestFactory().get('/'))
+    assert phases(response)['db'][1] == 1
+
+
+def test_server_timing_under_asgi(register, sampled):
+    token = RefreshToken.for_user(register['user']).access_token
+
+    async def fetch():
+        return await AsyncClient().get('/api/risks/', headers={'Authorization': f'Bearer {token}'})
+
+    response = async_to_sync(fetch)()
+    assert response.status_code == 200
+    # Authentication, the count and the page
+    assert phases(response)['db'][1] >= 3
+
+
+def test_logged_without_header(client, settings):
+    settings.PERF_SAMPLE_RATE = 1.0
+    settings.PERF_SERVER_TIMING = False
+    with mock.patch.object(timing.logger, 'info') as info:
+        response = client.get('/api/auth/user/')
+    assert 'Server-Timing' not in response
+    line = json.loads(info.call_args.args[0])
+    assert (line['method'], line['path'], line['status']) == ('GET', '/api/auth/user/', 200)
+    assert line['queries'] >= 1 and line['total_ms'] > 0
+
+
+def test_unsampled(client, settings):
+    settings.PERF_SAMPLE_RATE = 0.0
+    settings.PERF_SERVER_TIMING = True
+    with mock.patch.object(timing.logger, 'info') as info:
+        response = client.get('/api/auth/user/')
+    assert 'Server-Timing' not in response
+    assert not info.called
@@ -0,0 +1,8 @@
+# Command-line options must be registered by a conftest pytest loads at startup
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmarks')
+    group.addoption('--benchmark-json', metavar='PATH', help="Write benchmark results to PATH")
+    group.addoption('--benchmark-rounds', type=int, default=20, help="Timed calls per benchmark")
+    group.addoption('--benchmark-risks', type=int, default=1000, help="Size of the generated register")
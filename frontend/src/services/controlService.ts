@@ -1,6 +1,9 @@
 import { apiService } from './api';
 import { Control, ControlForm, ApiResponse } from '../types';
 
+// Relations come back as IDs unless expanded; the control pages render the owner
+const CONTROL_EXPAND = 'owner';
+
 class ControlService {
   async getControls(params?: {
     page?: number;
@@ -9,7 +12,7 @@ class ControlService {
     owner?: number;
     effectiveness?: number;
   }): Promise<ApiResponse<Control>> {
-    const queryParams = new URLSearchParams();
+    const queryParams = new URLSearchParams({ expand: CONTROL_EXPAND });
     if (params) {
       Object.entries(params).forEach(([key, value]) => {
         if (value !== undefined) {
@@ -22,7 +25,7 @@ class ControlService {
   }
 
   async getControl(id: number): Promise<Control> {
-    return apiService.get<Control>(`/controls/${id}/`);
+    return apiService.get<Control>(`/controls/${id}/?expand=${CONTROL_EXPAND}`);
   }
 
   async createControl(controlData: ControlForm): Promise<Control> {
@@ -38,7 +41,7 @@ class ControlService {
   }
 
   async getMyControls(): Promise<Control[]> {
-    return apiService.get<Control[]>('/controls/my-controls/');
+    return apiService.get<Control[]>(`/controls/my-controls/?expand=${CONTROL_EXPAND}`);
   }
 }
 
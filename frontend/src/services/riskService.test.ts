@@ -0,0 +1,32 @@
+import { apiService } from './api';
+import { riskService } from './riskService';
+
+jest.mock('./api', () => ({ apiService: { get: jest.fn() } }));
+
+const get = apiService.get as jest.Mock;
+
+function requested(): URLSearchParams {
+  const url: string = get.mock.calls[0][0];
+  return new URLSearchParams(url.split('?')[1]);
+}
+
+beforeEach(() => get.mockReset());
+
+test('pages the risk list by cursor', async () => {
+  get.mockResolvedValue({ results: [], next: null });
+  await riskService.getRisksPage({ cursor: 'abc', owner: 3 });
+  const params = requested();
+  expect(params.get('pagination')).toBe('cursor');
+  expect(params.get('cursor')).toBe('abc');
+  expect(params.get('owner')).toBe('3');
+});
+
+test('pages a search by number, which cursor pages reject', async () => {
+  get.mockResolvedValue({ results: [{ id: 1 }], count: 30, next: '/api/risks/?page=3&search=fire' });
+  const response = await riskService.getRisksPage({ search: 'fire', page: 2 });
+  const params = requested();
+  expect(params.get('pagination')).toBeNull();
+  expect(params.get('search')).toBe('fire');
+  expect(params.get('page')).toBe('2');
+  expect(response).toEqual({ results: [{ id: 1 }], next: '/api/risks/?page=3&search=fire' });
+});
@@ -1,5 +1,9 @@
 import { apiService } from './api';
-import { Risk, RiskForm, ApiResponse, RiskAssessment } from '../types';
+import { Risk, RiskForm, ApiResponse, CursorResponse, RiskAssessment, RiskMatrixCounts } from '../types';
+
+// Relations come back as IDs unless expanded; the risk pages render them nested
+const RISK_EXPAND = 'owner,assessor,controls,risk_type';
+const ASSESSMENT_EXPAND = 'risk,assessor';
 
 class RiskService {
   async getRisks(params?: {
@@ -10,7 +14,7 @@ class RiskService {
     assessor?: number;
     risk_type?: number;
   }): Promise<ApiResponse<Risk>> {
-    const queryParams = new URLSearchParams();
+    const queryParams = new URLSearchParams({ expand: RISK_EXPAND });
     if (params) {
       Object.entries(params).forEach(([key, value]) => {
         if (value !== undefined) {
@@ -22,8 +26,35 @@ class RiskService {
     return apiService.get<ApiResponse<Risk>>(url);
   }
 
+  // Cursor pages are newest first, so the API rejects ?search= with them (400).
+  // With a search term the relevance-ranked results are paged by number
+  // instead: `next` then carries a `page` rather than a `cursor`, and the
+  // following page is fetched by passing that `page` back.
+  async getRisksPage(params?: {
+    cursor?: string;
+    page?: number;
+    page_size?: number;
+    search?: string;
+    owner?: number;
+    assessor?: number;
+    risk_type?: number;
+  }): Promise<CursorResponse<Risk>> {
+    const { cursor, page, ...filters } = params ?? {};
+    if (filters.search) {
+      const response = await this.getRisks({ ...filters, page });
+      return { results: response.results, next: response.next ?? null };
+    }
+    const queryParams = new URLSearchParams({ pagination: 'cursor', expand: RISK_EXPAND });
+    Object.entries({ cursor, ...filters }).forEach(([key, value]) => {
+      if (value !== undefined) {
+        queryParams.append(key, value.toString());
+      }
+    });
+    return apiService.get<CursorResponse<Risk>>(`/risks/?${queryParams.toString()}`);
+  }
+
   async getRisk(id: number): Promise<Risk> {
-    return apiService.get<Risk>(`/risks/${id}/`);
+    return apiService.get<Risk>(`/risks/${id}/?expand=${RISK_EXPAND}`);
   }
 
   async createRisk(riskData: RiskForm): Promise<Risk> {
@@ -39,7 +70,7 @@ class RiskService {
   }
 
   async getMyRisks(): Promise<Risk[]> {
-    return apiService.get<Risk[]>('/risks/my-risks/');
+    return apiService.get<Risk[]>(`/risks/my-risks/?expand=${RISK_EXPAND}`);
   }
 
   async getRiskAssessments(params?: {
@@ -48,7 +79,7 @@ class RiskService {
     status?: string;
     assessor?: number;
   }): Promise<ApiResponse<RiskAssessment>> {
-    const queryParams = new URLSearchParams();
+    const queryParams = new URLSearchParams({ expand: ASSESSMENT_EXPAND });
     if (params) {
       Object.entries(params).forEach(([key, value]) => {
         if (value !== undefined) {
@@ -71,7 +102,45 @@ class RiskService {
     inherent: Array<{ x: number; y: number; risk: Risk }>;
     residual: Array<{ x: number; y: number; risk: Risk }>;
   }> {
-    return apiService.get('/risks/matrix/');
+    return apiService.get(`/risks/matrix/?expand=${RISK_EXPAND}`);
+  }
+
+  async getRiskMatrixCounts(params?: {
+    search?: string;
+    owner?: number;
+    assessor?: number;
+    risk_type?: number;
+  }): Promise<RiskMatrixCounts> {
+    const queryParams = new URLSearchParams({ mode: 'counts' });
+    if (params) {
+      Object.entries(params).forEach(([key, value]) => {
+        if (value !== undefined) {
+          queryParams.append(key, value.toString());
+        }
+      });
+    }
+    return apiService.get<RiskMatrixCounts>(`/risks/matrix/?${queryParams.toString()}`);
+  }
+
+  // Pass the filters the counts were fetched with, so the cell lists the risks it counted
+  async getRiskMatrixCell(params: {
+    axis: 'inherent' | 'residual';
+    probability: number;
+    impact: number;
+    page?: number;
+    page_size?: number;
+    search?: string;
+    owner?: number;
+    assessor?: number;
+    risk_type?: number;
+  }): Promise<ApiResponse<Risk>> {
+    const queryParams = new URLSearchParams({ expand: RISK_EXPAND });
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined) {
+        queryParams.append(key, value.toString());
+      }
+    });
+    return apiService.get<ApiResponse<Risk>>(`/risks/matrix/cell/?${queryParams.toString()}`);
   }
 
   async getDashboardStats(): Promise<{
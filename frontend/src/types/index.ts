@@ -108,6 +108,12 @@ export interface ApiResponse<T> {
   previous?: string;
 }
 
+// Keyset pagination: pass the `cursor` from `next` to fetch the following page
+export interface CursorResponse<T> {
+  results: T[];
+  next: string | null;
+}
+
 export interface ApiError {
   message: string;
   details?: Record<string, string[]>;
@@ -130,6 +136,24 @@ export interface RiskMatrixData {
   type: 'inherent' | 'residual';
 }
 
+export interface RiskMatrixCellCount {
+  x: number; // probability
+  y: number; // impact
+  count: number;
+}
+
+export interface RiskMatrixCounts {
+  inherent: RiskMatrixCellCount[];
+  residual: RiskMatrixCellCount[];
+  total: number;
+  unassessed: number;
+  // Risks whose scores fall outside the 5x5 grid, per axis
+  off_grid: {
+    inherent: number;
+    residual: number;
+  };
+}
+
 // Component Props Types
 export interface TableColumn<T> {
   key: keyof T | string;
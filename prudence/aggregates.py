@@ -0,0 +1,82 @@
+from django.db.models import Count
+
+from .models import PROBABILITY_CHOICES, IMPACT_CHOICES
+
+MATRIX_AXES = ('inherent', 'residual')
+PROBABILITY_LEVELS = [value for value, _ in PROBABILITY_CHOICES]
+IMPACT_LEVELS = [value for value, _ in IMPACT_CHOICES]
+
+
+def empty_matrix():
+    """Return a zeroed {(probability, impact): count} grid."""
+    return {
+        (probability, impact): 0
+        for probability in PROBABILITY_LEVELS
+        for impact in IMPACT_LEVELS
+    }
+
+
+def risk_matrix_counts(queryset):
+    """
+    Count risks per matrix cell for both the inherent and residual axes.
+
+    Runs a single GROUP BY over the four probability/impact columns and folds
+    the (at most 25 x 36) groups into two 5x5 grids in Python, so the cost is
+    independent of how many risks there are.
+
+    Every risk is accounted for on both axes: ``unassessed`` counts risks
+    without residual scores, and ``off_grid`` the risks of each axis whose
+    scores fall outside the grid, so that for either axis the cell counts
+    plus ``off_grid`` (plus ``unassessed`` for the residual axis) add up to
+    ``total``.
+    """
+    rows = (
+        queryset.order_by()
+        .values('inherent_probability', 'inherent_impact',
+                'residual_probability', 'residual_impact')
+        .annotate(count=Count('id'))
+    )
+
+    inherent = empty_matrix()
+    residual = empty_matrix()
+    total = 0
+    unassessed = 0
+    off_grid = {'inherent': 0, 'residual': 0}
+    for row in rows:
+        count = row['count']
+        total += count
+        inherent_cell = (row['inherent_probability'], row['inherent_impact'])
+        if inherent_cell in inherent:
+            inherent[inherent_cell] += count
+        else:
+            off_grid['inherent'] += count
+        residual_cell = (row['residual_probability'], row['residual_impact'])
+        if residual_cell in residual:
+            residual[residual_cell] += count
+        elif None in residual_cell:
+            unassessed += count
+        else:
+            off_grid['residual'] += count
+
+    return {
+        'inherent': _as_cells(inherent),
+        'residual': _as_cells(residual),
+        'total': total,
+        'unassessed': unassessed,
+        'off_grid': off_grid,
+    }
+
+
+def _as_cells(grid):
+    return [
+        {'x': probability, 'y': impact, 'count': count}
+        for (probability, impact), count in grid.items()
+    ]
+
+
+def matrix_cell_filter(axis, probability, impact):
+    """Return the queryset filter kwargs selecting the risks in one cell."""
+    return {
+        f'{axis}_probability': probability,
+        f'{axis}_impact': impact,
+    }
@@ -1,47 +1,117 @@
-from rest_framework import viewsets, status, permissions
+from rest_framework import mixins, viewsets, status, permissions
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.db.models import Q, Count
+from django.http import HttpResponse
 from django.contrib.auth import get_user_model
-from .models import Risk, Control, RiskAssessment, RiskType, Action
+from .models import Risk, Control, RiskAssessment, RiskType, Action, ImportJob
+from .aggregates import (
+    MATRIX_AXES, PROBABILITY_LEVELS, IMPACT_LEVELS,
+    risk_matrix_counts, matrix_cell_filter
+)
+from .pagination import QueueKeysetPagination, SelectablePagination
+from .search import risk_search, control_search, user_search
+from .conditional import ConditionalGetMixin, conditional_response, make_etag
+from .stats import dashboard_stats_for
+from .bulk import BulkViewMixin
+from .imports import queue_import, requeue_job
+from .export import EXPORT_CONTENT_TYPES, RISK_EXPORT_COLUMNS, select_columns, streaming_export
+from .representations import CompiledReadMixin
+from .compression import compression_stats
+from .heatmap import CONTENT_TYPE as HEATMAP_CONTENT_TYPE, heatmap
+from .cache import CachedReadMixin, risk_type_cache, action_cache, user_cache, cache_stats
 from .serializers import (
     RiskSerializer, ControlSerializer, RiskAssessmentSerializer,
-    RiskTypeSerializer, ActionSerializer, DashboardStatsSerializer
+    RiskTypeSerializer, ActionSerializer, DashboardStatsSerializer, ImportJobSerializer
 )
 from accounts.serializers import UserSerializer
 
 User = get_user_model()
 
 
-class RiskViewSet(viewsets.ModelViewSet):
+def id_param(params, name):
+    """The integer id in ``params[name]``, or ``None`` if it is not given"""
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: ['Expected an integer id.']})
+
+
+def filter_risks(queryset, params):
+    """
+    Apply the search/owner/assessor/risk_type/risk_level query parameters in
+    ``params``. Ids that are not integers raise a ``ValidationError`` (400).
+    """
+    # Filter by search
+    search = params.get('search')
+    if search:
+        queryset = risk_search.filter(queryset, search)
+    
+    # Filter by owner
+    owner = id_param(params, 'owner')
+    if owner is not None:
+        queryset = queryset.filter(risk_owner_id=owner)
+    
+    # Filter by assessor
+    assessor = id_param(params, 'assessor')
+    if assessor is not None:
+        queryset = queryset.filter(assessor_id=assessor)
+    
+    # Filter by risk type
+    risk_type = id_param(params, 'risk_type')
+    if risk_type is not None:
+        queryset = queryset.filter(risk_type_id=risk_type)
+    
+    # Filter by risk level, e.g. ?risk_level=high,critical
+    risk_level = params.get('risk_level')
+    if risk_level:
+        queryset = queryset.filter(risk_level__in=risk_level.split(','))
+    
+    return queryset
+
+
+class RiskViewSet(ConditionalGetMixin, CompiledReadMixin, BulkViewMixin, viewsets.ModelViewSet):
     serializer_class = RiskSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = SelectablePagination
+    # Read by the keyset pagination and the matrix
+    compiled_columns = ('created_at', 'inherent_probability', 'inherent_impact',
+                        'residual_probability', 'residual_impact')
+    # ?ordering= values and the indexed column each sorts on
+    ordering_fields = {
+        'risk_level': 'residual_risk_rating',
+        'residual_risk_rating': 'residual_risk_rating',
+        'inherent_risk_rating': 'inherent_risk_rating',
+        'created_at': 'created_at',
+    }
 
     def get_queryset(self):
-        queryset = Risk.objects.all().select_related('risk_owner', 'assessor', 'risk_type').prefetch_related('controls')
-        
-        # Filter by search
+        queryset = RiskSerializer.optimize_queryset(Risk.objects.all(), self.request)
+        queryset = self.filter_risks(queryset)
+
         search = self.request.query_params.get('search')
         if search:
-            queryset = queryset.filter(description__icontains=search)
-        
-        # Filter by owner
-        owner = self.request.query_params.get('owner')
-        if owner:
-            queryset = queryset.filter(risk_owner_id=owner)
-        
-        # Filter by assessor
-        assessor = self.request.query_params.get('assessor')
-        if assessor:
-            queryset = queryset.filter(assessor_id=assessor)
-        
-        # Filter by risk type
-        risk_type = self.request.query_params.get('risk_type')
-        if risk_type:
-            queryset = queryset.filter(risk_type_id=risk_type)
-        
-        return queryset.order_by('-created_at')
+            queryset = risk_search.rank(queryset, search)
+        return queryset.order_by(*self.get_ordering(search))
+
+    def get_ordering(self, search):
+        ordering = self.request.query_params.get('ordering', '')
+        field = self.ordering_fields.get(ordering.lstrip('-'))
+        if field:
+            return ('-' + field if ordering.startswith('-') else field, '-created_at')
+        # Rank full-text matches by relevance, newest first among equals
+        if search:
+            return ('-search_rank', '-created_at')
+        return ('-created_at',)
+
+    def filter_risks(self, queryset):
+        """Apply the search/owner/assessor/risk_type/risk_level query parameters"""
+        return filter_risks(queryset, self.request.query_params)
 
     @action(detail=False, methods=['get'])
     def my_risks(self, request):
@@ -49,16 +119,46 @@ class RiskViewSet(viewsets.ModelViewSet):
         risks = self.get_queryset().filter(
             Q(risk_owner=request.user) | Q(assessor=request.user)
         )
-        serializer = self.get_serializer(risks, many=True)
-        return Response(serializer.data)
+        return self.conditional(request, risks, lambda: self.compiled_list(
+            risks, lambda: Response(self.get_serializer(risks, many=True).data), paginate=False))
 
     @action(detail=False, methods=['get'])
     def matrix(self, request):
-        """Get risk matrix data for visualization"""
+        """Get risk matrix data for visualization
+
+        ``?mode=counts`` returns only the 5x5 cell counts; the risks in a cell
+        are fetched on demand from ``matrix/cell/``.
+        """
+        if request.query_params.get('mode') == 'counts':
+            risks = self.filter_risks(Risk.objects.all())
+            return self.conditional(request, risks, lambda: Response(risk_matrix_counts(risks)))
+
         risks = self.get_queryset()
+        return self.conditional(request, risks, lambda: self.matrix_response(risks))
+
+    def matrix_response(self, risks):
         inherent_data = []
         residual_data = []
-        
+
+        reader = self.get_compiled_reader()
+        if reader is not None:
+            rows = list(reader.values(risks, self.compiled_columns))
+            for row, risk_data in zip(rows, reader.render(rows)):
+                inherent_data.append({
+                    'x': row['inherent_probability'],
+                    'y': row['inherent_impact'],
+                    'risk': risk_data
+                })
+                residual_data.append({
+                    'x': row['residual_probability'],
+                    'y': row['residual_impact'],
+                    'risk': risk_data
+                })
+            return Response({
+                'inherent': inherent_data,
+                'residual': residual_data
+            })
+
         for risk in risks:
             risk_data = self.get_serializer(risk).data
             inherent_data.append({
@@ -77,20 +177,98 @@ class RiskViewSet(viewsets.ModelViewSet):
             'residual': residual_data
         })
 
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream the filtered register as CSV or NDJSON
+
+        ``?export_format=csv|ndjson`` picks the encoding and ``?columns=`` a
+        comma-separated subset of ``RISK_EXPORT_COLUMNS``; the list filters
+        apply unchanged.
+        """
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_CONTENT_TYPES:
+            return Response(
+                {'export_format': f"Must be one of: {', '.join(EXPORT_CONTENT_TYPES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        columns, unknown = select_columns(request.query_params.get('columns'), RISK_EXPORT_COLUMNS)
+        if unknown:
+            return Response(
+                {'columns': f"Unknown columns: {', '.join(unknown)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        risks = self.filter_risks(Risk.objects.all()).order_by('-created_at', '-id')
+        return streaming_export(request, risks, columns, RISK_EXPORT_COLUMNS, export_format, 'risks')
 
-class ControlViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'], url_path='matrix/heatmap')
+    def matrix_heatmap(self, request):
+        """The matrix cell counts as an SVG heatmap
+
+        ``?axis=inherent|residual`` picks the matrix and the list filters
+        apply. Images are cached by their counts and carry them in the ETag.
+        """
+        axis = request.query_params.get('axis', 'inherent')
+        if axis not in MATRIX_AXES:
+            return Response(
+                {'axis': f"Must be one of: {', '.join(MATRIX_AXES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        cells = risk_matrix_counts(self.filter_risks(Risk.objects.all()))[axis]
+        etag = make_etag(cells, axis)
+        return conditional_response(request, etag, None, lambda: HttpResponse(
+            heatmap(cells, axis), content_type=HEATMAP_CONTENT_TYPE))
+
+    @action(detail=False, methods=['get'], url_path='matrix/cell')
+    def matrix_cell(self, request):
+        """Paginated drill-down into the risks of a single matrix cell"""
+        axis = request.query_params.get('axis', 'inherent')
+        if axis not in MATRIX_AXES:
+            return Response(
+                {'axis': f"Must be one of: {', '.join(MATRIX_AXES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            probability = int(request.query_params.get('probability'))
+            impact = int(request.query_params.get('impact'))
+        except (TypeError, ValueError):
+            probability = impact = None
+        if probability not in PROBABILITY_LEVELS or impact not in IMPACT_LEVELS:
+            return Response(
+                {'detail': 'probability and impact must be integers between 1 and 5'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        risks = self.get_queryset().filter(**matrix_cell_filter(axis, probability, impact))
+        return self.conditional(request, risks, lambda: self.paginated_response(risks))
+
+    def paginated_response(self, queryset):
+        return self.compiled_list(queryset, lambda: self.serialized_page(queryset))
+
+    def serialized_page(self, queryset):
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+
+class ControlViewSet(ConditionalGetMixin, CompiledReadMixin, BulkViewMixin, viewsets.ModelViewSet):
     serializer_class = ControlSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = SelectablePagination
+    # Read by the keyset pagination
+    compiled_columns = ('created_at',)
 
     def get_queryset(self):
-        queryset = Control.objects.all().select_related('owner')
+        queryset = ControlSerializer.optimize_queryset(Control.objects.all(), self.request)
         
         # Filter by search
         search = self.request.query_params.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | Q(description__icontains=search)
-            )
+            queryset = control_search.filter(queryset, search)
         
         # Filter by owner
         owner = self.request.query_params.get('owner')
@@ -102,27 +280,32 @@ class ControlViewSet(viewsets.ModelViewSet):
         if effectiveness:
             queryset = queryset.filter(effectiveness=effectiveness)
         
+        if search:
+            return control_search.rank(queryset, search).order_by('-search_rank', '-created_at')
         return queryset.order_by('-created_at')
 
     @action(detail=False, methods=['get'])
     def my_controls(self, request):
         """Get controls assigned to the current user"""
         controls = self.get_queryset().filter(owner=request.user)
-        serializer = self.get_serializer(controls, many=True)
-        return Response(serializer.data)
+        return self.conditional(request, controls, lambda: self.compiled_list(
+            controls, lambda: Response(self.get_serializer(controls, many=True).data), paginate=False))
 
 
-class RiskAssessmentViewSet(viewsets.ModelViewSet):
+class RiskAssessmentViewSet(ConditionalGetMixin, CompiledReadMixin, viewsets.ModelViewSet):
     serializer_class = RiskAssessmentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = SelectablePagination
+    # Read by the keyset pagination
+    compiled_columns = ('created_at',)
 
     def get_queryset(self):
-        queryset = RiskAssessment.objects.all().select_related('risk', 'assessor')
+        queryset = RiskAssessmentSerializer.optimize_queryset(RiskAssessment.objects.all(), self.request)
         
         # Filter by status
         status_filter = self.request.query_params.get('status')
         if status_filter:
-            queryset = queryset.filter(status=status_filter)
+            queryset = queryset.filter(assessment_status=status_filter)
         
         # Filter by assessor
         assessor = self.request.query_params.get('assessor')
@@ -133,25 +316,76 @@ class RiskAssessmentViewSet(viewsets.ModelViewSet):
         if self.request.user.role == 'L2':
             queryset = queryset.filter(assessor=self.request.user)
         
-        return queryset.order_by('-created_at')
+        return queryset.order_by('-created_at', '-id')
 
+    @action(detail=False, methods=['get'], pagination_class=QueueKeysetPagination)
+    def pending(self, request):
+        """The current user's pending reviews, oldest first, in keyset pages
 
-class RiskTypeViewSet(viewsets.ReadOnlyModelViewSet):
+        Each page is a range scan on ``(assessor, assessment_status,
+        created_at, id)``, however many assessments there are.
+        """
+        reviews = RiskAssessmentSerializer.optimize_queryset(
+            RiskAssessment.objects.filter(assessor=request.user, assessment_status='P'), request)
+        return self.conditional(request, reviews, lambda: self.compiled_list(
+            reviews, lambda: self.get_paginated_response(
+                self.get_serializer(self.paginate_queryset(reviews), many=True).data)))
+
+
+class ImportJobViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Upload a CSV/XLSX file of risks or controls (``kind`` + ``file``, as
+    multipart form data). The job is accepted as ``pending`` and imported in
+    chunks after the response; poll it for progress and row errors. A failed
+    job is picked up from its last checkpoint with
+    ``POST /api/imports/{id}/resume/``.
+    """
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = ImportJob.objects.order_by('-created_at')
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(created_by=self.request.user)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
+    def perform_create(self, serializer):
+        queue_import(serializer.save(created_by=self.request.user))
+
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        job = self.get_object()
+        if not requeue_job(job):
+            return Response({'detail': f'Only a failed import can be resumed; this one is {job.status}.'},
+                            status=status.HTTP_409_CONFLICT)
+        queue_import(job)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class RiskTypeViewSet(CachedReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = RiskType.objects.all()
     serializer_class = RiskTypeSerializer
     permission_classes = [IsAuthenticated]
+    read_cache = risk_type_cache
 
 
-class ActionViewSet(viewsets.ReadOnlyModelViewSet):
+class ActionViewSet(CachedReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Action.objects.all()
     serializer_class = ActionSerializer
     permission_classes = [IsAuthenticated]
+    read_cache = action_cache
 
 
-class UserViewSet(viewsets.ReadOnlyModelViewSet):
+class UserViewSet(CachedReadMixin, CompiledReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
+    read_cache = user_cache
     
     def get_queryset(self):
         queryset = User.objects.all()
@@ -164,12 +398,8 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
         # Filter by search
         search = self.request.query_params.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(username__icontains=search) | 
-                Q(first_name__icontains=search) | 
-                Q(last_name__icontains=search) |
-                Q(email__icontains=search)
-            )
+            queryset = user_search.filter(queryset, search)
+            return user_search.rank(queryset, search).order_by('-search_rank', 'first_name', 'last_name')
         
         return queryset.order_by('first_name', 'last_name')
 
@@ -179,38 +409,22 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
 def dashboard_stats(request):
     """Get dashboard statistics"""
     user = request.user
-    
-    # Total risks
-    total_risks = Risk.objects.count()
-    
-    # High risk count (rating >= 15)
-    high_risks = Risk.objects.filter(
-        residual_probability__gte=3, residual_impact__gte=5
-    ).count() + Risk.objects.filter(
-        residual_probability__gte=5, residual_impact__gte=3
-    ).count()
-    
-    # Pending assessments for L2 users
-    pending_assessments = 0
-    if user.role == 'L2':
-        pending_assessments = RiskAssessment.objects.filter(
-            assessor=user, status='Pending'
-        ).count()
-    
-    # User's risks and controls
-    my_risks = Risk.objects.filter(
-        Q(risk_owner=user) | Q(assessor=user)
-    ).count()
-    
-    my_controls = Control.objects.filter(owner=user).count()
-    
-    stats = {
-        'total_risks': total_risks,
-        'high_risks': high_risks,
-        'pending_assessments': pending_assessments,
-        'my_risks': my_risks,
-        'my_controls': my_controls,
-    }
-    
-    serializer = DashboardStatsSerializer(stats)
-    return Response(serializer.data)
\ No newline at end of file
+    stats = DashboardStatsSerializer(dashboard_stats_for(user)).data
+    # Derived from the stats themselves, so a worker can only answer 304 for
+    # the stats it would have sent
+    etag = make_etag(stats, user.pk, user.role)
+    return conditional_response(request, etag, None, lambda: Response(stats))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats_view(request):
+    """Per-process hit/miss counters for each cache namespace"""
+    return Response(cache_stats())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def compression_stats_view(request):
+    """Per-process bytes before and after compression for each encoding"""
+    return Response(compression_stats())
@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class PrudenceConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "prudence"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .db import configure_sqlite
+        from .timing import install_query_timer
+        connection_created.connect(install_query_timer)
+        connection_created.connect(configure_sqlite)
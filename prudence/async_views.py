@@ -0,0 +1,125 @@
+"""
+Async versions of the dashboard, matrix and "my workspace" reads.
+
+These are plain Django async views. Under an ASGI server (``uvicorn
+prudence.asgi:application``) every middleware is async-capable, so the view
+coroutine itself runs on the event loop, but the blocking work does not:
+authentication and cache reads take a ``sync_to_async`` hop each, and each
+independent query runs in a worker thread on its own database connection,
+started together with ``concurrently()``. The response waits for the
+slowest query instead of the sum of all of them. Under WSGI, Django runs
+each view in an event loop of its own, which still overlaps the queries.
+Authentication goes through the REST framework authentication classes and
+the JSON through the API renderer, so clients see the same payloads as
+from the sync endpoints.
+"""
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.db.models import Count, Max, Q
+from django.http import HttpResponse
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .aggregates import risk_matrix_counts
+from .api_views import filter_risks
+from .conditional import conditional_response, make_etag
+from .models import Risk
+from .renderers import JSONRenderer
+from .representations import compiled_reader
+from .serializers import ControlSerializer, DashboardStatsSerializer, RiskAssessmentSerializer, RiskSerializer
+from .stats import dashboard_stats_for, my_controls, pending_assessments
+
+
+def in_worker(func, *args, **kwargs):
+    """Run ``func`` in a worker thread with a connection of its own"""
+    def call():
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(call, thread_sensitive=False)()
+
+
+async def concurrently(*calls):
+    """Run each ``(func, *args)`` in a worker thread at once; return their results in order"""
+    return await asyncio.gather(*(in_worker(*call) for call in calls))
+
+
+def json_response(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def authenticated(view):
+    """Authenticate like an ``IsAuthenticated`` REST framework view, then call the async view"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return json_response({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+        api_request = Request(request, authenticators=[
+            authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+        try:
+            user = await sync_to_async(lambda: api_request.user)()
+        except exceptions.AuthenticationFailed as exc:
+            return json_response({'detail': str(exc.detail)}, status=401)
+        if not user.is_authenticated:
+            return json_response({'detail': 'Authentication credentials were not provided.'}, status=401)
+        try:
+            return await view(api_request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            # As the REST framework's exception handler answers, e.g. a 400
+            # for a malformed filter
+            return json_response(exc.detail, status=exc.status_code)
+    return wrapper
+
+
+def rendered(serializer_class, request, queryset):
+    """``queryset`` rendered through the compiled read path, or the serializer"""
+    reader = compiled_reader(serializer_class, request)
+    if reader is None:
+        return serializer_class(queryset, many=True, context={'request': request}).data
+    return reader.render(reader.values(queryset))
+
+
+@authenticated
+async def dashboard_stats(request):
+    """``dashboard/stats/``, read through the cache in a worker thread"""
+    user = request.user
+    stats = await in_worker(dashboard_stats_for, user)
+    stats = DashboardStatsSerializer(stats).data
+    etag = make_etag(stats, user.pk, user.role)
+    return conditional_response(request, etag, None, lambda: json_response(stats))
+
+
+@authenticated
+async def risk_matrix(request):
+    """``risks/matrix/?mode=counts``, counting while the validators are read"""
+    risks = filter_risks(Risk.objects.all(), request.query_params)
+    summary, counts = await concurrently(
+        (lambda: risks.order_by().aggregate(last_modified=Max('updated_at'), count=Count('pk')),),
+        (risk_matrix_counts, risks),
+    )
+    # No Last-Modified: deleting an older risk leaves MAX(updated_at) unchanged
+    etag = make_etag(summary['last_modified'], summary['count'], request.get_full_path(), request.user.pk)
+    return conditional_response(request, etag, None, lambda: json_response(counts))
+
+
+@authenticated
+async def workspace(request):
+    """The current user's risks, controls and pending reviews, read concurrently"""
+    user = request.user
+    risks = filter_risks(RiskSerializer.optimize_queryset(Risk.objects.all(), request), request.query_params)
+    risks = risks.filter(Q(risk_owner=user) | Q(assessor=user))
+    controls = ControlSerializer.optimize_queryset(my_controls(user), request)
+    assessments = pending_assessments(user).order_by('-assessment_date', '-id')
+
+    risks, controls, assessments = await concurrently(
+        (rendered, RiskSerializer, request, risks.order_by('-created_at', '-id')),
+        (rendered, ControlSerializer, request, controls.order_by('-created_at', '-id')),
+        (rendered, RiskAssessmentSerializer, request, assessments),
+    )
+    return json_response({'risks': risks, 'controls': controls, 'assessments': assessments})
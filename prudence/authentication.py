@@ -0,0 +1,131 @@
+"""
+The REST framework authentication classes, timed for ``TimingMiddleware``.
+
+``StatelessJWTAuthentication`` is an optional drop-in for
+``JWTAuthentication`` that does not load the user row on every request.
+Tokens issued through ``RefreshToken.for_user()`` here carry the user's
+role, flags and ``token_version`` as signed claims, and the user is built
+from them. Changing any of those claims, by ``save()`` or by
+``QuerySet.update()``, bumps the user's token version, which revokes every
+token issued before; the current version is read
+through the cache, so only a cache miss costs a query.
+
+Refresh tokens are checked against the blacklist in ``revocations``, an
+in-memory copy kept in sync with simplejwt's blacklist table. A refresh
+token is blacklisted once it has been rotated, so it cannot be replayed.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework import authentication
+from rest_framework_simplejwt import authentication as jwt_authentication
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from accounts.models import REVOKING_FIELDS, TokenClaimsUser
+
+from .revocation import revocations
+from .timing import TimedAuthenticationMixin
+
+# User fields signed into tokens and trusted by StatelessJWTAuthentication
+CLAIM_FIELDS = (*REVOKING_FIELDS, 'token_version')
+
+
+class JWTAuthentication(TimedAuthenticationMixin, jwt_authentication.JWTAuthentication):
+    pass
+
+
+class SessionAuthentication(TimedAuthenticationMixin, authentication.SessionAuthentication):
+    pass
+
+
+def token_version_key(user_id):
+    return f'token_version:{user_id}'
+
+
+def remember_token_version(user_id, version):
+    cache.set(token_version_key(user_id), version, timeout=settings.TOKEN_VERSION_CACHE_TIMEOUT)
+
+
+def token_version(user_id):
+    """The user's current token version, or ``None`` if there is no such user"""
+    version = cache.get(token_version_key(user_id))
+    if version is None:
+        version = get_user_model().objects.filter(pk=user_id).values_list('token_version', flat=True).first()
+        if version is not None:
+            remember_token_version(user_id, version)
+    return version
+
+
+class RefreshToken(tokens.RefreshToken):
+    """
+    A refresh token whose access tokens carry the claims in ``CLAIM_FIELDS``,
+    checked against the in-memory blacklist.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for field in CLAIM_FIELDS:
+            token[field] = getattr(user, field)
+        return token
+
+    def check_blacklist(self):
+        if revocations.is_revoked(self.payload[jwt_settings.JTI_CLAIM]):
+            raise TokenError('Token is blacklisted')
+
+    def blacklist(self):
+        """
+        Blacklist this token in two queries when it is in the outstanding
+        list (as tokens from ``for_user()`` are): a token refreshed or logged
+        out twice at once is blacklisted once, without a second lookup.
+        """
+        jti = self.payload[jwt_settings.JTI_CLAIM]
+        token, _ = OutstandingToken.objects.get_or_create(
+            jti=jti, defaults={'token': str(self), 'expires_at': datetime_from_epoch(self.payload['exp'])})
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=token)], ignore_conflicts=True)
+        revocations.revoke(jti, self.payload['exp'])
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    token_class = RefreshToken
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds ``request.user`` from the token's claims.
+
+    The user is a read-only ``TokenClaimsUser`` with only the claimed fields
+    set, which is enough for permission checks and for filtering or
+    assigning by user; ``full_user()`` loads the row. Tokens issued
+    before the claims existed fall back to loading the user.
+    """
+
+    def get_user(self, validated_token):
+        if any(field not in validated_token for field in CLAIM_FIELDS):
+            return super().get_user(validated_token)
+
+        user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        version = token_version(user_id)
+        if version is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if version != validated_token['token_version']:
+            raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+        if not validated_token['is_active']:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+
+        user = TokenClaimsUser(pk=user_id, **{field: validated_token[field] for field in CLAIM_FIELDS})
+        user._state.adding = False
+        user._state.db = TokenClaimsUser.objects.db
+        return user
+
+
+def full_user(user):
+    """``user`` with every field loaded, for views that show more than its claims"""
+    if getattr(user, 'from_token_claims', False):
+        return get_user_model().objects.get(pk=user.pk)
+    return user
@@ -0,0 +1,148 @@
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .stats import dashboard_cache
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    Validates a list payload item by item and writes it in bulk.
+
+    Foreign keys listed in the child's ``bulk_references`` are checked with
+    one query per referenced model instead of one per item. Errors come back
+    as a list aligned with the payload (``{}`` for valid items). Writes are
+    delegated to the child's ``bulk_create`` / ``bulk_update``.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: ['Expected a list of items.']
+            })
+
+        validated, errors = [], []
+        for item in data:
+            try:
+                validated.append(self.child.run_validation(item))
+                errors.append({})
+            except ValidationError as exc:
+                validated.append(None)
+                errors.append(exc.detail)
+
+        for index, item_errors in self.check_references(validated).items():
+            errors[index].update(item_errors)
+
+        if any(errors):
+            raise ValidationError(errors)
+        return validated
+
+    def check_references(self, validated):
+        """Return ``{index: {field: [message]}}`` for references to missing rows"""
+        errors = {}
+        for field_name, key, model in getattr(self.child, 'bulk_references', ()):
+            wanted = set()
+            for item in validated:
+                if item is not None and item.get(key) is not None:
+                    value = item[key]
+                    wanted.update(value if isinstance(value, list) else [value])
+            if not wanted:
+                continue
+            existing = set(model.objects.filter(pk__in=wanted).values_list('pk', flat=True))
+            for index, item in enumerate(validated):
+                if item is None or item.get(key) is None:
+                    continue
+                value = item[key]
+                missing = [pk for pk in (value if isinstance(value, list) else [value])
+                           if pk not in existing]
+                if missing:
+                    errors.setdefault(index, {})[field_name] = [
+                        f'Invalid pk "{pk}" - object does not exist.' for pk in missing
+                    ]
+        return errors
+
+    def create(self, validated_data):
+        return self.child.bulk_create(validated_data)
+
+    def update(self, instances, validated_data):
+        return self.child.bulk_update(instances, validated_data)
+
+
+class BulkViewMixin:
+    """
+    ``/bulk/`` endpoint: POST a list to create, PATCH a list of objects with
+    ``id`` to update (each id at most once), DELETE ``{"ids": [...]}`` to
+    delete. Each request is validated as a whole and written in a single
+    transaction.
+    """
+
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def bulk(self, request):
+        if not isinstance(request.data, (list, dict)):
+            return Response({'detail': 'Expected a JSON body.'}, status=status.HTTP_400_BAD_REQUEST)
+        if request.method == 'POST':
+            return self.bulk_create(request)
+        if request.method == 'PATCH':
+            return self.bulk_update(request)
+        return self.bulk_destroy(request)
+
+    def check_bulk_size(self, items):
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'detail': 'Expected a non-empty list.'})
+        if len(items) > settings.BULK_MAX_ITEMS:
+            raise ValidationError({'detail': f'At most {settings.BULK_MAX_ITEMS} items per request.'})
+
+    def bulk_create(self, request):
+        self.check_bulk_size(request.data)
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            objects = serializer.save()
+        dashboard_cache.invalidate()
+        return Response(self.bulk_representation(objects), status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, request):
+        self.check_bulk_size(request.data)
+        ids = [item.get('id') if isinstance(item, dict) else None for item in request.data]
+        model = self.get_queryset().model
+        instances = model._default_manager.in_bulk([pk for pk in ids if isinstance(pk, int)])
+        id_errors, seen = [], set()
+        for pk in ids:
+            if pk not in instances:
+                id_errors.append({'id': ['An existing id is required.']})
+            elif pk in seen:
+                # Applying both would silently keep whichever came last
+                id_errors.append({'id': ['This id already appears earlier in the list.']})
+            else:
+                id_errors.append({})
+            seen.add(pk)
+        if any(id_errors):
+            raise ValidationError(id_errors)
+
+        serializer = self.get_serializer(
+            [instances[pk] for pk in ids], data=request.data, many=True, partial=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            objects = serializer.save()
+        dashboard_cache.invalidate()
+        return Response(self.bulk_representation(objects))
+
+    def bulk_destroy(self, request):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else request.data
+        self.check_bulk_size(ids)
+        if not all(isinstance(pk, int) for pk in ids):
+            raise ValidationError({'ids': ['Expected a list of integer ids.']})
+        model = self.get_queryset().model
+        with transaction.atomic():
+            _, deleted = model._default_manager.filter(pk__in=ids).delete()
+        return Response({'deleted': deleted.get(model._meta.label, 0)})
+
+    def bulk_representation(self, objects):
+        # Re-read through get_queryset so relations are fetched in batches
+        order = {obj.pk: index for index, obj in enumerate(objects)}
+        fresh = sorted(self.get_queryset().filter(pk__in=order), key=lambda obj: order[obj.pk])
+        return self.get_serializer(fresh, many=True).data
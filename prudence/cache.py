@@ -0,0 +1,133 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+# Every namespace, for the hit/miss report
+namespaces = {}
+
+
+class VersionedCache:
+    """
+    A cache namespace that is invalidated by bumping a version counter.
+
+    Every key in the namespace embeds the current version, so invalidating
+    is a single ``incr`` no matter how many per-user entries exist; stale
+    entries simply stop being read and age out through their timeout.
+    Hits and misses are counted per process to help tune timeouts.
+
+    An invalidation only reaches the other workers through a shared cache
+    (``SHARED_CACHE``). Otherwise entries live ``local_timeout`` seconds at
+    most, if given, which bounds how stale another worker's copy can be.
+    """
+
+    def __init__(self, namespace, timeout=None, local_timeout=None):
+        self.namespace = namespace
+        self.timeout = timeout
+        self.local_timeout = local_timeout
+        self.hits = 0
+        self.misses = 0
+        namespaces[namespace] = self
+
+    @property
+    def version_key(self):
+        return f'{self.namespace}:version'
+
+    def version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            # Start from a timestamp so a lost counter never resurrects
+            # entries written under an earlier version.
+            cache.add(self.version_key, time.time_ns(), timeout=None)
+            version = cache.get(self.version_key)
+        return version
+
+    @property
+    def entry_timeout(self):
+        if settings.SHARED_CACHE or self.local_timeout is None:
+            return self.timeout
+        return self.local_timeout if self.timeout is None else min(self.timeout, self.local_timeout)
+
+    def make_key(self, *parts):
+        return ':'.join([self.namespace, f'v{self.version()}', *map(str, parts)])
+
+    def get(self, *parts):
+        value = cache.get(self.make_key(*parts))
+        self.record(value is not None)
+        return value
+
+    def set(self, value, *parts):
+        cache.set(self.make_key(*parts), value, timeout=self.entry_timeout)
+
+    def get_or_set(self, parts, default):
+        """Return the cached value for ``parts``, computing it with ``default()`` on a miss."""
+        key = self.make_key(*parts)
+        value = cache.get(key)
+        self.record(value is not None)
+        if value is None:
+            value = default()
+            cache.set(key, value, timeout=self.entry_timeout)
+        return value
+
+    def invalidate(self):
+        """Bump the version, returning the new one"""
+        try:
+            return cache.incr(self.version_key)
+        except ValueError:
+            version = time.time_ns()
+            cache.set(self.version_key, version, timeout=None)
+            return version
+
+    def record(self, hit):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            'timeout': self.entry_timeout,
+        }
+
+
+def cache_stats():
+    return {name: namespace.stats() for name, namespace in sorted(namespaces.items())}
+
+
+risk_type_cache = VersionedCache(
+    'risk_types', timeout=settings.REFERENCE_DATA_CACHE_TIMEOUT, local_timeout=settings.LOCAL_CACHE_TIMEOUT)
+action_cache = VersionedCache(
+    'actions', timeout=settings.REFERENCE_DATA_CACHE_TIMEOUT, local_timeout=settings.LOCAL_CACHE_TIMEOUT)
+user_cache = VersionedCache(
+    'users', timeout=settings.REFERENCE_DATA_CACHE_TIMEOUT, local_timeout=settings.LOCAL_CACHE_TIMEOUT)
+
+
+class CachedReadMixin:
+    """
+    Serve ``list`` and ``retrieve`` from ``read_cache``, keyed on the full
+    request path, so rarely changing reference data skips the database.
+    """
+    read_cache = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(request, lambda: super(CachedReadMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(request, lambda: super(CachedReadMixin, self).retrieve(request, *args, **kwargs))
+
+    def cached(self, request, respond):
+        key = hashlib.md5(request.get_full_path().encode(), usedforsecurity=False).hexdigest()
+        data = self.read_cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = respond()
+        if response.status_code == 200:
+            self.read_cache.set(response.data, key)
+        return response
@@ -0,0 +1,204 @@
+"""
+Negotiated gzip / brotli compression of API responses.
+
+``CompressionMiddleware`` picks the best encoding the client accepts
+(brotli when the ``brotli`` package is installed, then gzip) and compresses
+responses of the ``COMPRESSIBLE_CONTENT_TYPES`` that are at least
+``COMPRESSION_MIN_SIZE`` bytes, under ``COMPRESSION_PATH_PREFIX`` only.
+HTML pages and the token-issuing auth endpoints are never compressed: a
+compressed body holding a secret next to input an attacker controls leaks
+the secret through its size (BREACH). Streaming responses such as the register
+export are compressed chunk by chunk and flushed after each one, so they
+keep streaming. ``304 Not Modified`` responses carry no body and pass
+through; compressed responses get a weak ETag, which ``If-None-Match``
+still matches. Bytes before and after compression are counted per encoding
+and reported by ``compression_stats()``.
+"""
+import gzip
+import threading
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from .timing import timed
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses whose body carries tokens (login, register, refresh)
+SECRET_PATH_PREFIXES = ('/api/auth/',)
+
+# encoding -> {'responses', 'bytes_in', 'bytes_out'}, per process
+counters = {}
+# Updated from every request thread
+counters_lock = threading.Lock()
+
+
+def record(encoding, bytes_in, bytes_out):
+    with counters_lock:
+        totals = counters.setdefault(encoding, {'responses': 0, 'bytes_in': 0, 'bytes_out': 0})
+        totals['responses'] += 1
+        totals['bytes_in'] += bytes_in
+        totals['bytes_out'] += bytes_out
+
+
+def compression_stats():
+    """Bytes before and after compression, and the share saved, per encoding"""
+    with counters_lock:
+        snapshot = {encoding: dict(totals) for encoding, totals in counters.items()}
+    return {
+        encoding: {
+            **totals,
+            'saved_ratio': round(1 - totals['bytes_out'] / totals['bytes_in'], 4) if totals['bytes_in'] else None,
+        }
+        for encoding, totals in sorted(snapshot.items())
+    }
+
+
+def accepted_encodings(header):
+    """Map each coding in an ``Accept-Encoding`` header to its q-value"""
+    accepted = {}
+    for part in header.split(','):
+        coding, *params = [item.strip() for item in part.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.lower()] = quality
+    return accepted
+
+
+def negotiate(header, available):
+    """The most preferred of ``available`` the client accepts, or ``None``"""
+    accepted = accepted_encodings(header)
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class Compressor:
+    """Incremental compression of one response body"""
+
+    def __init__(self, encoding, gzip_level, brotli_quality):
+        self.encoding = encoding
+        self.bytes_in = self.bytes_out = 0
+        if encoding == 'br':
+            self.compressor = brotli.Compressor(quality=brotli_quality)
+            self.compress = self.compressor.process
+            self.sync = self.compressor.flush
+            self.finish = self.compressor.finish
+        else:
+            self.compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.compress = self.compressor.compress
+            self.sync = lambda: self.compressor.flush(zlib.Z_SYNC_FLUSH)
+            self.finish = self.compressor.flush
+
+    def chunk(self, data):
+        """Compress ``data`` and flush, so the client can decode it right away"""
+        self.bytes_in += len(data)
+        compressed = self.compress(data) + self.sync()
+        self.bytes_out += len(compressed)
+        return compressed
+
+    def end(self):
+        compressed = self.finish()
+        self.bytes_out += len(compressed)
+        record(self.encoding, self.bytes_in, self.bytes_out)
+        return compressed
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.gzip_level = getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6)
+        self.brotli_quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4)
+        self.content_types = tuple(getattr(settings, 'COMPRESSIBLE_CONTENT_TYPES', ('application/json',)))
+        self.path_prefix = getattr(settings, 'COMPRESSION_PATH_PREFIX', '/api/')
+        self.available = ('br', 'gzip') if brotli is not None else ('gzip',)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if not self.compressible(request, response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.available)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            compress_stream = self.compress_async_stream if response.is_async else self.compress_stream
+            response.streaming_content = compress_stream(response.streaming_content, encoding)
+            del response['Content-Length']
+        else:
+            with timed('compress'):
+                compressed = self.compress_content(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            record(encoding, len(response.content), len(compressed))
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # The compressed body is a different representation of the same content
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    def compressible(self, request, response):
+        return (response.status_code == 200
+                and request.path.startswith(self.path_prefix)
+                and not request.path.startswith(SECRET_PATH_PREFIXES)
+                and not response.has_header('Content-Encoding')
+                and response.get('Content-Type', '').split(';')[0].strip() in self.content_types)
+
+    def compress_content(self, content, encoding):
+        if encoding == 'br':
+            return brotli.compress(content, quality=self.brotli_quality)
+        return gzip.compress(content, compresslevel=self.gzip_level, mtime=0)
+
+    def compress_stream(self, chunks, encoding):
+        compressor = Compressor(encoding, self.gzip_level, self.brotli_quality)
+        for chunk in chunks:
+            data = compressor.chunk(chunk)
+            if data:
+                yield data
+        yield compressor.end()
+
+    async def compress_async_stream(self, chunks, encoding):
+        compressor = Compressor(encoding, self.gzip_level, self.brotli_quality)
+        async for chunk in chunks:
+            data = compressor.chunk(chunk)
+            if data:
+                yield data
+        yield compressor.end()
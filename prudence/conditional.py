@@ -0,0 +1,107 @@
+import hashlib
+
+from django.db.models import Count, Max, Q
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+from .serializers import requested_fieldsets
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest())
+
+
+def conditional_response(request, etag, last_modified, respond):
+    """
+    Return ``304 Not Modified`` when the request's validators match, otherwise
+    call ``respond()`` and stamp the validators onto its response.
+    """
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    response = respond()
+    if response.status_code == 200:
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag support for list, detail and custom read actions.
+
+    The ETag comes from one ``MAX(updated_at), COUNT(*)`` over the filtered
+    queryset, the full request path and the requesting user, so an unchanged
+    result is answered with a 304 before anything is serialized. No
+    ``Last-Modified`` is sent: deleting any row but the newest leaves
+    ``MAX(updated_at)`` where it was, and only the count in the ETag notices.
+
+    Related rows rendered through ``?expand=`` are summarized too, with one
+    query per related model over the rows the queryset refers to. Models
+    without ``updated_at`` (users, risk types) are summarized by a digest of
+    the columns their serializer renders, so renaming one changes the ETag.
+    """
+    last_modified_field = 'updated_at'
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional(
+            request, queryset, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.get_queryset().filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return self.conditional(
+            request, queryset, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
+
+    def conditional(self, request, queryset, respond):
+        if request.method not in ('GET', 'HEAD'):
+            return respond()
+        return conditional_response(request, self.get_etag(request, queryset), None, respond)
+
+    def get_conditional_dependencies(self, request):
+        """``{serializer class: [lookup, ...]}`` for the related rows ``request`` expands"""
+        serializer_class = self.get_serializer_class()
+        if not hasattr(serializer_class, 'expanded_relations'):
+            return {}
+        dependencies = {}
+        for lookup, related_serializer in serializer_class.expanded_relations(*requested_fieldsets(request)):
+            dependencies.setdefault(related_serializer, []).append(lookup)
+        return dependencies
+
+    def get_etag(self, request, queryset):
+        summaries = [self.summarize(queryset)]
+        for serializer_class, lookups in self.get_conditional_dependencies(request).items():
+            summaries.append(self.summarize_related(queryset, serializer_class, lookups))
+        return make_etag(
+            summaries,
+            request.get_full_path(),
+            request.user.pk,
+            getattr(request.user, 'role', None),
+            getattr(request.accepted_renderer, 'format', None),
+        )
+
+    def summarize(self, queryset):
+        summary = queryset.order_by().aggregate(
+            last_modified=Max(self.last_modified_field), count=Count('pk'))
+        return summary['last_modified'], summary['count']
+
+    def summarize_related(self, queryset, serializer_class, lookups):
+        """Summarize the rows of ``serializer_class``'s model that ``queryset`` refers to through ``lookups``"""
+        model = serializer_class.Meta.model
+        referenced = Q()
+        for lookup in lookups:
+            referenced |= Q(pk__in=queryset.order_by().values(lookup))
+        rows = model.objects.filter(referenced)
+        if any(field.name == self.last_modified_field for field in model._meta.concrete_fields):
+            return self.summarize(rows)
+        # No modification time: digest what is rendered of them
+        columns = serializer_class.Meta.fields
+        if columns == '__all__':
+            columns = [field.attname for field in model._meta.concrete_fields]
+        digest = hashlib.md5(usedforsecurity=False)
+        for row in rows.order_by('pk').values_list(*columns):
+            digest.update(repr(row).encode())
+        return digest.hexdigest()
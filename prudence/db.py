@@ -0,0 +1,13 @@
+"""
+Per-connection setup for the database profiles in ``settings.py``.
+"""
+from django.conf import settings
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """``connection_created`` hook applying ``SQLITE_PRAGMAS`` to new SQLite connections"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
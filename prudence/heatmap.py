@@ -0,0 +1,84 @@
+"""
+Risk heatmap images drawn from the matrix cell counts.
+
+``heatmap()`` renders the 5x5 grid of ``risk_matrix_counts()`` as SVG
+text, with the title and axis labels of a chart, so it needs no plotting
+library and scales in the browser. The bytes are cached under the axis and
+count vector: every register with the same counts shares one image, and
+nothing has to be invalidated when risks change.
+"""
+import hashlib
+from html import escape
+
+from django.conf import settings
+
+from .aggregates import IMPACT_LEVELS, PROBABILITY_LEVELS
+from .cache import VersionedCache
+
+CONTENT_TYPE = 'image/svg+xml'
+
+heatmap_cache = VersionedCache('heatmaps', timeout=settings.HEATMAP_CACHE_TIMEOUT)
+
+# ColorBrewer "Reds", from no risks to the busiest cell
+COLOURS = ['#fff5f0', '#fee0d2', '#fcbba1', '#fc9272', '#fb6a4a', '#ef3b2c', '#cb181d', '#a50f15', '#67000d']
+# Counts on the darker shades are written in white
+DARK_FROM = 5
+
+
+def count_grid(cells):
+    """``{(probability, impact): count}`` from ``risk_matrix_counts()`` cells"""
+    grid = {(probability, impact): 0 for probability in PROBABILITY_LEVELS for impact in IMPACT_LEVELS}
+    for cell in cells:
+        grid[cell['x'], cell['y']] = cell['count']
+    return grid
+
+
+def shade(count, busiest):
+    """Index into ``COLOURS`` for a cell"""
+    if not count:
+        return 0
+    return 1 + round((len(COLOURS) - 2) * count / busiest)
+
+
+def heatmap(cells, axis):
+    """The SVG heatmap of ``cells`` as bytes, from the cache when drawn before"""
+    grid = count_grid(cells)
+    vector = ','.join(str(grid[key]) for key in sorted(grid))
+    digest = hashlib.md5(vector.encode(), usedforsecurity=False).hexdigest()
+    return heatmap_cache.get_or_set((axis, digest), lambda: render_svg(grid, axis))
+
+
+def render_svg(grid, axis, cell=64, margin=48, header=32):
+    busiest = max(grid.values()) or 1
+    size = margin + cell * len(PROBABILITY_LEVELS)
+    height = header + cell * len(IMPACT_LEVELS) + margin
+    title = f'{escape(axis.title())} risk matrix'
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size + 8}" height="{height}" '
+        f'viewBox="0 0 {size + 8} {height}" font-family="sans-serif" font-size="14">',
+        f'<title>{title}</title>',
+        f'<text x="{margin + cell * len(PROBABILITY_LEVELS) // 2}" y="20" text-anchor="middle" '
+        f'font-size="16" font-weight="bold">{title}</text>',
+    ]
+    for column, probability in enumerate(PROBABILITY_LEVELS):
+        for row, impact in enumerate(reversed(IMPACT_LEVELS)):
+            count = grid[probability, impact]
+            colour = shade(count, busiest)
+            x, y = margin + column * cell, header + row * cell
+            text = '#ffffff' if colour >= DARK_FROM else '#000000'
+            parts.append(
+                f'<rect x="{x}" y="{y}" width="{cell}" height="{cell}" fill="{COLOURS[colour]}" stroke="#ffffff"/>'
+                f'<text x="{x + cell // 2}" y="{y + cell // 2 + 5}" text-anchor="middle" fill="{text}">{count}</text>')
+    for index, probability in enumerate(PROBABILITY_LEVELS):
+        parts.append(f'<text x="{margin + index * cell + cell // 2}" y="{header + cell * len(IMPACT_LEVELS) + 20}" '
+                     f'text-anchor="middle">{probability}</text>')
+    for index, impact in enumerate(reversed(IMPACT_LEVELS)):
+        parts.append(f'<text x="{margin - 12}" y="{header + index * cell + cell // 2 + 5}" '
+                     f'text-anchor="end">{impact}</text>')
+    middle = header + cell * len(IMPACT_LEVELS) // 2
+    parts.append(f'<text x="{margin + cell * len(PROBABILITY_LEVELS) // 2}" y="{height - 8}" '
+                 f'text-anchor="middle">Probability</text>')
+    parts.append(f'<text x="14" y="{middle}" text-anchor="middle" transform="rotate(-90 14 {middle})">Impact</text>')
+    parts.append('</svg>')
+    return ''.join(parts).encode()
+
@@ -0,0 +1,309 @@
+"""
+Chunked, resumable imports of risks and controls from CSV or XLSX files.
+
+Rows are streamed from the upload and handled ``IMPORT_CHUNK_SIZE`` at a
+time: owner/assessor/risk-type names are resolved with one query per
+referenced model per chunk, each row is validated against the model fields
+and their choice sets, and the valid rows are written with ``bulk_create``.
+Every chunk commits together with the job's checkpoint, so a failed import
+resumes from the first uncommitted row.
+
+A run first claims its job with a conditional ``UPDATE`` from ``pending``
+(or ``failed``) to ``running``, so two runs can never process the same job.
+Jobs created over the API are run after the request, on a pool of
+``IMPORT_WORKERS`` threads in the web process, or by
+``manage.py import_register --pending`` when that is 0.
+"""
+import csv
+import io
+import importlib.util
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import PurePath
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import Control, ImportJob, Risk, RiskType
+from .stats import dashboard_cache
+
+logger = logging.getLogger("prudence")
+
+User = get_user_model()
+
+IMPORT_FORMATS = ('csv', 'xlsx')
+# Row errors kept on the job; the total is always counted in error_count
+MAX_STORED_ERRORS = 1000
+XLSX_UNAVAILABLE = 'XLSX imports need the openpyxl package'
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def import_format(filename):
+    suffix = PurePath(filename).suffix.lower().lstrip('.')
+    if suffix not in IMPORT_FORMATS:
+        raise ImportFormatError(f"Unsupported file type '.{suffix}', expected one of: {', '.join(IMPORT_FORMATS)}")
+    # Checked without importing it, which only the import itself should pay for
+    if suffix == 'xlsx' and importlib.util.find_spec('openpyxl') is None:
+        raise ImportFormatError(XLSX_UNAVAILABLE)
+    return suffix
+
+
+def normalise_header(name):
+    return str(name or '').strip().lower().replace(' ', '_')
+
+
+def read_rows(handle, file_format):
+    """Yield every data row of a binary file handle as a dict keyed on the normalised header"""
+    if file_format == 'xlsx':
+        yield from read_xlsx(handle)
+        return
+
+    reader = csv.reader(io.TextIOWrapper(handle, encoding='utf-8-sig', newline=''))
+    header = [normalise_header(name) for name in next(reader, [])]
+    for values in reader:
+        yield dict(zip(header, (value.strip() for value in values)))
+
+
+def read_xlsx(handle):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError(XLSX_UNAVAILABLE)
+
+    workbook = load_workbook(handle, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [normalise_header(name) for name in next(rows, ())]
+        for values in rows:
+            if any(value not in (None, '') for value in values):
+                yield dict(zip(header, ('' if value is None else str(value).strip() for value in values)))
+    finally:
+        workbook.close()
+
+
+def chunked(rows, size):
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Importer:
+    """
+    Turns one chunk of rows into model instances.
+
+    ``fields`` are copied from same-named columns; ``references`` maps a
+    column holding a name to ``(model, lookup, field)``.
+    """
+    model = None
+    fields = ()
+    references = {}
+
+    def resolve(self, rows):
+        """Map each referenced name in the chunk to a pk, one query per referenced model"""
+        resolved = {}
+        for column, (model, lookup, _) in self.references.items():
+            names = {row[column] for row in rows if row.get(column)}
+            resolved[column] = dict(
+                model.objects.filter(**{f'{lookup}__in': names}).values_list(lookup, 'pk')
+            ) if names else {}
+        return resolved
+
+    def build(self, row, resolved):
+        """Return ``(instance, errors)`` for one row"""
+        values, errors = {}, {}
+        for name in self.fields:
+            # Blank cells fall back to the model default
+            if row.get(name):
+                values[name] = self.parse_choice(name, row[name])
+
+        for column, (model, _, field_name) in self.references.items():
+            name = row.get(column)
+            if not name:
+                continue
+            pk = resolved[column].get(name)
+            if pk is None:
+                errors[column] = [f'No {model._meta.verbose_name} named "{name}".']
+            values[f'{field_name}_id'] = pk
+
+        instance = self.model(**values)
+        try:
+            # Related rows were checked in bulk above
+            instance.full_clean(
+                exclude=[field for _, _, field in self.references.values()], validate_unique=False)
+        except ValidationError as exc:
+            errors.update(exc.message_dict)
+        return instance, errors
+
+    def parse_choice(self, name, value):
+        """Accept a choice's label ("High") as well as its value ("4")"""
+        choices = self.model._meta.get_field(name).choices
+        if not choices:
+            return value
+        for choice, label in choices:
+            if value.lower() == str(label).lower():
+                return choice
+        return value
+
+    def prepare(self, instance):
+        pass
+
+    def import_chunk(self, rows, first_line):
+        """Validate and insert one chunk; return ``(created, errors)``"""
+        resolved = self.resolve(rows)
+        instances, errors = [], []
+        for line, row in enumerate(rows, start=first_line):
+            instance, row_errors = self.build(row, resolved)
+            if row_errors:
+                errors.append({'line': line, 'errors': row_errors})
+                continue
+            self.prepare(instance)
+            instances.append(instance)
+        self.model.objects.bulk_create(instances)
+        return len(instances), errors
+
+
+class RiskImporter(Importer):
+    model = Risk
+    fields = ('description', 'inherent_probability', 'inherent_impact',
+              'residual_probability', 'residual_impact')
+    references = {
+        'owner': (User, 'username', 'risk_owner'),
+        'assessor': (User, 'username', 'assessor'),
+        'risk_type': (RiskType, 'name', 'risk_type'),
+    }
+
+    def prepare(self, instance):
+        # bulk_create skips save()
+        instance.refresh_ratings()
+
+
+class ControlImporter(Importer):
+    model = Control
+    fields = ('name', 'description', 'effectiveness')
+    references = {
+        'owner': (User, 'username', 'owner'),
+    }
+
+
+IMPORTERS = {
+    'risk': RiskImporter,
+    'control': ControlImporter,
+}
+
+
+def claim_job(job, statuses=('pending',)):
+    """
+    Move ``job`` to ``running`` if it is still in one of ``statuses``.
+
+    Returns False when another run claimed it first or it has completed.
+    """
+    claimed = ImportJob.objects.filter(pk=job.pk, status__in=statuses).update(
+        status='running', failure='', updated_at=timezone.now())
+    if claimed:
+        job.status, job.failure = 'running', ''
+    return bool(claimed)
+
+
+def requeue_job(job):
+    """
+    Move a failed ``job`` back to ``pending``; False, with ``job.status``
+    refreshed, when it is not failed (any more).
+    """
+    requeued = ImportJob.objects.filter(pk=job.pk, status='failed').update(
+        status='pending', failure='', updated_at=timezone.now())
+    job.refresh_from_db()
+    return bool(requeued)
+
+
+def run_import(job, chunk_size=None):
+    """
+    Process a claimed ``job`` from its checkpoint to the end of the file.
+
+    Failures are recorded on the job (status ``failed``) rather than raised,
+    and claiming it again resumes after the last committed chunk.
+    """
+    chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+    importer = IMPORTERS[job.kind]()
+
+    created = 0
+    try:
+        file_format = import_format(job.file.name)
+        with job.file.open('rb') as handle:
+            rows = islice(read_rows(handle, file_format), job.rows_processed, None)
+            for chunk in chunked(rows, chunk_size):
+                # Line numbers count the header row, as spreadsheets do
+                first_line = job.rows_processed + 2
+                with transaction.atomic():
+                    chunk_created, errors = importer.import_chunk(chunk, first_line)
+                    job.rows_processed += len(chunk)
+                    job.rows_created += chunk_created
+                    job.error_count += len(errors)
+                    job.row_errors = (job.row_errors + errors)[:MAX_STORED_ERRORS]
+                    job.save(update_fields=[
+                        'rows_processed', 'rows_created', 'error_count', 'row_errors', 'updated_at'])
+                created += chunk_created
+        job.status = 'completed'
+    except Exception as exc:
+        logger.exception('Import %s failed after %s rows', job.pk, job.rows_processed)
+        job.status, job.failure = 'failed', str(exc)
+    finally:
+        job.save(update_fields=['status', 'failure', 'updated_at'])
+        # bulk_create does not send post_save
+        if created:
+            dashboard_cache.invalidate()
+    return job
+
+
+def run_pending_imports(chunk_size=None):
+    """Claim and run pending jobs, oldest first, until none is left; yield each one when done"""
+    while True:
+        job = ImportJob.objects.filter(status='pending').order_by('created_at', 'pk').first()
+        if job is None:
+            return
+        if claim_job(job):
+            yield run_import(job, chunk_size)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def import_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.IMPORT_WORKERS, thread_name_prefix='import')
+        return _executor
+
+
+def run_in_background(job_pk):
+    """Claim and run a pending job on an import thread, which closes its connection after"""
+    close_old_connections()
+    try:
+        job = ImportJob.objects.filter(pk=job_pk).first()
+        if job is not None and claim_job(job):
+            run_import(job)
+    except Exception:
+        # Nothing reads the future, so this is the only trace
+        logger.exception('Import %s could not be started', job_pk)
+    finally:
+        connection.close()
+
+
+def queue_import(job):
+    """
+    Run a pending ``job`` once the current transaction commits, on an
+    import thread, or leave it for ``import_register --pending``.
+    """
+    if settings.IMPORT_WORKERS:
+        transaction.on_commit(lambda: import_executor().submit(run_in_background, job.pk))
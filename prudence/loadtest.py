@@ -0,0 +1,268 @@
+"""
+HTTP load generator for a running Prudence API.
+
+Logs in once through ``auth/login/``, shares the JWT between worker
+threads, and replays a weighted mix of the calls the frontend makes. Each
+worker keeps its own persistent connection, so the numbers measure the
+server rather than TCP handshakes. Only the standard library is used so
+it runs anywhere the project does.
+"""
+import http.client
+import json
+import random
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from .perf import summarize
+
+
+class LoadTestError(Exception):
+    pass
+
+
+class Scenario:
+    """
+    One kind of request in the mix. ``path`` and ``body`` may be callables
+    taking ``(rng, user)`` so each request can vary. A response is an error
+    unless its status is in ``expect``, or below 400 when that is not given.
+    """
+
+    def __init__(self, name, weight, method, path, body=None, expect=None):
+        self.name = name
+        self.weight = weight
+        self.method = method
+        self.path = path
+        self.body = body
+        self.expect = expect
+
+    def succeeded(self, status):
+        return status in self.expect if self.expect else status < 400
+
+    def build(self, rng, user):
+        path = self.path(rng, user) if callable(self.path) else self.path
+        body = self.body(rng, user) if callable(self.body) else self.body
+        return self.method, path, body
+
+
+def new_risk(rng, user):
+    inherent_probability, inherent_impact = rng.randint(1, 5), rng.randint(1, 5)
+    return {
+        'description': f'Load test risk {rng.randrange(10 ** 9)}',
+        'inherent_probability': inherent_probability,
+        'inherent_impact': inherent_impact,
+        'residual_probability': rng.randint(1, inherent_probability),
+        'residual_impact': rng.randint(1, inherent_impact),
+        'owner_id': user['id'],
+    }
+
+
+# As sent by the frontend's services
+RISK_EXPAND = 'owner,assessor,controls,risk_type'
+CONTROL_EXPAND = 'owner'
+ASSESSMENT_EXPAND = 'risk,assessor'
+
+
+def default_scenarios(password=None):
+    def credentials(field, secret):
+        return lambda rng, user: {'username': user[field], 'password': secret}
+
+    return [
+        Scenario('dashboard', 20, 'GET', '/api/dashboard/stats/'),
+        Scenario('risk-list', 10, 'GET', lambda rng, user: f'/api/risks/?page={rng.randint(1, 5)}'),
+        Scenario('matrix', 10, 'GET', '/api/risks/matrix/?mode=counts'),
+        Scenario('my-risks', 15, 'GET', '/api/risks/my_risks/'),
+        Scenario('control-list', 5, 'GET', '/api/controls/'),
+        Scenario('assessments', 5, 'GET', '/api/risk-assessments/'),
+        # The lists with the relations the frontend pages expand
+        Scenario('risk-list-expanded', 15, 'GET',
+                 lambda rng, user: f'/api/risks/?page={rng.randint(1, 5)}&expand={RISK_EXPAND}'),
+        Scenario('control-list-expanded', 5, 'GET', f'/api/controls/?expand={CONTROL_EXPAND}'),
+        Scenario('assessments-expanded', 5, 'GET', f'/api/risk-assessments/?expand={ASSESSMENT_EXPAND}'),
+        Scenario('risk-create', 5, 'POST', '/api/risks/', new_risk),
+        # The async views; off unless given a weight with --mix
+        Scenario('async-dashboard', 0, 'GET', '/api/async/dashboard/stats/'),
+        Scenario('async-matrix', 0, 'GET', '/api/async/risks/matrix/'),
+        Scenario('async-workspace', 0, 'GET', '/api/async/workspace/'),
+        # Logins by username, by email and by email with a wrong password
+        Scenario('login', 0, 'POST', '/api/auth/login/', credentials('username', password)),
+        Scenario('login-email', 0, 'POST', '/api/auth/login/', credentials('email', password)),
+        Scenario('login-failed', 0, 'POST', '/api/auth/login/', credentials('email', f'not-{password}'),
+                 expect=(400,)),
+    ]
+
+
+def apply_mix(scenarios, mix):
+    """Override weights from ``"name=weight,..."``; a weight of 0 drops the scenario"""
+    by_name = {scenario.name: scenario for scenario in scenarios}
+    for item in filter(None, (part.strip() for part in (mix or '').split(','))):
+        name, _, weight = item.partition('=')
+        if name not in by_name:
+            raise LoadTestError(f"Unknown scenario '{name}', expected one of: {', '.join(by_name)}")
+        try:
+            by_name[name].weight = float(weight)
+        except ValueError:
+            raise LoadTestError(f"Invalid weight for '{name}': {weight!r}")
+    selected = [scenario for scenario in scenarios if scenario.weight > 0]
+    if not selected:
+        raise LoadTestError('The mix has no scenario with a positive weight')
+    return selected
+
+
+class Session:
+    """A keep-alive connection to the server, reopened after network errors"""
+
+    def __init__(self, base_url, token=None, timeout=30):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise LoadTestError(f'Invalid server URL: {base_url}')
+        self.connection_class = (
+            http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection)
+        self.host = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+        self.connection = None
+
+    def request(self, method, path, body=None):
+        """Return ``(status, body bytes)``"""
+        headers = {'Accept': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+
+        for attempt in (1, 2):
+            if self.connection is None:
+                self.connection = self.connection_class(self.host, timeout=self.timeout)
+            try:
+                self.connection.request(method, self.prefix + path, body=payload, headers=headers)
+                response = self.connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, OSError):
+                # The server may have closed an idle keep-alive connection
+                self.close()
+                if attempt == 2:
+                    raise
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def login(base_url, username, password, timeout=30):
+    """Return ``(access token, user dict)`` from ``auth/login/``"""
+    session = Session(base_url, timeout=timeout)
+    try:
+        status, body = session.request(
+            'POST', '/api/auth/login/', {'username': username, 'password': password})
+    except (http.client.HTTPException, OSError) as exc:
+        raise LoadTestError(f'Could not reach {base_url}: {exc}')
+    finally:
+        session.close()
+    if status != 200:
+        raise LoadTestError(f'Login failed with HTTP {status}: {body[:200].decode(errors="replace")}')
+    data = json.loads(body)
+    return data['token'], data['user']
+
+
+class LoadTest:
+    """
+    Run ``scenarios`` from ``concurrency`` threads until ``duration`` seconds
+    have passed or ``total`` requests have been sent, whichever comes first.
+    """
+
+    def __init__(self, base_url, token, user, scenarios, concurrency=10,
+                 duration=None, total=None, seed=None, timeout=30):
+        if duration is None and total is None:
+            raise LoadTestError('Give a duration or a number of requests')
+        self.base_url = base_url
+        self.token = token
+        self.user = user
+        self.scenarios = scenarios
+        self.concurrency = concurrency
+        self.duration = duration
+        self.total = total
+        self.seed = seed
+        self.timeout = timeout
+
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.samples = {scenario.name: [] for scenario in scenarios}
+        self.errors = Counter()
+        self.statuses = Counter()
+
+    def run(self):
+        self.deadline = time.monotonic() + self.duration if self.duration else None
+        started = time.perf_counter()
+        workers = [
+            threading.Thread(target=self.work, args=(index,), daemon=True)
+            for index in range(self.concurrency)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return self.report(time.perf_counter() - started)
+
+    def claim(self):
+        """Reserve the next request, or return False when the run is over"""
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return False
+        with self.lock:
+            if self.total is not None and self.sent >= self.total:
+                return False
+            self.sent += 1
+            return True
+
+    def work(self, index):
+        rng = random.Random(None if self.seed is None else self.seed + index)
+        weights = [scenario.weight for scenario in self.scenarios]
+        session = Session(self.base_url, self.token, self.timeout)
+        try:
+            while self.claim():
+                scenario = rng.choices(self.scenarios, weights)[0]
+                method, path, body = scenario.build(rng, self.user)
+                started = time.perf_counter()
+                try:
+                    status, _ = session.request(method, path, body)
+                    outcome = str(status)
+                    failed = not scenario.succeeded(status)
+                except Exception as exc:
+                    outcome = type(exc).__name__
+                    failed = True
+                elapsed = time.perf_counter() - started
+                with self.lock:
+                    self.samples[scenario.name].append(elapsed)
+                    self.statuses[outcome] += 1
+                    if failed:
+                        self.errors[scenario.name] += 1
+        finally:
+            session.close()
+
+    def report(self, elapsed):
+        everything = [sample for samples in self.samples.values() for sample in samples]
+        requests = len(everything)
+        errors = sum(self.errors.values())
+        return {
+            'concurrency': self.concurrency,
+            'duration_s': round(elapsed, 3),
+            'requests': requests,
+            'throughput_rps': round(requests / elapsed, 2) if elapsed else None,
+            'errors': errors,
+            'error_rate': round(errors / requests, 4) if requests else None,
+            'statuses': dict(sorted(self.statuses.items())),
+            'latency': summarize(everything),
+            'scenarios': {
+                name: {
+                    'errors': self.errors[name],
+                    'error_rate': round(self.errors[name] / len(samples), 4) if samples else None,
+                    **summarize(samples),
+                }
+                for name, samples in self.samples.items()
+            },
+        }
@@ -0,0 +1,161 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from prudence.models import Control, Risk, RiskAssessment, RiskType
+from prudence.stats import dashboard_cache
+
+User = get_user_model()
+
+SIZES = {
+    '1k': 1_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+RISK_TYPES = [
+    'Operational', 'Financial', 'Compliance', 'Strategic', 'Reputational',
+    'Cyber Security', 'Third Party', 'Legal', 'Health and Safety', 'Environmental',
+]
+EVENTS = [
+    'Ransomware attack', 'Data breach', 'Supplier insolvency', 'Regulatory fine',
+    'Fire', 'Flooding', 'Payment fraud', 'Key person loss', 'Service outage',
+    'Misreported figures', 'Contract dispute', 'Phishing campaign',
+]
+ASSETS = [
+    'payroll system', 'customer database', 'head office', 'data centre',
+    'trading platform', 'warehouse', 'general ledger', 'mobile app',
+    'supply chain', 'email service', 'HR records', 'billing engine',
+]
+CONTROL_KINDS = [
+    'Access review', 'Backup and restore test', 'Segregation of duties',
+    'Vendor due diligence', 'Fire suppression', 'Reconciliation',
+    'Security awareness training', 'Change approval', 'Penetration test',
+    'Business continuity plan',
+]
+# Share of generated users per role
+ROLE_MIX = [('L1', 0.2), ('L2', 0.5), ('L3', 0.3)]
+ASSESSMENT_STATUSES = ['P', 'P', 'A', 'R']
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic risk register (users, risk types, controls, risks, assessments) with bulk_create"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=sorted(SIZES), default='1k',
+                            help="Number of risks: 1k, 100k or 1m")
+        parser.add_argument('--risks', type=int, help="Exact number of risks (overrides --size)")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='gen', help="Username prefix for generated users")
+        parser.add_argument('--password', default='password', help="Password of every generated user")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        risk_count = options['risks'] or SIZES[options['size']]
+
+        users = self.create_users(max(30, risk_count // 100), options['prefix'], options['password'])
+        assessors = [pk for pk, role in users if role == 'L2']
+        owners = [pk for pk, _ in users]
+        risk_types = self.create_risk_types()
+        controls = self.create_controls(max(20, risk_count // 4), owners)
+        self.create_risks(risk_count, owners, assessors, risk_types, controls)
+
+        dashboard_cache.invalidate()
+        self.stdout.write(
+            f"Generated {len(users)} users, {len(controls)} controls and {risk_count} risks "
+            f"in {time.perf_counter() - started:.1f}s")
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield start, min(self.batch_size, total - start)
+
+    def create_users(self, count, prefix, password):
+        # Hash once: a per-user PBKDF2 round would dominate the run
+        password = make_password(password)
+        offset = User.objects.filter(username__startswith=prefix).count()
+        roles = [role for role, _ in ROLE_MIX]
+        weights = [weight for _, weight in ROLE_MIX]
+        User.objects.bulk_create([
+            User(
+                username=f'{prefix}{offset + n}',
+                email=f'{prefix}{offset + n}@example.com',
+                first_name=f'First{offset + n}',
+                last_name=f'Last{offset + n}',
+                role=self.rng.choices(roles, weights)[0],
+                password=password,
+            )
+            for n in range(count)
+        ], batch_size=self.batch_size)
+        return list(User.objects.filter(username__startswith=prefix).values_list('pk', 'role'))
+
+    def create_risk_types(self):
+        existing = set(RiskType.objects.filter(name__in=RISK_TYPES).values_list('name', flat=True))
+        RiskType.objects.bulk_create([
+            RiskType(name=name, description=f'{name} risks')
+            for name in RISK_TYPES if name not in existing
+        ])
+        return list(RiskType.objects.filter(name__in=RISK_TYPES).values_list('pk', flat=True))
+
+    def create_controls(self, count, owners):
+        pks = []
+        for start, size in self.batches(count):
+            with transaction.atomic():
+                created = Control.objects.bulk_create([
+                    Control(
+                        name=f'{self.rng.choice(CONTROL_KINDS)} #{start + n}',
+                        description=f'Mitigates {self.rng.choice(EVENTS).lower()} on the {self.rng.choice(ASSETS)}',
+                        effectiveness=self.rng.choice([0.0, 0.5, 1.0]),
+                        owner_id=self.rng.choice(owners),
+                    )
+                    for n in range(size)
+                ])
+            pks += [control.pk for control in created]
+        return pks
+
+    def create_risks(self, count, owners, assessors, risk_types, controls):
+        Through = Risk.controls.through
+        for start, size in self.batches(count):
+            risks = [self.make_risk(owners, assessors, risk_types) for _ in range(size)]
+            with transaction.atomic():
+                Risk.objects.bulk_create(risks)
+                Through.objects.bulk_create([
+                    Through(risk_id=risk.pk, control_id=control_id)
+                    for risk in risks
+                    for control_id in set(self.rng.choices(controls, k=self.rng.randint(0, 3)))
+                ], batch_size=self.batch_size)
+                RiskAssessment.objects.bulk_create([
+                    RiskAssessment(
+                        risk_id=risk.pk,
+                        assessor_id=risk.assessor_id,
+                        assessment_status=self.rng.choice(ASSESSMENT_STATUSES),
+                        assessor_comments='Generated assessment',
+                    )
+                    for risk in risks if risk.assessor_id
+                ], batch_size=self.batch_size)
+            self.stdout.write(f"  {start + size}/{count} risks")
+
+    def make_risk(self, owners, assessors, risk_types):
+        rng = self.rng
+        inherent_probability, inherent_impact = rng.randint(1, 5), rng.randint(1, 5)
+        assessed = rng.random() < 0.8
+        risk = Risk(
+            description=f'{rng.choice(EVENTS)} affecting the {rng.choice(ASSETS)}',
+            inherent_probability=inherent_probability,
+            inherent_impact=inherent_impact,
+            # Controls only ever bring a risk down
+            residual_probability=rng.randint(1, inherent_probability) if assessed else None,
+            residual_impact=rng.randint(1, inherent_impact) if assessed else None,
+            risk_owner_id=rng.choice(owners),
+            assessor_id=rng.choice(assessors) if assessors and rng.random() < 0.3 else None,
+            risk_type_id=rng.choice(risk_types),
+        )
+        # bulk_create skips save()
+        risk.refresh_ratings()
+        return risk
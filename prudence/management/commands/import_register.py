@@ -0,0 +1,79 @@
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from prudence.imports import IMPORTERS, ImportFormatError, claim_job, import_format, run_import, run_pending_imports
+from prudence.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = "Import risks or controls from a CSV/XLSX file, resume a failed import job or run the pending ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help="CSV or XLSX file to import")
+        parser.add_argument('--kind', choices=sorted(IMPORTERS), default='risk')
+        parser.add_argument('--resume', type=int, metavar='JOB_ID',
+                            help="Continue a job from its last checkpoint")
+        parser.add_argument('--force', action='store_true',
+                            help="With --resume, also take over a job left running by a process that died")
+        parser.add_argument('--pending', action='store_true', help="Run every job waiting as pending")
+        parser.add_argument('--chunk-size', type=int, help="Rows per committed chunk")
+        parser.add_argument('--user', help="Username recorded as the job's creator")
+
+    def handle(self, *args, **options):
+        if options['pending']:
+            for job in run_pending_imports(chunk_size=options['chunk_size']):
+                self.report(job)
+            return
+
+        if options['resume']:
+            job = ImportJob.objects.filter(pk=options['resume']).first()
+            if job is None:
+                raise CommandError(f"Import job {options['resume']} does not exist")
+            statuses = ('pending', 'failed', 'running') if options['force'] else ('pending', 'failed')
+            if not claim_job(job, statuses):
+                job.refresh_from_db(fields=['status'])
+                raise CommandError(f"Import job {job.pk} is {job.status}")
+        elif options['path']:
+            job = self.create_job(options)
+            claim_job(job)
+        else:
+            raise CommandError("Give a file to import, --resume JOB_ID or --pending")
+
+        self.stdout.write(f"Import job {job.pk}: starting at row {job.rows_processed}")
+        run_import(job, chunk_size=options['chunk_size'])
+        self.report(job)
+        if job.status == 'failed':
+            raise CommandError(f"Resume with: manage.py import_register --resume {job.pk}")
+
+    def report(self, job):
+        self.stdout.write(
+            f"Import job {job.pk} {job.status}: {job.rows_processed} rows processed, "
+            f"{job.rows_created} created, {job.error_count} rejected")
+        for error in job.row_errors[:20]:
+            self.stdout.write(f"  line {error['line']}: {error['errors']}")
+        if job.status == 'failed':
+            self.stderr.write(f"  {job.failure}")
+
+    def create_job(self, options):
+        path = Path(options['path'])
+        if not path.is_file():
+            raise CommandError(f"{path} is not a file")
+        try:
+            import_format(path.name)
+        except ImportFormatError as exc:
+            raise CommandError(str(exc))
+
+        user = None
+        if options['user']:
+            user = get_user_model().objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"User {options['user']} does not exist")
+
+        job = ImportJob(kind=options['kind'], created_by=user)
+        # Keep a copy alongside the job so it can be resumed later
+        with path.open('rb') as handle:
+            job.file.save(path.name, File(handle))
+        return job
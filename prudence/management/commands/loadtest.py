@@ -0,0 +1,80 @@
+import getpass
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from prudence.loadtest import LoadTest, LoadTestError, apply_mix, default_scenarios, login
+
+
+class Command(BaseCommand):
+    help = "Replay a weighted mix of API calls against a running server and report throughput, latency and errors"
+
+    def add_arguments(self, parser):
+        scenarios = ', '.join(f'{scenario.name}={scenario.weight:g}' for scenario in default_scenarios())
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Server to load")
+        parser.add_argument('--username', required=True,
+                            help="User to log in as; the password is read from LOADTEST_PASSWORD or prompted for")
+        parser.add_argument('--concurrency', type=int, default=10, help="Worker threads")
+        parser.add_argument('--duration', type=float, default=30, help="Seconds to run for")
+        parser.add_argument('--requests', type=int, help="Stop after this many requests")
+        parser.add_argument('--mix', help=f"Scenario weights to override, e.g. 'dashboard=50,risk-create=0' "
+                                          f"(defaults: {scenarios})")
+        parser.add_argument('--seed', type=int, help="Seed for a repeatable request sequence")
+        parser.add_argument('--timeout', type=float, default=30, help="Per-request timeout in seconds")
+        parser.add_argument('--json', metavar='PATH', help="Also write the report to PATH")
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError("--concurrency must be at least 1")
+        password = self.get_password(options['username'])
+        try:
+            scenarios = apply_mix(default_scenarios(password), options['mix'])
+            token, user = login(options['url'], options['username'], password, options['timeout'])
+            self.stdout.write(
+                f"Loading {options['url']} as {user['username']} with {options['concurrency']} workers...")
+            report = LoadTest(
+                options['url'], token, user, scenarios,
+                concurrency=options['concurrency'],
+                duration=None if options['requests'] else options['duration'],
+                total=options['requests'],
+                seed=options['seed'],
+                timeout=options['timeout'],
+            ).run()
+        except LoadTestError as exc:
+            raise CommandError(str(exc))
+
+        self.print_report(report)
+        if options['json']:
+            with open(options['json'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+                handle.write('\n')
+
+    def get_password(self, username):
+        # Never an argument, where it would show up in ps and the shell history
+        password = os.environ.get('LOADTEST_PASSWORD')
+        if password is None:
+            if not sys.stdin.isatty():
+                raise CommandError("Set LOADTEST_PASSWORD or run from a terminal to be prompted for the password")
+            password = getpass.getpass(f"Password for {username}: ")
+        return password
+
+    def print_report(self, report):
+        latency = report['latency']
+        self.stdout.write(
+            f"\n{report['requests']} requests in {report['duration_s']}s: "
+            f"{report['throughput_rps']} req/s, {report['errors']} errors ({(report['error_rate'] or 0):.2%})")
+        if report['requests']:
+            self.stdout.write(
+                f"latency ms: p50 {latency['p50_ms']}  p95 {latency['p95_ms']}  "
+                f"p99 {latency['p99_ms']}  max {latency['max_ms']}")
+        self.stdout.write(f"statuses: {report['statuses']}\n")
+
+        self.stdout.write(f"{'scenario':<14}{'requests':>9}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, stats in report['scenarios'].items():
+            if not stats['count']:
+                continue
+            self.stdout.write(
+                f"{name:<14}{stats['count']:>9}{stats['errors']:>8}"
+                f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
@@ -0,0 +1,42 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from prudence.startup import StartupProfileError, profile_startup, slowest
+
+
+class Command(BaseCommand):
+    help = "Start a fresh worker-like process and report its import time per module, wall time and peak RSS"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25, help="Number of modules to list")
+        parser.add_argument('--sort', choices=('cumulative', 'self'), default='cumulative',
+                            help="Rank by time including submodules (cumulative) or by the module alone (self)")
+        parser.add_argument('--project', action='store_true', help="Only list this project's modules")
+        parser.add_argument('--json', metavar='PATH', help="Also write the full profile to PATH")
+
+    def handle(self, *args, **options):
+        try:
+            profile = profile_startup()
+        except StartupProfileError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(
+            f"Startup: {profile['wall_ms']} ms wall, {profile['import_ms']} ms importing "
+            f"{profile['module_count']} modules, {profile['max_rss_mb']} MB peak RSS "
+            f"(budget {settings.STARTUP_TIME_BUDGET_MS} ms, {settings.STARTUP_RSS_BUDGET_MB} MB)")
+        if profile['heavy_modules']:
+            self.stdout.write(self.style.WARNING(
+                f"Heavy modules loaded at startup: {', '.join(profile['heavy_modules'])}"))
+
+        key = f"{options['sort']}_ms"
+        self.stdout.write(f"\n{'cumulative ms':>14}{'self ms':>10}  module")
+        for item in slowest(profile['imports'], options['top'], key, options['project']):
+            self.stdout.write(
+                f"{item['cumulative_ms']:>14.1f}{item['self_ms']:>10.1f}  {'  ' * item['depth']}{item['module']}")
+
+        if options['json']:
+            with open(options['json'], 'w') as handle:
+                json.dump(profile, handle, indent=2)
+                handle.write('\n')
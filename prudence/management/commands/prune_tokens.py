@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class Command(BaseCommand):
+    help = "Delete expired refresh tokens, and their blacklist entries, from the token tables in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Tokens deleted per transaction")
+        parser.add_argument('--pause', type=float, default=0,
+                            help="Seconds to wait between batches, to spread the load")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        started = time.perf_counter()
+        now = aware_utcnow()
+        # Tokens share one lifetime, so the expired ones are the oldest ids
+        # and walking by id reaches them first
+        expired = OutstandingToken.objects.filter(expires_at__lte=now).order_by('pk')
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                batch = list(expired.values_list('pk', flat=True)[:options['batch_size']])
+                if not batch:
+                    break
+                OutstandingToken.objects.filter(pk__in=batch).delete()
+            deleted += len(batch)
+            self.stdout.write(f"  {deleted} expired tokens deleted")
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired tokens in {elapsed:.1f}s"))
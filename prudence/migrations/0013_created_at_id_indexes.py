@@ -0,0 +1,34 @@
+# Generated by Django 4.2.16 on 2026-10-17 16:07
+
+from datetime import datetime, time, timezone
+
+from django.db import migrations, models
+
+
+def backfill_created_at(apps, schema_editor):
+    # Rows that predate 0011 have no created_at; give them one derived from
+    # their last assessment date so keyset pagination sees a total order.
+    for model_name, date_field in (('Risk', 'last_assessed'), ('Control', 'clastassessed')):
+        model = apps.get_model('prudence', model_name)
+        for pk, assessed in model.objects.filter(created_at__isnull=True).values_list('pk', date_field):
+            created_at = datetime.combine(assessed, time.min, tzinfo=timezone.utc)
+            model.objects.filter(pk=pk).update(created_at=created_at)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prudence', '0012_add_risk_type_field'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_created_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='control',
+            index=models.Index(fields=['-created_at', '-id'], name='control_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='risk',
+            index=models.Index(fields=['-created_at', '-id'], name='risk_created_at_id_idx'),
+        ),
+    ]
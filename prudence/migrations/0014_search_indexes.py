@@ -0,0 +1,89 @@
+from django.db import migrations
+
+# The schema is written out here rather than taken from prudence.search, so
+# this migration keeps doing what it did when it was written. SQLite gets an
+# external-content FTS5 table per model, kept in sync by triggers; PostgreSQL
+# a GIN index over the to_tsvector() expression the queries use.
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE prudence_risk_fts USING fts5(description, "
+    "content='prudence_risk', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS prudence_risk_fts_ai AFTER INSERT ON prudence_risk BEGIN "
+    "INSERT INTO prudence_risk_fts(rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS prudence_risk_fts_ad AFTER DELETE ON prudence_risk BEGIN "
+    "INSERT INTO prudence_risk_fts(prudence_risk_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS prudence_risk_fts_au AFTER UPDATE OF description ON prudence_risk BEGIN "
+    "INSERT INTO prudence_risk_fts(prudence_risk_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); "
+    "INSERT INTO prudence_risk_fts(rowid, description) VALUES (new.id, new.description); END",
+    "INSERT INTO prudence_risk_fts(prudence_risk_fts) VALUES ('rebuild')",
+
+    "CREATE VIRTUAL TABLE prudence_control_fts USING fts5(name, description, "
+    "content='prudence_control', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS prudence_control_fts_ai AFTER INSERT ON prudence_control BEGIN "
+    "INSERT INTO prudence_control_fts(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS prudence_control_fts_ad AFTER DELETE ON prudence_control BEGIN "
+    "INSERT INTO prudence_control_fts(prudence_control_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS prudence_control_fts_au AFTER UPDATE OF name, description ON prudence_control BEGIN "
+    "INSERT INTO prudence_control_fts(prudence_control_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO prudence_control_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "INSERT INTO prudence_control_fts(prudence_control_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS prudence_risk_fts_ai",
+    "DROP TRIGGER IF EXISTS prudence_risk_fts_ad",
+    "DROP TRIGGER IF EXISTS prudence_risk_fts_au",
+    "DROP TABLE IF EXISTS prudence_risk_fts",
+    "DROP TRIGGER IF EXISTS prudence_control_fts_ai",
+    "DROP TRIGGER IF EXISTS prudence_control_fts_ad",
+    "DROP TRIGGER IF EXISTS prudence_control_fts_au",
+    "DROP TABLE IF EXISTS prudence_control_fts",
+]
+
+# model name -> (indexed columns, index name)
+POSTGRES_INDEXES = {
+    'Risk': (('description',), 'prudence_risk_search_idx'),
+    'Control': (('name', 'description'), 'prudence_control_search_idx'),
+}
+
+
+def postgres_indexes(apps):
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+    for model_name, (columns, name) in POSTGRES_INDEXES.items():
+        yield apps.get_model('prudence', model_name), GinIndex(SearchVector(*columns, config='english'), name=name)
+
+
+def install_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_INSTALL:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        for model, index in postgres_indexes(apps):
+            schema_editor.add_index(model, index)
+
+
+def uninstall_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_UNINSTALL:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        for model, index in postgres_indexes(apps):
+            schema_editor.remove_index(model, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prudence', '0013_created_at_id_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_indexes, uninstall_search_indexes),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.16 on 2026-10-17 16:10
+
+from django.db import migrations, models
+from django.db.models import Case, F, Value, When
+
+
+def backfill_risk_level(apps, schema_editor):
+    Risk = apps.get_model('prudence', 'Risk')
+    assessed = Risk.objects.filter(residual_probability__isnull=False, residual_impact__isnull=False)
+    assessed.update(residual_risk_rating=F('residual_probability') * F('residual_impact'))
+    assessed.update(risk_level=Case(
+        When(residual_risk_rating__gte=20, then=Value('critical')),
+        When(residual_risk_rating__gte=15, then=Value('high')),
+        When(residual_risk_rating__gte=10, then=Value('medium')),
+        default=Value('low'),
+    ))
+
+
+# Altering residual_risk_rating copies prudence_risk into a new table on
+# SQLite, which drops the triggers 0014 put on it. Recreate them and reindex
+# the rows. Every later migration that rebuilds prudence_risk or
+# prudence_control on SQLite must do the same.
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS prudence_risk_fts_ai AFTER INSERT ON prudence_risk BEGIN "
+    "INSERT INTO prudence_risk_fts(rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS prudence_risk_fts_ad AFTER DELETE ON prudence_risk BEGIN "
+    "INSERT INTO prudence_risk_fts(prudence_risk_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS prudence_risk_fts_au AFTER UPDATE OF description ON prudence_risk BEGIN "
+    "INSERT INTO prudence_risk_fts(prudence_risk_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); "
+    "INSERT INTO prudence_risk_fts(rowid, description) VALUES (new.id, new.description); END",
+    "INSERT INTO prudence_risk_fts(prudence_risk_fts) VALUES ('rebuild')",
+]
+
+
+def restore_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_TRIGGERS:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prudence', '0014_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='risk',
+            name='risk_level',
+            field=models.CharField(blank=True, choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High'), ('critical', 'Critical')], max_length=8, null=True),
+        ),
+        migrations.AlterField(
+            model_name='risk',
+            name='residual_risk_rating',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='risk',
+            index=models.Index(fields=['risk_level', '-created_at'], name='risk_level_created_at_idx'),
+        ),
+        migrations.RunPython(backfill_risk_level, migrations.RunPython.noop),
+        migrations.RunPython(restore_triggers, migrations.RunPython.noop),
+    ]
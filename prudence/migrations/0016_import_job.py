@@ -0,0 +1,33 @@
+# Generated by Django 4.2.16 on 2026-10-17 16:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('prudence', '0015_risk_level'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('risk', 'Risks'), ('control', 'Controls')], max_length=10)),
+                ('file', models.FileField(upload_to='imports/')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('failed', 'Failed'), ('completed', 'Completed')], default='pending', max_length=10)),
+                ('rows_processed', models.PositiveIntegerField(default=0)),
+                ('rows_created', models.PositiveIntegerField(default=0)),
+                ('row_errors', models.JSONField(blank=True, default=list)),
+                ('error_count', models.PositiveIntegerField(default=0)),
+                ('failure', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.16 on 2026-10-17 17:26
+
+from django.db import migrations, models
+from django.db.models import DateTimeField, F
+from django.db.models.functions import Cast
+
+
+def backfill_created_at(apps, schema_editor):
+    # Existing assessments were last touched on their assessment date
+    RiskAssessment = apps.get_model('prudence', 'RiskAssessment')
+    RiskAssessment.objects.filter(created_at__isnull=True).update(
+        created_at=Cast(F('assessment_date'), DateTimeField()),
+        updated_at=Cast(F('assessment_date'), DateTimeField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prudence', '0016_import_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='riskassessment',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='riskassessment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.RunPython(backfill_created_at, migrations.RunPython.noop),
+        # The queue pages order on (created_at, id); the id tiebreak belongs in the index
+        migrations.AddIndex(
+            model_name='riskassessment',
+            index=models.Index(fields=['assessor', 'assessment_status', 'created_at', 'id'], name='assessment_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='riskassessment',
+            index=models.Index(fields=['risk', 'assessment_date'], name='assessment_risk_date_idx'),
+        ),
+    ]
@@ -20,6 +20,32 @@ IMPACT_CHOICES = [
     (5, 'Very High'),
 ]
 
+RISK_LEVEL_CHOICES = [
+    ('low', 'Low'),
+    ('medium', 'Medium'),
+    ('high', 'High'),
+    ('critical', 'Critical'),
+]
+
+# Minimum residual rating (probability x impact) for each level above 'low'
+RISK_LEVEL_THRESHOLDS = [
+    (20, 'critical'),
+    (15, 'high'),
+    (10, 'medium'),
+]
+
+HIGH_RISK_LEVELS = ('high', 'critical')
+
+
+def risk_level_for_rating(rating):
+    """Map a residual risk rating onto its risk level"""
+    if rating is None:
+        return None
+    for threshold, level in RISK_LEVEL_THRESHOLDS:
+        if rating >= threshold:
+            return level
+    return 'low'
+
 
 class RiskType(models.Model):
     name = models.CharField(max_length=255)
@@ -45,6 +71,11 @@ class Control(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='control_created_at_id_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -72,7 +103,9 @@ class Risk(models.Model):
     residual_probability = models.IntegerField(
         choices=PROBABILITY_CHOICES, null=True, blank=True)
     residual_risk_rating = models.DecimalField(
-        max_digits=5, decimal_places=2, null=True, blank=True)
+        max_digits=5, decimal_places=2, null=True, blank=True, db_index=True)
+    risk_level = models.CharField(
+        max_length=8, choices=RISK_LEVEL_CHOICES, null=True, blank=True)
     risk_owner = models.ForeignKey(
         User, related_name='risks_owned', on_delete=models.SET_NULL, null=True)
     last_assessed = models.DateField(auto_now=True)
@@ -83,7 +116,18 @@ class Risk(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='risk_created_at_id_idx'),
+            models.Index(fields=['risk_level', '-created_at'], name='risk_level_created_at_idx'),
+        ]
+
     def save(self, *args, **kwargs):
+        self.refresh_ratings()
+        super().save(*args, **kwargs)
+
+    def refresh_ratings(self):
+        """Recompute the stored ratings and risk level (bulk writes bypass save())"""
         # Calculate the inherent risk rating if not already set
         if not self.inherent_risk_rating:
             self.inherent_risk_rating = Decimal(
@@ -96,7 +140,7 @@ class Risk(models.Model):
         else:
             self.residual_risk_rating = None
 
-        super().save(*args, **kwargs)
+        self.risk_level = risk_level_for_rating(self.residual_risk_rating)
 
     def __str__(self):
         return f"{self.description} - {self.risk_owner.username if self.risk_owner else 'No owner'}"
@@ -114,6 +158,47 @@ class RiskAssessment(models.Model):
     assessment_status = models.CharField(
         max_length=1, choices=ASSESSMENT_STATUS_CHOICES)
     assessor_comments = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The L2 review queue: one assessor's assessments in one status by age
+            models.Index(fields=['assessor', 'assessment_status', 'created_at', 'id'], name='assessment_queue_idx'),
+            models.Index(fields=['risk', 'assessment_date'], name='assessment_risk_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.risk.description} - {self.assessment_status}"
+
+
+class ImportJob(models.Model):
+    """
+    A spreadsheet import, checkpointed after every committed chunk so a
+    failed run resumes from ``rows_processed`` instead of starting over.
+    """
+    KIND_CHOICES = [
+        ('risk', 'Risks'),
+        ('control', 'Controls'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+        ('completed', 'Completed'),
+    ]
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    file = models.FileField(upload_to='imports/')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_created = models.PositiveIntegerField(default=0)
+    row_errors = models.JSONField(default=list, blank=True)
+    error_count = models.PositiveIntegerField(default=0)
+    failure = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        User, related_name='import_jobs', on_delete=models.SET_NULL, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} import {self.pk} - {self.status}"
@@ -0,0 +1,148 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Newest-first cursor pagination keyed on ``(created_at, id)``.
+
+    Each page is a range scan on the matching composite index that starts
+    right after the last row of the previous page, so the cost does not grow
+    with depth and no ``COUNT(*)`` is ever issued. The cursor only follows
+    that order, so parameters that would sort the results another way are
+    rejected rather than ignored.
+    """
+    descending = True
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    # Query parameters that reorder the results (by a column, or by search rank)
+    ordering_query_params = ('ordering', 'search')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        ordered = [param for param in self.ordering_query_params if request.query_params.get(param)]
+        if ordered:
+            raise ValidationError({
+                param: 'Not supported with cursor pagination, which is ordered by creation time.'
+                for param in ordered
+            })
+
+        direction = '-' if self.descending else ''
+        queryset = queryset.order_by(f'{direction}created_at', f'{direction}id')
+        position = self.decode_cursor(request)
+        if position is not None:
+            created_at, pk = position
+            after = 'lt' if self.descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'created_at__{after}': created_at}) | Q(created_at=created_at, **{f'id__{after}': pk})
+            )
+
+        # Fetch one extra row to learn whether there is a next page
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        # Rows are model instances, or dicts on the compiled read path
+        if isinstance(last, dict):
+            created_at, pk = last['created_at'], last['id']
+        else:
+            created_at, pk = last.created_at, last.pk
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(created_at, pk))
+
+    def encode_cursor(self, created_at, pk):
+        token = f'{created_at.isoformat()}|{pk}'
+        return urlsafe_b64encode(token.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, pk = urlsafe_b64decode(encoded.encode('ascii')).decode('ascii').split('|')
+            return datetime.fromisoformat(created_at), int(pk)
+        except (BinasciiError, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class QueueKeysetPagination(KeysetPagination):
+    """Oldest-first keyset pagination, for work queues"""
+    descending = False
+
+
+class SelectablePagination(BasePagination):
+    """
+    Page-number pagination by default; keyset pagination when the request
+    carries ``?pagination=cursor`` or a ``cursor`` parameter.
+    """
+    mode_query_param = 'pagination'
+
+    def __init__(self):
+        self.paginator = PageNumberPagination()
+
+    def wants_cursor(self, request):
+        return (request.query_params.get(self.mode_query_param) == 'cursor'
+                or KeysetPagination.cursor_query_param in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.wants_cursor(request):
+            self.paginator = KeysetPagination()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.paginator.get_paginated_response_schema(schema)
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.paginator, 'display_page_controls', False)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_results(self, data):
+        return self.paginator.get_results(data)
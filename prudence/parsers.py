@@ -0,0 +1,23 @@
+"""
+JSON parsing with orjson when it is installed, falling back to the REST
+framework parser for non UTF-8 bodies or when orjson is missing.
+"""
+from django.conf import settings
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from .renderers import JSONRenderer, orjson
+
+
+class JSONParser(parsers.JSONParser):
+    renderer_class = JSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            # orjson rejects NaN and Infinity, like the strict stock parser
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
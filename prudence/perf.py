@@ -0,0 +1,29 @@
+"""
+Latency summaries shared by the benchmark suite and the load-test command.
+"""
+import math
+
+
+def percentile(values, pct):
+    """Linear-interpolated percentile of ``values`` (``pct`` in 0-100)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples):
+    """Count, mean and p50/p95/p99/max of durations given in seconds, reported in milliseconds"""
+    if not samples:
+        return {'count': 0}
+    ms = [sample * 1000 for sample in samples]
+    return {
+        'count': len(ms),
+        'mean_ms': round(sum(ms) / len(ms), 3),
+        'p50_ms': round(percentile(ms, 50), 3),
+        'p95_ms': round(percentile(ms, 95), 3),
+        'p99_ms': round(percentile(ms, 99), 3),
+        'max_ms': round(max(ms), 3),
+    }
@@ -0,0 +1,231 @@
+"""
+A compiled read path for list endpoints.
+
+``compiled_reader()`` turns a configured serializer (after ``?fields=`` and
+``?expand=`` have been applied) into a ``Reader`` that renders plain dicts
+from ``.values()`` rows: each field becomes a column and, where the REST
+framework field would change the value, its ``to_representation``. Expanded
+foreign keys are joined into the same rows, primary keys of many-to-many
+relations come from one query on the through table and expanded
+many-to-many relations from one joined ``.values()`` query, so no model
+instance or per-object serializer is ever built. The output is the same
+JSON as the serializer's.
+
+Serializers describe their method fields to the compiler in
+``compiled_methods``; a serializer with any field the compiler does not
+know returns ``None`` and the view falls back to the serializer.
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+from .serializers import ExpandableFieldsMixin, requested_fieldsets
+from .timing import timed
+
+# Fields whose representation of a database value is the value itself
+IDENTITY_FIELDS = (
+    serializers.BooleanField, serializers.CharField, serializers.ChoiceField,
+    serializers.EmailField, serializers.FloatField, serializers.IntegerField,
+)
+# Fields whose to_representation() formats the database value
+CONVERTED_FIELDS = (serializers.DateField, serializers.DateTimeField, serializers.DecimalField)
+
+# The alias of the owning row's primary key in expanded many-to-many rows
+LINK_COLUMN = '_compiled_link'
+
+
+class CompileError(Exception):
+    pass
+
+
+class Reader:
+    """
+    Renders rows of ``model`` the way ``serializer`` renders instances.
+
+    ``prefix`` is the lookup path (``risk_owner__``) of a reader whose
+    columns are joined into its parent's rows.
+    """
+
+    def __init__(self, serializer, prefix=''):
+        self.model = serializer.Meta.model
+        self.prefix = prefix
+        self.pk = prefix + self.model._meta.pk.attname
+        self.columns = {self.pk}
+        # (name, kind, detail) in output order
+        self.fields = []
+        methods = getattr(serializer, 'compiled_methods', {})
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                if name not in methods:
+                    raise CompileError(f'{type(serializer).__name__}.{name} has no compiled method')
+                columns, method = methods[name]
+                self.columns.update(prefix + column for column in columns)
+                if prefix:
+                    method = self.unprefixed(method, columns)
+                self.fields.append((name, 'method', method))
+            elif isinstance(field, ManyRelatedField):
+                self.fields.append((name, 'pks', self.many_to_many(field.source)))
+            elif isinstance(field, serializers.ListSerializer):
+                model_field = self.many_to_many(field.source)
+                self.fields.append((name, 'many', (model_field, Reader(field.child))))
+            elif isinstance(field, PrimaryKeyRelatedField):
+                column = prefix + self.foreign_key(field.source).attname
+                self.columns.add(column)
+                self.fields.append((name, 'column', column))
+            elif isinstance(field, serializers.BaseSerializer):
+                self.foreign_key(field.source)
+                nested = Reader(field, prefix=f'{prefix}{field.source}__')
+                self.columns.update(nested.columns)
+                self.fields.append((name, 'one', nested))
+            elif type(field) in IDENTITY_FIELDS or type(field) in CONVERTED_FIELDS:
+                column = prefix + self.concrete(field.source).attname
+                self.columns.add(column)
+                if type(field) in IDENTITY_FIELDS:
+                    self.fields.append((name, 'column', column))
+                else:
+                    self.fields.append((name, 'convert', (column, field.to_representation)))
+            else:
+                raise CompileError(f'Cannot compile {type(field).__name__} {name}')
+
+    def get_field(self, source):
+        try:
+            return self.model._meta.get_field(source)
+        except FieldDoesNotExist:
+            raise CompileError(f'{source} is not a field of {self.model.__name__}')
+
+    def concrete(self, source):
+        model_field = self.get_field(source)
+        if not model_field.concrete or model_field.many_to_many:
+            raise CompileError(f'{source} is not a column of {self.model.__name__}')
+        return model_field
+
+    def foreign_key(self, source):
+        model_field = self.concrete(source)
+        if not model_field.many_to_one:
+            raise CompileError(f'{source} is not a foreign key of {self.model.__name__}')
+        return model_field
+
+    def many_to_many(self, source):
+        model_field = self.get_field(source)
+        if not isinstance(model_field, models.ManyToManyField):
+            raise CompileError(f'{source} is not a many-to-many field of {self.model.__name__}')
+        return model_field
+
+    def unprefixed(self, method, columns):
+        """Call a method field's function with the row keys it was written for"""
+        prefixed = [(self.prefix + column, column) for column in columns]
+        return lambda row: method({column: row[key] for key, column in prefixed})
+
+    def values(self, queryset, extra=()):
+        """``queryset`` as ``.values()`` rows carrying every column this reader needs"""
+        return queryset.prefetch_related(None).values(*sorted(self.columns.union(extra)))
+
+    def render(self, rows):
+        rows = list(rows)
+        with timed('serialize'):
+            names = [name for name, _, _ in self.fields]
+            if not names:
+                return [{} for _ in rows]
+            columns = [self.field_values(kind, detail, rows) for _, kind, detail in self.fields]
+            return [dict(zip(names, values)) for values in zip(*columns)]
+
+    def field_values(self, kind, detail, rows):
+        """One field's value for every row, loading related data for ``rows`` at once"""
+        if kind == 'column':
+            return [row[detail] for row in rows]
+        if kind == 'method':
+            return [detail(row) for row in rows]
+        if kind == 'convert':
+            column, convert = detail
+            return [None if row[column] is None else convert(row[column]) for row in rows]
+        if kind == 'one':
+            return [None if row[detail.pk] is None else item
+                    for row, item in zip(rows, detail.render(rows))]
+
+        pks = [row[self.pk] for row in rows]
+        if kind == 'pks':
+            links = self.links(detail, pks)
+            return [links.get(pk, []) for pk in pks]
+        model_field, reader = detail
+        related = self.expanded(model_field, reader, pks)
+        return [related.get(pk, []) for pk in pks]
+
+    @staticmethod
+    def links(model_field, pks):
+        """Map each primary key to its related primary keys, in order, from the through table"""
+        links = {}
+        if not pks:
+            return links
+        source, target = model_field.m2m_column_name(), model_field.m2m_reverse_name()
+        pairs = (model_field.remote_field.through.objects
+                 .filter(**{f'{source}__in': pks})
+                 .order_by(source, target)
+                 .values_list(source, target))
+        for pk, related_pk in pairs:
+            links.setdefault(pk, []).append(related_pk)
+        return links
+
+    @staticmethod
+    def expanded(model_field, reader, pks):
+        """Map each primary key to its rendered related objects, in one joined query"""
+        related = {}
+        if not pks:
+            return related
+        lookup = model_field.related_query_name()
+        rows = list(reader.values(reader.model.objects.filter(**{f'{lookup}__in': pks}), ())
+                    .annotate(**{LINK_COLUMN: models.F(f'{lookup}__pk')})
+                    .order_by(LINK_COLUMN, reader.pk))
+        for row, item in zip(rows, reader.render(rows)):
+            related.setdefault(row[LINK_COLUMN], []).append(item)
+        return related
+
+
+@lru_cache(maxsize=256)
+def cached_reader(serializer_class, fields, expand):
+    if issubclass(serializer_class, ExpandableFieldsMixin):
+        serializer = serializer_class(fields=set(fields), expand=set(expand))
+    else:
+        serializer = serializer_class()
+    try:
+        return Reader(serializer)
+    except CompileError:
+        return None
+
+
+def compiled_reader(serializer_class, request):
+    """The ``Reader`` for ``serializer_class`` as ``request`` asks for it, or ``None``"""
+    fields, expand = requested_fieldsets(request)
+    return cached_reader(serializer_class, frozenset(fields), frozenset(expand))
+
+
+class CompiledReadMixin:
+    """
+    Render ``list`` through the compiled read path when the serializer can
+    be compiled; ``compiled_list()`` does the same for custom list actions.
+    ``compiled_columns`` are extra columns the pagination reads from rows.
+    """
+    compiled_columns = ()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.compiled_list(queryset, lambda: super(CompiledReadMixin, self).list(request, *args, **kwargs))
+
+    def get_compiled_reader(self):
+        return compiled_reader(self.get_serializer_class(), self.request)
+
+    def compiled_list(self, queryset, fallback, paginate=True):
+        reader = self.get_compiled_reader()
+        if reader is None:
+            return fallback()
+        rows = reader.values(queryset, self.compiled_columns)
+        page = self.paginate_queryset(rows) if paginate else None
+        if page is not None:
+            return self.get_paginated_response(reader.render(page))
+        return Response(reader.render(rows))
@@ -0,0 +1,104 @@
+"""
+An in-process copy of the refresh token blacklist.
+
+``RevocationList`` keeps the jti and expiry of every blacklisted token
+that has not expired yet, so checking a refresh token is a dict lookup
+instead of a join on simplejwt's outstanding/blacklisted token tables.
+Expired tokens fail their own ``exp`` check, so they are dropped from
+memory, and ``prune_tokens`` deletes them from the tables.
+
+The copy is brought up to date with a primary-key range query for the
+blacklist rows added since the last one. It syncs when the shared
+``token_revocations`` cache version changes, which each worker bumps when
+it blacklists a token. Without a shared cache it syncs at least every
+``TOKEN_REVOCATION_SYNC_INTERVAL`` seconds. Every
+``TOKEN_REVOCATION_RELOAD_INTERVAL`` seconds a sync reloads every unexpired
+row instead, which picks up rows committed after higher ids were loaded.
+"""
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db.models import Max
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .cache import VersionedCache
+
+revocation_cache = VersionedCache('token_revocations')
+
+# Concurrent transactions may commit blacklist rows out of id order, so each
+# sync also re-reads this many ids below the highest one already loaded; the
+# periodic reload catches any committed later than that
+SYNC_LOOKBACK = 100
+
+
+class RevocationList:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # jti -> expiry as a UNIX timestamp
+        self.revoked = {}
+        # The highest BlacklistedToken id loaded, or None before the first sync
+        self.last_id = None
+        self.version = None
+        self.synced_at = 0.0
+        self.reloaded_at = 0.0
+
+    def is_revoked(self, jti):
+        self.sync_if_stale()
+        return jti in self.revoked
+
+    def revoke(self, jti, expires_at):
+        """Record a token this process has just blacklisted, and tell the other workers"""
+        version = revocation_cache.invalidate()
+        with self.lock:
+            self.revoked[jti] = expires_at
+            # Only this revocation since the last sync, and it is in memory
+            # already: no need to sync for it
+            if self.version is not None and version == self.version + 1:
+                self.version = version
+
+    def reload_due(self):
+        return time.monotonic() - self.reloaded_at >= settings.TOKEN_REVOCATION_RELOAD_INTERVAL
+
+    def sync_if_stale(self):
+        version = revocation_cache.version()
+        if (version != self.version or self.reload_due()
+                or time.monotonic() - self.synced_at >= settings.TOKEN_REVOCATION_SYNC_INTERVAL):
+            self.sync(version)
+
+    def sync(self, version=None):
+        """
+        Load the blacklist rows added since the last sync, or every unexpired
+        one when a reload is due, and forget expired tokens.
+        """
+        with self.lock:
+            now = time.time()
+            rows = BlacklistedToken.objects.order_by('pk')
+            if self.last_id is None or self.reload_due():
+                # Merged into the tokens already held, so a revocation whose
+                # row is not committed yet stays revoked
+                self.last_id = max(self.last_id or 0, rows.aggregate(last_id=Max('pk'))['last_id'] or 0)
+                rows = rows.filter(pk__lte=self.last_id, token__expires_at__gt=datetime.fromtimestamp(now, tz=timezone.utc))
+                self.reloaded_at = time.monotonic()
+            else:
+                rows = rows.filter(pk__gt=self.last_id - SYNC_LOOKBACK)
+
+            for pk, jti, expires_at in rows.values_list('pk', 'token__jti', 'token__expires_at').iterator():
+                self.last_id = max(self.last_id, pk)
+                self.revoked[jti] = expires_at.timestamp()
+            self.revoked = {jti: expires_at for jti, expires_at in self.revoked.items() if expires_at > now}
+            self.version = version if version is not None else revocation_cache.version()
+            self.synced_at = time.monotonic()
+
+    def reset(self):
+        with self.lock:
+            self.revoked = {}
+            self.last_id = self.version = None
+            self.synced_at = self.reloaded_at = 0.0
+
+    def stats(self):
+        return {'revoked': len(self.revoked), 'last_id': self.last_id}
+
+
+revocations = RevocationList()
@@ -0,0 +1,102 @@
+"""
+Full-text search for the ``search`` query parameter.
+
+SQLite uses an external-content FTS5 table per model, kept in sync by
+triggers so that every write path (``save``, ``bulk_create``, ``update``,
+raw SQL) updates the index. PostgreSQL uses a GIN expression index over
+the same ``to_tsvector`` expression the queries are built from, so the
+index is maintained by the database itself. Other backends fall back to
+``icontains``.
+
+The tables, triggers and indexes are created by migrations (prudence
+0014, accounts 0003) that spell out their own SQL. A SQLite migration that
+rebuilds an indexed table (altering a column, or adding a NOT NULL one)
+drops its triggers, and must recreate them as prudence 0015 and accounts
+0004 do.
+"""
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+SEARCH_CONFIG = 'english'
+
+
+def search_tokens(terms):
+    """Split free text into the word tokens FTS understands, dropping operators and quotes"""
+    return TOKEN_RE.findall(terms or '')
+
+
+class SearchIndex:
+    def __init__(self, table, columns):
+        self.table = table
+        self.columns = tuple(columns)
+
+    @property
+    def fts_table(self):
+        return f'{self.table}_fts'
+
+    def postgres_vector(self):
+        from django.contrib.postgres.search import SearchVector
+        return SearchVector(*self.columns, config=SEARCH_CONFIG)
+
+    # Queries --------------------------------------------------------------
+
+    def filter(self, queryset, terms):
+        """Restrict ``queryset`` to rows matching ``terms``"""
+        tokens = search_tokens(terms)
+        vendor = connections[queryset.db].vendor
+        if not tokens or vendor not in ('sqlite', 'postgresql'):
+            return self.fallback_filter(queryset, terms)
+
+        if vendor == 'sqlite':
+            return queryset.filter(pk__in=RawSQL(
+                f'SELECT rowid FROM {self.fts_table} WHERE {self.fts_table} MATCH %s',
+                [self.fts5_query(tokens)]
+            ))
+        return queryset.alias(_search_vector=self.postgres_vector()).filter(
+            _search_vector=self.postgres_query(tokens))
+
+    def rank(self, queryset, terms):
+        """Annotate ``search_rank`` (higher is more relevant) on an already filtered queryset"""
+        tokens = search_tokens(terms)
+        vendor = connections[queryset.db].vendor
+        if not tokens or vendor not in ('sqlite', 'postgresql'):
+            return queryset.annotate(search_rank=RawSQL('0', [], output_field=FloatField()))
+
+        if vendor == 'sqlite':
+            # bm25() is lower for better matches, so negate it
+            return queryset.annotate(search_rank=RawSQL(
+                f'SELECT -bm25({self.fts_table}) FROM {self.fts_table} '
+                f'WHERE {self.fts_table} MATCH %s AND rowid = {self.table}.id',
+                [self.fts5_query(tokens)],
+                output_field=FloatField()
+            ))
+        from django.contrib.postgres.search import SearchRank
+        return queryset.annotate(
+            search_rank=SearchRank(self.postgres_vector(), self.postgres_query(tokens)))
+
+    def fallback_filter(self, queryset, terms):
+        condition = Q()
+        for column in self.columns:
+            condition |= Q(**{f'{column}__icontains': terms})
+        return queryset.filter(condition)
+
+    @staticmethod
+    def fts5_query(tokens):
+        # Quoted prefix terms, implicitly ANDed: "fire"* "safety"*
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    @staticmethod
+    def postgres_query(tokens):
+        from django.contrib.postgres.search import SearchQuery
+        return SearchQuery(' & '.join(f'{token}:*' for token in tokens),
+                           config=SEARCH_CONFIG, search_type='raw')
+
+
+risk_search = SearchIndex('prudence_risk', ['description'])
+control_search = SearchIndex('prudence_control', ['name', 'description'])
+user_search = SearchIndex('accounts_customuser', ['username', 'first_name', 'last_name', 'email'])
+
@@ -1,45 +1,196 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Risk, Control, RiskAssessment, RiskType, Action
+from rest_framework.permissions import SAFE_METHODS
+from .bulk import BulkListSerializer
+from .imports import ImportFormatError, import_format
+from .models import Risk, Control, RiskAssessment, RiskType, Action, ImportJob
+from .timing import TimedRepresentationMixin
 from accounts.serializers import UserSerializer
 
+User = get_user_model()
 
-class RiskTypeSerializer(serializers.ModelSerializer):
+EFFECTIVENESS_LABELS = dict(Control.EFFECTIVENESS_CHOICES)
+
+
+def split_param(value):
+    return {item.strip() for item in value.split(',') if item.strip()} if value else set()
+
+
+def parse_expand(paths):
+    """Turn ``{'controls.owner', 'assessor'}`` into ``{'controls': {'owner'}, 'assessor': set()}``"""
+    tree = {}
+    for path in paths:
+        name, _, rest = path.partition('.')
+        children = tree.setdefault(name, set())
+        if rest:
+            children.add(rest)
+    return tree
+
+
+def requested_fieldsets(request):
+    """
+    Return the ``(fields, expand)`` sets requested through ``?fields=`` and
+    ``?expand=``. Sparse fieldsets only apply to reads: on a write they would
+    also drop the writable fields from validation.
+    """
+    if request is None:
+        return set(), set()
+    fields = request.query_params.get('fields') if request.method in SAFE_METHODS else None
+    return split_param(fields), split_param(request.query_params.get('expand'))
+
+
+class ExpandableFieldsMixin(TimedRepresentationMixin):
+    """
+    Sparse fieldsets and opt-in expansion of related objects.
+
+    Relations listed in ``expandable_fields`` render as primary keys unless
+    named in ``?expand=`` (dotted paths such as ``controls.owner`` expand
+    nested relations), in which case the nested serializer is used instead.
+    ``?fields=`` limits the top-level output of reads to the listed fields.
+    Only the root serializer reads the request; nested ones receive their
+    share of the expansion from their parent.
+    """
+    # name -> (serializer class, extra kwargs for the nested serializer)
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is None and expand is None:
+            fields, expand = requested_fieldsets(self.context.get('request'))
+
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+        for name, children in parse_expand(expand or ()).items():
+            if name not in self.expandable_fields or name not in self.fields:
+                continue
+            serializer_class, options = self.expandable_fields[name]
+            if issubclass(serializer_class, ExpandableFieldsMixin):
+                options = dict(options, expand=children)
+            self.fields[name] = serializer_class(read_only=True, **options)
+
+    @classmethod
+    def optimize_queryset(cls, queryset, request):
+        """Add the select_related/prefetch_related the requested representation needs"""
+        fields, expand = requested_fieldsets(request)
+        select, prefetch = cls.related_lookups(queryset.model, fields, expand)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+    @classmethod
+    def related_lookups(cls, model, fields, expand, prefix='', in_prefetch=False):
+        select, prefetch = [], []
+        tree = parse_expand(expand)
+        for name, (serializer_class, options) in cls.expandable_fields.items():
+            if fields and name not in fields:
+                continue
+            source = options.get('source', name)
+            lookup = prefix + source
+            related_model = model._meta.get_field(source).related_model
+            if name in tree:
+                if options.get('many') or in_prefetch:
+                    prefetch.append(lookup)
+                else:
+                    select.append(lookup)
+                if issubclass(serializer_class, ExpandableFieldsMixin):
+                    nested_select, nested_prefetch = serializer_class.related_lookups(
+                        related_model, set(), tree[name], prefix=lookup + '__',
+                        in_prefetch=in_prefetch or options.get('many', False))
+                    select += nested_select
+                    prefetch += nested_prefetch
+            elif options.get('many'):
+                # Only the primary keys are rendered
+                prefetch.append(Prefetch(lookup, queryset=related_model.objects.only('pk')))
+        return select, prefetch
+
+    @classmethod
+    def expanded_relations(cls, fields, expand, prefix=''):
+        """
+        ``(lookup, serializer class)`` for every relation rendered nested by
+        ``?expand=``, nested expansions included, e.g. ``('controls__owner',
+        UserSerializer)``.
+        """
+        relations = []
+        tree = parse_expand(expand)
+        for name, (serializer_class, options) in cls.expandable_fields.items():
+            if name not in tree or (fields and name not in fields):
+                continue
+            lookup = prefix + options.get('source', name)
+            relations.append((lookup, serializer_class))
+            if issubclass(serializer_class, ExpandableFieldsMixin):
+                relations += serializer_class.expanded_relations(set(), tree[name], prefix=lookup + '__')
+        return relations
+
+
+class RiskTypeSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = RiskType
         fields = '__all__'
 
 
-class ActionSerializer(serializers.ModelSerializer):
+class ActionSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = Action
         fields = '__all__'
 
 
-class ControlSerializer(serializers.ModelSerializer):
-    owner = UserSerializer(read_only=True)
+class ControlSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    owner = serializers.PrimaryKeyRelatedField(read_only=True)
     owner_id = serializers.IntegerField(write_only=True)
     effectiveness_display = serializers.SerializerMethodField()
 
+    expandable_fields = {
+        'owner': (UserSerializer, {}),
+    }
+    bulk_references = (
+        ('owner_id', 'owner_id', User),
+    )
+    # Method fields computed from .values() rows by the compiled read path
+    compiled_methods = {
+        'effectiveness_display': (
+            ('effectiveness',), lambda row: EFFECTIVENESS_LABELS.get(row['effectiveness'], 'Unknown')),
+    }
+
     class Meta:
         model = Control
         fields = '__all__'
+        list_serializer_class = BulkListSerializer
 
     def get_effectiveness_display(self, obj):
-        effectiveness = obj.effectiveness
-        if effectiveness == 0.0:
-            return 'Not Effective'
-        elif effectiveness == 0.5:
-            return 'Partially Effective'
-        elif effectiveness == 1.0:
-            return 'Fully Effective'
-        return 'Unknown'
-
-
-class RiskSerializer(serializers.ModelSerializer):
-    owner = UserSerializer(source='risk_owner', read_only=True)
-    assessor = UserSerializer(read_only=True)
-    controls = ControlSerializer(many=True, read_only=True)
-    risk_type = RiskTypeSerializer(read_only=True)
+        return EFFECTIVENESS_LABELS.get(obj.effectiveness, 'Unknown')
+
+    def bulk_create(self, validated_data):
+        controls = [Control(**item) for item in validated_data]
+        return Control.objects.bulk_create(controls)
+
+    def bulk_update(self, instances, validated_data):
+        # bulk_update() skips auto_now, so stamp the timestamps here
+        now = timezone.now()
+        fields = {'clastassessed', 'updated_at'}
+        for control, item in zip(instances, validated_data):
+            for attr, value in item.items():
+                setattr(control, attr, value)
+                fields.add(attr)
+            control.clastassessed = now.date()
+            control.updated_at = now
+        Control.objects.bulk_update(instances, sorted(fields))
+        return instances
+
+
+class RiskSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    owner = serializers.PrimaryKeyRelatedField(source='risk_owner', read_only=True)
+    assessor = serializers.PrimaryKeyRelatedField(read_only=True)
+    controls = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    risk_type = serializers.PrimaryKeyRelatedField(read_only=True)
     
     owner_id = serializers.IntegerField(source='risk_owner_id', write_only=True)
     assessor_id = serializers.IntegerField(write_only=True, required=False, allow_null=True)
@@ -53,28 +204,42 @@ class RiskSerializer(serializers.ModelSerializer):
     
     inherent_rating = serializers.SerializerMethodField()
     residual_rating = serializers.SerializerMethodField()
-    risk_level = serializers.SerializerMethodField()
+
+    expandable_fields = {
+        'owner': (UserSerializer, {'source': 'risk_owner'}),
+        'assessor': (UserSerializer, {}),
+        'controls': (ControlSerializer, {'many': True}),
+        'risk_type': (RiskTypeSerializer, {}),
+    }
+    bulk_references = (
+        ('owner_id', 'risk_owner_id', User),
+        ('assessor_id', 'assessor_id', User),
+        ('risk_type_id', 'risk_type_id', RiskType),
+        ('control_ids', 'control_ids', Control),
+    )
+    # Method fields computed from .values() rows by the compiled read path
+    compiled_methods = {
+        'inherent_rating': (
+            ('inherent_probability', 'inherent_impact'),
+            lambda row: row['inherent_probability'] * row['inherent_impact']),
+        'residual_rating': (
+            ('residual_risk_rating',),
+            lambda row: None if row['residual_risk_rating'] is None else int(row['residual_risk_rating'])),
+    }
 
     class Meta:
         model = Risk
         fields = '__all__'
+        read_only_fields = ('risk_level',)
+        list_serializer_class = BulkListSerializer
 
     def get_inherent_rating(self, obj):
         return obj.inherent_probability * obj.inherent_impact
 
     def get_residual_rating(self, obj):
-        return obj.residual_probability * obj.residual_impact
-
-    def get_risk_level(self, obj):
-        rating = obj.residual_probability * obj.residual_impact
-        if rating >= 20:
-            return 'critical'
-        elif rating >= 15:
-            return 'high'
-        elif rating >= 10:
-            return 'medium'
-        else:
-            return 'low'
+        if obj.residual_risk_rating is None:
+            return None
+        return int(obj.residual_risk_rating)
 
     def create(self, validated_data):
         control_ids = validated_data.pop('control_ids', [])
@@ -94,19 +259,87 @@ class RiskSerializer(serializers.ModelSerializer):
         
         return instance
 
+    def bulk_create(self, validated_data):
+        control_ids = [item.pop('control_ids', []) for item in validated_data]
+        risks = [Risk(**item) for item in validated_data]
+        # bulk_create() bypasses Risk.save()
+        for risk in risks:
+            risk.refresh_ratings()
+        Risk.objects.bulk_create(risks)
+        self.link_controls(zip(risks, control_ids))
+        return risks
+
+    def bulk_update(self, instances, validated_data):
+        # bulk_update() bypasses Risk.save() and auto_now
+        now = timezone.now()
+        fields = {'inherent_risk_rating', 'residual_risk_rating', 'risk_level',
+                  'last_assessed', 'updated_at'}
+        relinked = []
+        for risk, item in zip(instances, validated_data):
+            control_ids = item.pop('control_ids', None)
+            for attr, value in item.items():
+                setattr(risk, attr, value)
+                fields.add(attr)
+            risk.refresh_ratings()
+            risk.last_assessed = now.date()
+            risk.updated_at = now
+            if control_ids is not None:
+                relinked.append((risk, control_ids))
+        Risk.objects.bulk_update(instances, sorted(fields))
+
+        if relinked:
+            Risk.controls.through.objects.filter(
+                risk_id__in=[risk.pk for risk, _ in relinked]).delete()
+            self.link_controls(relinked)
+        return instances
 
-class RiskAssessmentSerializer(serializers.ModelSerializer):
-    risk = RiskSerializer(read_only=True)
-    assessor = UserSerializer(read_only=True)
+    @staticmethod
+    def link_controls(pairs):
+        """Insert the (risk, control ids) links with one bulk insert into the through table"""
+        Through = Risk.controls.through
+        Through.objects.bulk_create([
+            Through(risk_id=risk.pk, control_id=control_id)
+            for risk, control_ids in pairs
+            for control_id in set(control_ids)
+        ])
+
+
+class RiskAssessmentSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    risk = serializers.PrimaryKeyRelatedField(read_only=True)
+    assessor = serializers.PrimaryKeyRelatedField(read_only=True)
     risk_id = serializers.IntegerField(write_only=True)
     assessor_id = serializers.IntegerField(write_only=True)
 
+    expandable_fields = {
+        'risk': (RiskSerializer, {}),
+        'assessor': (UserSerializer, {}),
+    }
+
     class Meta:
         model = RiskAssessment
         fields = '__all__'
 
 
-class DashboardStatsSerializer(serializers.Serializer):
+class ImportJobSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    created_by = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    class Meta:
+        model = ImportJob
+        fields = '__all__'
+        read_only_fields = [
+            'status', 'rows_processed', 'rows_created', 'row_errors', 'error_count',
+            'failure', 'created_at', 'updated_at',
+        ]
+
+    def validate_file(self, value):
+        try:
+            import_format(value.name)
+        except ImportFormatError as exc:
+            raise serializers.ValidationError(str(exc))
+        return value
+
+
+class DashboardStatsSerializer(TimedRepresentationMixin, serializers.Serializer):
     total_risks = serializers.IntegerField()
     high_risks = serializers.IntegerField()
     pending_assessments = serializers.IntegerField()
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from accounts.models import REVOKING_FIELDS, tokens_revoked
+
+from .authentication import remember_token_version, token_version_key
+from .cache import risk_type_cache, action_cache, user_cache
+from .models import Risk, Control, RiskAssessment, RiskType, Action
+from .stats import dashboard_cache
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Risk)
+@receiver(post_delete, sender=Risk)
+@receiver(post_save, sender=Control)
+@receiver(post_delete, sender=Control)
+@receiver(post_save, sender=RiskAssessment)
+@receiver(post_delete, sender=RiskAssessment)
+def invalidate_dashboard_stats(sender, **kwargs):
+    dashboard_cache.invalidate()
+
+
+@receiver(post_save, sender=RiskType)
+@receiver(post_delete, sender=RiskType)
+def invalidate_risk_types(sender, **kwargs):
+    risk_type_cache.invalidate()
+
+
+@receiver(post_save, sender=Action)
+@receiver(post_delete, sender=Action)
+def invalidate_actions(sender, **kwargs):
+    action_cache.invalidate()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_users(sender, update_fields=None, **kwargs):
+    # Logins only touch last_login, which the API does not expose
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    user_cache.invalidate()
+
+
+@receiver(pre_save, sender=User)
+def detect_claim_changes(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    # Only claims this copy changed and writes need comparing with the row
+    fields = instance.changed_claims()
+    if update_fields is not None:
+        fields &= set(update_fields)
+    if not fields:
+        return
+    stored = User.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._claims_changed = bool(stored) and any(stored[field] != getattr(instance, field) for field in fields)
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens(sender, instance, **kwargs):
+    # Tokens carrying the old role or flags stop authenticating
+    if instance.__dict__.pop('_claims_changed', False):
+        User.objects.filter(pk=instance.pk).revoke_tokens()
+        # The stored version, which other processes may have bumped too
+        instance.refresh_from_db(fields=['token_version'])
+        remember_token_version(instance.pk, instance.token_version)
+
+
+@receiver(tokens_revoked)
+def forget_token_versions(sender, user_ids, **kwargs):
+    # Bumped by a queryset update: reread from the database when next needed
+    cache.delete_many([token_version_key(user_id) for user_id in user_ids])
+    user_cache.invalidate()
+
+
+@receiver(post_delete, sender=User)
+def forget_token_version(sender, instance, **kwargs):
+    cache.delete(token_version_key(instance.pk))
@@ -0,0 +1,90 @@
+"""
+What a worker pays to start: import time per module, wall time and RSS.
+
+``profile_startup()`` runs a fresh interpreter under ``-X importtime``
+that does what a worker does before its first request (importing
+``prudence.asgi``, the application deployments serve, which sets Django
+up, and loading the URLconf) and parses the per-module timings Python
+writes to stderr. The child reports its own wall time, peak RSS and loaded
+modules, so the numbers are those of a cold process, unaffected by
+whatever the caller has already imported.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+
+# Modules that must only be imported on the code paths that need them
+HEAVY_MODULES = ('matplotlib', 'numpy', 'pandas', 'openpyxl', 'PIL')
+# Top-level packages that belong to this project
+PROJECT_PACKAGES = ('prudence', 'accounts', 'api_urls')
+
+STARTUP_SCRIPT = """
+import json, os, sys, time
+started = time.perf_counter()
+from prudence.asgi import application
+from django.urls import get_resolver
+get_resolver().url_patterns
+wall = time.perf_counter() - started
+try:
+    import resource
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+except ImportError:
+    max_rss_kb = None
+print(json.dumps({'wall_s': wall, 'max_rss_kb': max_rss_kb, 'modules': sorted(sys.modules)}))
+"""
+
+
+class StartupProfileError(Exception):
+    pass
+
+
+def parse_importtime(lines):
+    """``[{'module', 'depth', 'self_ms', 'cumulative_ms'}]`` from ``-X importtime`` output"""
+    imports = []
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            # The header line
+            continue
+        imports.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+        })
+    return imports
+
+
+def profile_startup(settings_module=None, timeout=120):
+    """Start a worker-like interpreter and return its startup profile"""
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings_module or os.environ['DJANGO_SETTINGS_MODULE']}
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, timeout=timeout,
+    )
+    if completed.returncode != 0:
+        raise StartupProfileError(f'Startup failed:\n{completed.stderr[-2000:]}')
+    child = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    imports = parse_importtime(completed.stderr.splitlines())
+    loaded = set(child['modules'])
+    return {
+        'wall_ms': round(child['wall_s'] * 1000, 1),
+        'import_ms': round(sum(item['cumulative_ms'] for item in imports if item['depth'] == 0), 1),
+        'max_rss_mb': round(child['max_rss_kb'] / 1024, 1) if child['max_rss_kb'] is not None else None,
+        'module_count': len(loaded),
+        'heavy_modules': sorted(name for name in HEAVY_MODULES if name in loaded),
+        'imports': imports,
+    }
+
+
+def slowest(imports, count=25, key='cumulative_ms', project_only=False):
+    """The ``count`` slowest imports by ``key``, optionally only this project's modules"""
+    if project_only:
+        imports = [item for item in imports if item['module'].split('.')[0] in PROJECT_PACKAGES]
+    return sorted(imports, key=lambda item: item[key], reverse=True)[:count]
@@ -0,0 +1,36 @@
+"""
+Static files for ASGI as well as WSGI.
+
+WhiteNoise 6.4's middleware is sync-only, and Django runs every middleware
+above a sync-only one in a thread under ASGI. This subclass adds an async
+path: static files are still looked up and opened in a thread, while every
+other request goes straight on to the next middleware.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise import middleware
+
+
+class WhiteNoiseMiddleware(middleware.WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            # Looks on disk
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
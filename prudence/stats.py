@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Func, Q, Subquery
+
+from .cache import VersionedCache
+from .models import Risk, Control, RiskAssessment, HIGH_RISK_LEVELS
+
+dashboard_cache = VersionedCache(
+    'dashboard_stats', timeout=settings.DASHBOARD_STATS_CACHE_TIMEOUT, local_timeout=settings.LOCAL_CACHE_TIMEOUT)
+
+
+def count_of(queryset):
+    """
+    ``(SELECT COUNT(*) ...)`` over ``queryset`` as a scalar subquery.
+
+    ``COUNT`` is written as a plain ``Func`` rather than the ``Count``
+    aggregate so the ORM adds no ``GROUP BY``: the subquery returns a single
+    row however many rows it counts.
+    """
+    return Subquery(queryset.order_by().values(count=Func('pk', function='COUNT')))
+
+
+def risk_filters(user):
+    """The risks counted by each dashboard KPI read from the risk table"""
+    return {
+        'total_risks': Q(),
+        'high_risks': Q(risk_level__in=HIGH_RISK_LEVELS),
+        'my_risks': Q(risk_owner=user) | Q(assessor=user),
+    }
+
+
+def my_controls(user):
+    return Control.objects.filter(owner=user)
+
+
+def pending_assessments(user):
+    """The assessments waiting on ``user``; only L2 users assess risks"""
+    if user.role != 'L2':
+        return RiskAssessment.objects.none()
+    return RiskAssessment.objects.filter(assessor=user, assessment_status='P')
+
+
+def compute_dashboard_stats(user):
+    """
+    Compute every dashboard KPI for ``user`` in a single query: one count
+    subquery per KPI, selected alongside the user's own row.
+    """
+    kpis = {name: count_of(Risk.objects.filter(condition)) for name, condition in risk_filters(user).items()}
+    kpis['my_controls'] = count_of(my_controls(user))
+    # Pending assessments only apply to L2 users
+    if user.role == 'L2':
+        kpis['pending_assessments'] = count_of(pending_assessments(user))
+
+    stats = get_user_model().objects.filter(pk=user.pk).values(**kpis).first()
+    if stats is None:
+        # The user was deleted since authenticating
+        stats = {name: 0 for name in kpis}
+    stats.setdefault('pending_assessments', 0)
+    return stats
+
+
+def dashboard_stats_for(user):
+    """
+    Return the dashboard KPIs for ``user``, cached until a Risk, Control or
+    RiskAssessment changes. A per-process cache only sees this worker's
+    writes, so there the KPIs are kept for ``LOCAL_CACHE_TIMEOUT`` seconds
+    at most.
+    """
+    return dashboard_cache.get_or_set(
+        (user.pk, user.role), lambda: compute_dashboard_stats(user))
@@ -1,8 +1,10 @@
 from django import template
-from prudence.models import PROBABILITY_CHOICES, IMPACT_CHOICES
+from prudence.models import PROBABILITY_CHOICES, IMPACT_CHOICES, RISK_LEVEL_CHOICES, risk_level_for_rating
 
 register = template.Library()
 
+RISK_LEVEL_LABELS = dict(RISK_LEVEL_CHOICES)
+
 @register.filter(name='get_description')
 def get_description(value, arg):
     if arg == 'prob':
@@ -10,32 +12,11 @@ def get_description(value, arg):
     elif arg == 'impact':
         return dict(IMPACT_CHOICES).get(value, 'Unknown')
 
-RISK_RATING_CHOICES = {
-    1: 'Very Low',
-    2: 'Low',
-    3: 'Moderate',
-    4: 'High',
-    5: 'Very High',
-}
-
-# Enhanced mapping to cover possible ranges
-def risk_rating_to_description(value):
-    if value < 1.5:
-        return 'Very Low'
-    elif 1.5 <= value < 3.5:
-        return 'Low'
-    elif 3.5 <= value < 6.5:
-        return 'Moderate'
-    elif 6.5 <= value < 8.5:
-        return 'High'
-    elif value >= 8.5:
-        return 'Very High'
-    return 'Out of Range'  # For unexpected values
-
 @register.filter
-def get_risk_description(value):
+def get_risk_level(value):
+    """Label a risk rating (probability x impact) with its risk level, on the scale the API uses"""
     try:
-        value = float(value)  # Ensuring the value can be evaluated
-        return risk_rating_to_description(value)
+        level = risk_level_for_rating(float(value))
     except (TypeError, ValueError):
-        return 'Invalid Input'  # In case of non-numeric inputs
\ No newline at end of file
+        return 'Not assessed'
+    return RISK_LEVEL_LABELS[level]
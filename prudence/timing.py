@@ -0,0 +1,173 @@
+"""
+Per-request performance instrumentation.
+
+``TimingMiddleware`` samples a share of requests (``PERF_SAMPLE_RATE``) and,
+for those, records the number and total time of database queries together
+with the time spent authenticating, serializing and in the whole request.
+The result is logged as one JSON line on the ``prudence.timing`` logger
+and, with ``PERF_SERVER_TIMING``, sent back in a ``Server-Timing`` header
+that browser dev tools display.
+
+The timings live in a context variable, which asgiref copies into every
+``sync_to_async`` thread. ``time_query`` is installed on each connection as
+it is created and times the queries of whichever request is current, so
+the count is the same under WSGI and ASGI, and includes the queries the
+async views run on worker-thread connections.
+
+Requests that are not sampled cost one ``random()`` call; the ``timed()``
+blocks spread through the code are no-ops outside a sampled request.
+"""
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger('prudence.timing')
+
+# The timings of the request being handled, or None when it is not sampled
+current_timings = ContextVar('current_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.durations = {}
+        self.queries = 0
+        # Phases currently running, so that nested blocks (a serializer
+        # rendering its nested serializers) are only counted once
+        self.active = set()
+        # Async views add from several worker threads at once
+        self.lock = threading.Lock()
+
+    def add(self, name, seconds, queries=0):
+        with self.lock:
+            self.durations[name] = self.durations.get(name, 0.0) + seconds
+            self.queries += queries
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            **{f'{name}_ms': round(seconds * 1000, 3) for name, seconds in self.durations.items()},
+        }
+
+    def server_timing(self):
+        entries = []
+        for name, seconds in self.durations.items():
+            entry = f'{name};dur={seconds * 1000:.1f}'
+            if name == 'db':
+                entry += f';desc="{self.queries} queries"'
+            entries.append(entry)
+        return ', '.join(entries)
+
+
+def time_query(execute, sql, params, many, context):
+    """``execute_wrapper`` hook counting and timing the queries of a sampled request"""
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('db', time.perf_counter() - started, queries=1)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """``connection_created`` hook adding ``time_query`` to a connection once"""
+    if time_query not in connection.execute_wrappers:
+        # First, as execute_wrapper() blocks pop the last one on exit
+        connection.execute_wrappers.insert(0, time_query)
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to the ``name`` phase of the current request"""
+    timings = current_timings.get()
+    if timings is None or name in timings.active:
+        yield
+        return
+    timings.active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.active.discard(name)
+        timings.add(name, time.perf_counter() - started)
+
+
+class TimedRepresentationMixin:
+    """Serializer mixin recording ``to_representation`` as the ``serialize`` phase"""
+
+    def to_representation(self, instance):
+        with timed('serialize'):
+            return super().to_representation(instance)
+
+
+class TimedAuthenticationMixin:
+    """Authentication class mixin recording ``authenticate`` as the ``auth`` phase"""
+
+    def authenticate(self, request):
+        with timed('auth'):
+            return super().authenticate(request)
+
+
+class TimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PERF_SAMPLE_RATE', 0.0)
+        self.server_timing = getattr(settings, 'PERF_SERVER_TIMING', False)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        return self.sample_rate and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings.add('total', time.perf_counter() - started)
+            current_timings.reset(token)
+        return self.record(request, response, timings)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timings.add('total', time.perf_counter() - started)
+            current_timings.reset(token)
+        return self.record(request, response, timings)
+
+    def record(self, request, response, timings):
+        if self.server_timing:
+            response['Server-Timing'] = timings.server_timing()
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **timings.as_dict(),
+        }))
+        return response
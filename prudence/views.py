@@ -1,18 +1,12 @@
 import json
-import io
-import numpy as np
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
-from io import BytesIO
-import base64
-from matplotlib.colors import LinearSegmentedColormap
 from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
+from django.utils.safestring import mark_safe
 from .forms import RiskForm, ControlForm, RiskAssessmentForm
 from .models import Risk, Control, Action, RiskAssessment
+from .aggregates import risk_matrix_counts
+from .heatmap import heatmap
 from datetime import timedelta
 import logging
 
@@ -190,19 +184,7 @@ def risk_register(request):
     return render(request, 'risk_register.html', context)
 
 def risk_matrix(request):
-    risks = Risk.objects.all()
-    matrix = np.zeros((5, 5))
-    cmap = plt.get_cmap('Reds')
-    for risk in risks:
-        x = risk.inherent_probability - 1
-        y = risk.inherent_impact - 1
-        matrix[x, y] += 1
-    fig, ax = plt.subplots()
-    cax = ax.matshow(matrix, cmap=cmap)
-    plt.colorbar(cax)
-    plt.title('Risk Matrix')
-    img_io = BytesIO()
-    plt.savefig(img_io, format='png', bbox_inches='tight')
-    img_io.seek(0)
-    base64_image = base64.b64encode(img_io.read()).decode('utf-8')
-    return render(request, 'risk_matrix.html', {'risk_matrix_image': base64_image})
\ No newline at end of file
+    cells = risk_matrix_counts(Risk.objects.all())['inherent']
+    # Inline, so the page scales it; it holds only numbers and fixed labels
+    svg = heatmap(cells, 'inherent').decode()
+    return render(request, 'risk_matrix.html', {'risk_matrix_svg': mark_safe(svg)})